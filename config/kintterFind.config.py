@@ -223,6 +223,8 @@ DISPLAYCOLUMNS = [
     #'NLINK', # number of hard links
     #'INO', # inode number
     #'DEV', # device number
+    #'Group', # group of files with the same content, FIND mode "duplicates"
+    #'Disk', # allocated size of directory, FIND mode "disk usage"
     ]
 
 
@@ -233,6 +235,117 @@ DISPLAYCOLUMNS = [
 # lot of memory, and cannot be cancelled.
 MAX_RESULTS = 50000
 
+# If True, results are displayed while FIND is running, unsorted, and are
+# sorted when FIND is finished. Not more than MAX_RESULTS results are displayed
+# before the end of FIND.
+STREAM_RESULTS = True
+
+# If True, when there are more than VIRTUAL_RESULTS_MIN results, only the rows
+# currently visible in Results, plus some rows above and below them, are put
+# into the Treeview widget. Rows are replaced as the view is scrolled. This
+# makes displaying, sorting and scrolling fast for millions of results, and
+# MAX_RESULTS is then ignored. If False, all rows are put into Treeview.
+VIRTUAL_RESULTS = True
+VIRTUAL_RESULTS_MIN = 5000
+
+
+#--- Directory traversal. --------------------------------------------{{{1
+# Number of worker threads that scan directories in parallel when searching
+# recursively. Each thread lists one directory at a time with scandir(). This
+# speeds up the search on network filesystems (NFS, SMB) and on storage with
+# high latency or many disks. If 0 or 1, directories are scanned one at a time
+# in the main thread.
+SCAN_THREADS = 1
+
+# Order of recursive directory traversal when SCAN_THREADS is 0 or 1.
+# False: depth-first, like 'find' (each subdirectory is scanned as soon as it is
+# found). True: breadth-first (all items at depth N are found before items at
+# depth N+1). The order matters for partial results after CANCEL.
+SCAN_BREADTH_FIRST = False
+
+# File index database used when checkbutton "index" is checked. This is an
+# SQLite file that records directory listings and file properties. During
+# FIND, directories whose modification time did not change since they were
+# recorded are listed from the index instead of the file system.
+# If path is not absolute, it is relative to the config directory.
+INDEX_FILE = "kintterFind.index.sqlite"
+
+# Memory limit in MiB for the cache of directory listings. The cache is kept
+# between FINDs and makes repeated searches in the same directories much
+# faster: a directory is scanned again only if its modification time changed.
+# Size and times of files are also cached. NOTE: modifying a file does not
+# change the modification time of its directory, thus columns SIZE, MTIME, etc.
+# may show old values. Least recently used directories are removed from the
+# cache when it is full (about 1 KiB per file). Use menu View -> Clear Scan
+# Cache to empty it. If 0, there is no cache.
+SCAN_CACHE_MB = 0
+
+
+#--- Filters. --------------------------------------------------------{{{1
+# If True, the order in which filters are applied is chosen automatically.
+# The first 2000 items are checked in the order of filter tabs while counting
+# how many items each filter rejects. Then filters are reordered: cheap and
+# selective checks first. Checks of names (Name, Path, Extension) always come
+# before File type, which comes before checks that need stat (Size, Time,
+# Misc). Filter Content is always applied last. Results are the same in any
+# order, only the speed differs.
+FILTER_REORDER = True
+
+
+#--- Content search. -------------------------------------------------{{{1
+# Number of worker processes that search file content (filter "Content") in
+# parallel. Files that pass all other filters are sent to the workers in
+# batches; found items are still added to Results in the order of traversal.
+# This uses several CPU cores for CPU-bound searches, e.g., with IgnoreCase or
+# RegExp. Starting the processes takes a fraction of a second. If 0 or 1,
+# files are searched one at a time in the main thread.
+CONT_PROCESSES = 0
+
+# If True, mode Contains without IgnoreCase searches raw bytes of the file
+# (memory-mapped) for the encoded pattern instead of decoding each line. This is
+# much faster for large files. It is used only when encoding is UTF-8 or a
+# single-byte encoding (latin-1, cp1252, etc.), pattern has no newlines, and
+# errors is replace or surrogateescape; any errors, also strict, if every byte
+# is a character of the encoding (latin-1, cp437), so decoding cannot fail.
+# Results are then the same as when searching decoded lines. Default settings
+# (IgnoreCase on; utf-8, errors=strict) decode lines as before: with strict,
+# invalid bytes anywhere in the file are an error.
+CONT_BYTES_SEARCH = True
+
+
+#--- Search daemon. --------------------------------------------------{{{1
+# Address of kintterFind_daemon.py. If not empty, FIND is run by the daemon
+# instead of in this window: several windows and kintterFind_cli.py --daemon
+# then share its cache of directory listings and parsed filters. The address is
+# the path of a Unix domain socket, relative to the config directory, e.g.,
+# "kintterFind.sock", or a TCP port number on 127.0.0.1, e.g., "8765". With a
+# TCP port, the token written by the daemon into the config directory is sent
+# first: the daemon must use the same config directory. Options for searching
+# (SCAN_THREADS, CONT_PROCESSES, etc.) are those of the daemon.
+DAEMON_ADDRESS = ""
+
+# Memory limit in MiB for the cache of directory listings in the daemon, see
+# SCAN_CACHE_MB. If 0, the daemon has no such cache.
+DAEMON_CACHE_MB = 512
+
+
+#--- Duplicates. -----------------------------------------------------{{{1
+# Number of threads that read and hash files in FIND mode "duplicates".
+# Several threads help on SSDs and network file systems; use 1 for a single
+# rotating disk.
+DUP_THREADS = 4
+
+# Files smaller than this (in bytes) are not checked for duplicates. Empty
+# files are never checked.
+DUP_MIN_SIZE = 1
+
+
+#--- Disk usage. -----------------------------------------------------{{{1
+# Number of directories shown in FIND mode "disk usage": the directories with
+# the largest allocated size. Memory use depends on this number and on the depth
+# of the directory tree, not on the number of directories.
+DU_TOP = 1000
+
 
 #=== File and Directory openers ======================================{{{1
 #
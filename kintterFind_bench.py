@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+
+import sys
+if sys.version_info < (3, 4):
+    print("Python version is too old.\nkintterFind requires Python version 3.4 or newer.")
+    sys.exit(1)
+
+if __name__ == '__main__':
+    from kintterToys.benchmark import main
+    sys.exit(main())
+
+# The End
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""
+Aho-Corasick automaton for finding if any of many substrings occurs in a
+string. Usage:
+    from . import aho_corasick
+    ac = aho_corasick.AhoCorasick(['foo', 'bar', ...])
+    if ac.search(name): ...
+
+The automaton is built once. Transitions for all characters that occur in
+patterns are precomputed, so search() makes one dict lookup per character of
+the searched string, however many patterns there are.
+"""
+
+from collections import deque
+
+
+class AhoCorasick:
+    """Automaton that matches any of the substrings in patterns."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        # trie: goto[state] is {char: state}; state 0 is root
+        goto, final = [{}], [False]
+        for p in self.patterns:
+            s = 0
+            for ch in p:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][ch] = nxt
+                    goto.append({})
+                    final.append(False)
+                s = nxt
+            final[s] = True
+
+        # breadth-first: failure links and complete transitions
+        # delta[state] is {char: state} for chars that do not lead to root
+        fail = [0] * len(goto)
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        todo = deque(goto[0].values())
+        while todo:
+            s = todo.popleft()
+            f = fail[s]
+            final[s] = final[s] or final[f]
+            d = dict(delta[f])
+            for ch, nxt in goto[s].items():
+                fail[nxt] = delta[f].get(ch, 0)
+                d[ch] = nxt
+                todo.append(nxt)
+            delta[s] = d
+        self._delta, self._final = delta, final
+        # empty pattern matches any string
+        self._any = final[0]
+
+    def search(self, text):
+        """Return True if any pattern occurs in text."""
+        if self._any:
+            return True
+        delta, final = self._delta, self._final
+        s = 0
+        for ch in text:
+            s = delta[s].get(ch, 0)
+            if final[s]:
+                return True
+        return False
+
+    def __repr__(self):
+        return '<AhoCorasick %s patterns, %s states>' % (len(self.patterns), len(self._delta))
+
+
+# The End
@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+
+"""
+Performance benchmarks of kintterFind. Usage:
+    kintterFind_bench.py [--depth N] [--fanout N] [--files N] ... [--output FILE]
+    kintterFind_bench.py --compare OLD.json NEW.json
+
+Generates a synthetic directory tree in a temporary directory (or in --tree
+DIR, which is kept). The tree depends only on its parameters and --seed, so
+runs with the same parameters can be compared. Then it times:
+    scan.*      -- scantree(), scantree_mt(), with and without stat()
+    name.*      -- each Name matcher of fltfuncs, through parse_names(), on
+                   the names of all items
+    content.*   -- filter Content (flt_ContFile) on all regular files
+    find.*      -- Finder with typical queries, from start to end
+    results.*   -- ResultStore: append, format rows, sort by columns, copy
+                   Path and rows as text like the popup menu of Results
+    display.*   -- TreeviewRows.set_data() (needs a display, otherwise skipped)
+
+Each benchmark runs --repeat times and the best time is reported, then once
+more under tracemalloc to get peak memory of Python objects it allocated.
+Results are written as JSON: {"meta": {...}, "results": {NAME: {"items": N,
+"seconds": S, "items_per_sec": R, "peak_kib": M}}}. --compare prints the ratio
+of items/sec of two result files. The config file is not read, options have
+their default values, see kintterFind_options.py.
+"""
+
+import sys, os, re, time, json, gc, random, shutil, tempfile, platform
+import tracemalloc
+
+# local imports
+from . import kintterFind_options as OPT
+from . import fltfuncs
+from . import find_engine
+from . import result_store
+from .find_engine import (scantree, scantree_mt, parse_names, parse_content,
+                          bytes2kibi, get_ext, get_link_to, MATCH_MODES)
+
+_join = os.path.join
+
+# words for names and content of generated files
+WORDS = ('alpha', 'beta', 'gamma', 'delta', 'kappa', 'lambda', 'sigma', 'omega',
+         'data', 'report', 'image', 'backup', 'notes', 'draft', 'final', 'old',
+         'Test', 'README', 'Makefile', 'index', 'main', 'util', 'config', 'photo',
+         'Übersicht', 'résumé', 'файл', '文件')
+EXTS = ('.txt', '.py', '.c', '.h', '.jpg', '.png', '.pdf', '.log', '.json',
+        '.html', '.md', '.tar.gz', '.bak', '')
+# inserted into some files, searched by content.*
+NEEDLE = 'kintterNeedle'
+
+# result columns of the GUI
+COLUMNS = ['FileType', 'Directory', 'Name', 'Ext', 'SIZE', 'Size', 'MTIME', 'MODE']
+
+
+#--- Synthetic tree --------------------------------------------------
+
+def make_tree(root, depth=4, fanout=5, files=20, sizeMin=0, sizeMax=8192,
+              symlinks=0.05, unreadable=2, seed=1):
+    """Create directory tree in existing empty directory root. Each directory
+    above depth has fanout subdirectories and each directory has files
+    items: regular files of random size in [sizeMin, sizeMax], and symbolic
+    links (fraction symlinks). unreadable directories have mode 000. Return
+    dict of counts."""
+    rnd = random.Random(seed)
+    cnt = {'dirs': 1, 'files': 0, 'symlinks': 0, 'bytes': 0, 'unreadable': 0}
+    level, allDirs, targets = [root], [root], []
+    for d in range(depth + 1):
+        nextLevel = []
+        for p in level:
+            for i in range(files):
+                name = '%s_%s%s' %(rnd.choice(WORDS), i, rnd.choice(EXTS))
+                path = _join(p, name)
+                if targets and rnd.random() < symlinks:
+                    os.symlink(os.path.relpath(rnd.choice(targets), p), path)
+                    cnt['symlinks'] += 1
+                    continue
+                size = rnd.randint(sizeMin, sizeMax)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(make_text(rnd, size))
+                targets.append(path)
+                cnt['files'] += 1
+                cnt['bytes'] += size
+            if d == depth:
+                continue
+            for i in range(fanout):
+                q = _join(p, 'dir%s_%s' %(i, rnd.choice(WORDS)))
+                os.mkdir(q)
+                nextLevel.append(q)
+        level = nextLevel
+        allDirs.extend(nextLevel)
+        cnt['dirs'] += len(nextLevel)
+    for p in rnd.sample(allDirs[1:], min(unreadable, len(allDirs) - 1)):
+        os.chmod(p, 0)
+        cnt['unreadable'] += 1
+    return cnt
+
+
+def make_text(rnd, size):
+    """Return ASCII text of size characters, lines of random words."""
+    if size <= 0:
+        return ''
+    words = [rnd.choice(WORDS[:24]) for i in range(size // 6 + 1)]
+    if rnd.random() < 0.02:
+        words[rnd.randrange(len(words))] = NEEDLE
+    lines = [' '.join(words[i:i+10]) for i in range(0, len(words), 10)]
+    return '\n'.join(lines)[:size]
+
+
+def remove_tree(root):
+    """Remove tree made by make_tree(), including unreadable directories."""
+    # os.walk() lists subdirectories after they are chmod-ed here
+    for dirpath, dirnames, filenames in os.walk(root):
+        for d in dirnames:
+            p = _join(dirpath, d)
+            if not os.path.islink(p):
+                os.chmod(p, 0o755)
+    shutil.rmtree(root)
+
+
+#--- Benchmarks ------------------------------------------------------
+
+def measure(func, repeat=3, memory=True):
+    """Run func() repeat times. func returns number of items. Return
+    (items, best seconds, peak KiB or None)."""
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        n = func()
+        t = time.perf_counter() - t0
+        if best is None or t < best:
+            best = t
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        func()
+        peak = (tracemalloc.get_traced_memory()[1] - base) // 1024
+        tracemalloc.stop()
+    return (n, best, peak)
+
+
+def bench_scan(root):
+    """Yield (name, function) of traversal benchmarks."""
+    def scan(bfs=False, doStat=False, nthreads=0):
+        def run():
+            errs, n = [], 0
+            if nthreads:
+                it = scantree_mt(root, True, None, errs, [], [], (), None, nthreads)
+            else:
+                it = scantree(root, True, None, errs, [], [], (), None, bfs)
+            for (endir, en, isDir) in it:
+                if en is None:
+                    continue
+                n += 1
+                if doStat:
+                    try:
+                        en.stat(follow_symlinks=False)
+                    except OSError:
+                        pass
+            return n
+        return run
+    yield ('scan.dfs', scan())
+    yield ('scan.bfs', scan(bfs=True))
+    yield ('scan.dfs_stat', scan(doStat=True))
+    yield ('scan.threads4', scan(nthreads=4))
+    yield ('scan.threads4_stat', scan(doStat=True, nthreads=4))
+
+
+def bench_names(names):
+    """Yield (name, function) of Name matcher benchmarks."""
+    def match(func, pttrns):
+        def run():
+            n = 0
+            for name in names:
+                if func(name, pttrns):
+                    n += 1
+            return len(names)
+        return run
+    # query strings with 1, 4, and 40 patterns
+    many = '|'.join(['%s%s' %(w, i) for i in range(5) for w in WORDS[:8]])
+    queries = {
+        'Exact':      ('README_3.md', 'README_3.md|main_1.py|notes_7|index_2.html', many),
+        'Contains':   ('data', 'data|main|.py|png', many),
+        'StartsWith': ('Test', 'Test|alpha|main|notes', many),
+        'EndsWith':   ('.py', '.py|.c|.h|.md', many),
+        'WildCard':   ('*.py', '*.py|*.c|test*|*_1?.*', many),
+        'RegExp':     (r'\.(py|c|h)$', r'^(alpha|beta).*\d\.txt$', r'^\w+_\d+\.tar\.gz$'),
+        }
+    for mode in MATCH_MODES:
+        if mode == 'off':
+            continue
+        for ic in (0, 1):
+            for (s, label) in zip(queries[mode], ('1p', '4p', '40p')):
+                pttrns, func, logstr = parse_names(s, mode, ic)
+                yield ('name.%s.%s%s' %(mode, label, '.ic' if ic else ''), match(func, pttrns))
+
+
+def bench_content(files):
+    """Yield (name, function) of filter Content benchmarks."""
+    def search(query, binQuery):
+        def run():
+            for p in files:
+                try:
+                    fltfuncs.flt_ContFile(p, query, binQuery)
+                except OSError:
+                    pass
+            return len(files)
+        return run
+    for (label, mode, ic) in (('Contains', 'Contains', 0), ('Contains.ic', 'Contains', 1),
+                              ('StartsWith', 'StartsWith', 0), ('WildCard', 'WildCard', 0),
+                              ('RegExp', 'RegExp', 0)):
+        s = NEEDLE if mode != 'WildCard' else '*%s*' % NEEDLE
+        if mode == 'StartsWith':
+            s = 'alpha'
+        query, binQuery, logstr = parse_content(s, mode, ic)
+        yield ('content.%s' % label, search(query, binQuery))
+    # raw bytes search, see option CONT_BYTES_SEARCH; not with errors='strict'
+    query, binQuery, logstr = parse_content(NEEDLE, 'Contains', 0, errors='surrogateescape')
+    yield ('content.Contains.bytes', search(query, binQuery))
+
+
+def bench_find(root):
+    """Yield (name, function) of whole FIND benchmarks."""
+    def find(query, needStat=True):
+        def run():
+            finder = find_engine.Finder(dict(query, dirs=[root]), needStat)
+            for r in finder.run(60):
+                pass
+            return finder.cntItems
+        return run
+    yield ('find.all', find({}))
+    yield ('find.all_nostat', find({}, False))
+    yield ('find.name_size', find({'name1': '*.txt|*.py', 'name1_mode': 'WildCard',
+                                   'size_min': '1', 'size_units': 'K'}))
+    yield ('find.content', find({'ext': 'txt|py|c', 'content': NEEDLE, 'content_ic': False}))
+
+
+def bench_results(found):
+    """Yield (name, function) of Results benchmarks. found is list of items
+    yielded by Finder.run()."""
+    def new_store():
+        rs = result_store.ResultStore(COLUMNS, get_ext, bytes2kibi, get_link_to)
+        for r in found:
+            rs.append(*r)
+        return rs
+    store = new_store()
+    n = len(found)
+
+    def append():
+        new_store()
+        return n
+    def rows():
+        store._rowCache.clear()
+        for i in range(n):
+            store[i]
+        return n
+    def sort(col, reverse=False):
+        def run():
+            store.sort([col], reverse)
+            return n
+        return run
+    def copy_path():
+        getD, getN = store.getter('Directory'), store.getter('Name')
+        '\n'.join([_join(getD(i), getN(i)) for i in range(n)])
+        return n
+    def copy_rows():
+        # the same code as c_trvw_copy_rows()
+        store.table_text(range(n), COLUMNS, COLUMNS, [True] * len(COLUMNS))
+        return n
+
+    yield ('results.append', append)
+    yield ('results.rows', rows)
+    for col in ('Name', 'Directory', 'SIZE', 'MTIME', 'Ext'):
+        yield ('results.sort.%s' % col, sort(col))
+    yield ('results.copy_path', copy_path)
+    yield ('results.copy_rows', copy_rows)
+
+
+def bench_display(found):
+    """Yield (name, function) of Treeview benchmarks. Nothing if there is no
+    display."""
+    try:
+        import tkinter as tk
+        import tkinter.ttk as ttk
+        root = tk.Tk()
+    except Exception:
+        return
+    from . import treeview_rows
+    root.withdraw()
+    store = result_store.ResultStore(COLUMNS, get_ext, bytes2kibi, get_link_to)
+    for r in found:
+        store.append(*r)
+    trvw = ttk.Treeview(root, columns=COLUMNS, show='headings')
+    scb = ttk.Scrollbar(root)
+    rowfunc = lambda i: (store[i], ())
+    n = len(store)
+
+    def populate(fullLimit):
+        def run():
+            trvwRows = treeview_rows.TreeviewRows(trvw, scb, rowfunc, fullLimit)
+            trvwRows.set_data(n)
+            root.update_idletasks()
+            trvwRows.set_data(0)
+            return n
+        return run
+    try:
+        yield ('display.virtual', populate(OPT.VIRTUAL_RESULTS_MIN))
+        yield ('display.full', populate(sys.maxsize))
+    finally:
+        root.destroy()
+
+
+def run_all(root, repeat=3, memory=True, only=None, out=sys.stderr):
+    """Run benchmarks on tree root. Return dict of results."""
+    # collect inputs once: names, regular files, found items
+    names, files = [], []
+    for (endir, en, isDir) in scantree(root, True, None, [], [], [], (), None):
+        if en is None:
+            continue
+        names.append(en.name)
+        if not isDir and en.is_file(follow_symlinks=False):
+            files.append(en.path)
+    finder = find_engine.Finder({'dirs': [root]})
+    found = [r for r in finder.run(60) if r]
+
+    benches = (bench_scan(root), bench_names(names), bench_content(files),
+               bench_find(root), bench_results(found), bench_display(found))
+    res = {}
+    for gen in benches:
+        for (name, func) in gen:
+            if only and not re.search(only, name):
+                continue
+            n, t, peak = measure(func, repeat, memory)
+            res[name] = {'items': n, 'seconds': round(t, 6),
+                         'items_per_sec': round(n / t) if t else None, 'peak_kib': peak}
+            out.write('%-28s %9s items %10.4f s %12s items/s %10s KiB\n'
+                      %(name, n, t, res[name]['items_per_sec'], peak if peak is not None else '-'))
+            out.flush()
+    return res
+
+
+def compare(old, new, out=sys.stdout):
+    """Print ratio of items/sec, new to old, for benchmarks in both."""
+    out.write('%-28s %12s %12s %7s\n' %('benchmark', 'old items/s', 'new items/s', 'ratio'))
+    for name in new['results']:
+        if name not in old['results']:
+            continue
+        a, b = old['results'][name]['items_per_sec'], new['results'][name]['items_per_sec']
+        ratio = '%.2f' %(b / a) if a and b else '-'
+        out.write('%-28s %12s %12s %7s\n' %(name, a, b, ratio))
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog='kintterFind_bench.py',
+                description='Benchmark kintterFind on a synthetic directory tree.')
+    parser.add_argument('--depth', type=int, default=4, help='levels of subdirectories (default: 4)')
+    parser.add_argument('--fanout', type=int, default=5, help='subdirectories per directory (default: 5)')
+    parser.add_argument('--files', type=int, default=20, help='files per directory (default: 20)')
+    parser.add_argument('--size-min', type=int, default=0, help='min file size, bytes (default: 0)')
+    parser.add_argument('--size-max', type=int, default=8192, help='max file size, bytes (default: 8192)')
+    parser.add_argument('--symlinks', type=float, default=0.05, help='fraction of symbolic links (default: 0.05)')
+    parser.add_argument('--unreadable', type=int, default=2, help='number of unreadable directories (default: 2)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed (default: 1)')
+    parser.add_argument('--tree', metavar='DIR',
+                        help='make the tree in DIR and keep it; if DIR is not empty, use the tree in it')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each benchmark, best is reported (default: 3)')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure peak memory')
+    parser.add_argument('--only', metavar='REGEXP', help='run only benchmarks with matching names')
+    parser.add_argument('--output', metavar='FILE', help='write JSON results to FILE instead of stdout')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two JSON result files')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        try:
+            old, new = [json.load(open(p, encoding='utf-8')) for p in args.compare]
+        except (OSError, ValueError) as e:
+            sys.stderr.write('kintterFind_bench: cannot read results:%s\n' % find_engine.e_info(e))
+            return 2
+        compare(old, new)
+        return 0
+
+    params = {'depth': args.depth, 'fanout': args.fanout, 'files': args.files,
+              'size_min': args.size_min, 'size_max': args.size_max,
+              'symlinks': args.symlinks, 'unreadable': args.unreadable, 'seed': args.seed}
+    root, keep = args.tree, bool(args.tree)
+    if root:
+        root = os.path.abspath(root)
+        os.makedirs(root, exist_ok=True)
+    else:
+        root = tempfile.mkdtemp(prefix='kintterFind_bench_')
+    try:
+        tree = None
+        if not os.listdir(root):
+            t0 = time.perf_counter()
+            tree = make_tree(root, args.depth, args.fanout, args.files, args.size_min,
+                             args.size_max, args.symlinks, args.unreadable, args.seed)
+            sys.stderr.write('tree: %s\n    %s, made in %.1f s\n' %(root, tree, time.perf_counter() - t0))
+        else:
+            sys.stderr.write('tree: %s (existing)\n' % root)
+        if hasattr(os, 'geteuid') and os.geteuid() == 0:
+            sys.stderr.write('running as root: unreadable directories are readable\n')
+        results = run_all(root, args.repeat, not args.no_memory, args.only)
+    finally:
+        if not keep:
+            remove_tree(root)
+
+    meta = {'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': sys.version.split()[0],
+            'platform': platform.platform(), 'cpus': os.cpu_count(),
+            # parameters of an existing tree are not known
+            'tree': params if tree else {'dir': root},
+            'counts': tree, 'repeat': args.repeat,
+            'options': {o: getattr(OPT, o) for o in ('SCAN_THREADS', 'FILTER_REORDER',
+                                                     'CONT_BYTES_SEARCH', 'CONT_PROCESSES')}}
+    try:
+        import resource
+        # KiB on Linux, bytes on macOS
+        meta['maxrss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        pass
+    data = json.dumps({'meta': meta, 'results': results}, indent=1, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(data + '\n')
+    else:
+        sys.stdout.write(data + '\n')
+    return 0
+
+
+# The End
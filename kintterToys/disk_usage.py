@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+"""
+Disk usage of directories, for FIND mode "disk usage" of kintterFind. Usage:
+    from . import disk_usage
+    finder = disk_usage.DuFinder(find_engine.Finder(query, True, ...))
+    for item in finder.run(interval): ...
+
+DuFinder has the same interface as find_engine.Finder. Like du, it sums sizes
+of the items found by the Finder per directory: apparent size (st_size) and
+allocated size (st_blocks * 512, the disk space actually used). It yields the
+DU_TOP directories with the largest allocated size, largest first, as items of
+file type 'd' whose st_size is the total apparent size, with a 6th value: dict
+{'Disk': total allocated size}, see result_store.VALUE_COLUMNS. Totals include
+everything below the directory, and the directory itself if it was found.
+
+Filters select the items that are counted, e.g., with Name "*.mp4" the totals
+are sizes of .mp4 files. Skipped dirs are not counted. Without filters the
+totals are the same as those of "du -s" (input directories are counted too).
+
+Sizes are summed in one pass, bottom-up. The Finder yields items in depth-first
+order (Finder.depthFirst), so a directory is complete as soon as an item
+outside of it is found; its total is then added to its parent. Only the
+directories on the current path are kept, one running total per depth level,
+and a heap of the DU_TOP largest directories. Files with several hard links
+are counted once: (st_dev, st_ino) of such files are remembered.
+"""
+
+import os
+import stat
+from heapq import heappush, heapreplace
+
+from . import kintterFind_options as OPT
+from .find_engine import bytes2kibi
+
+_sep = os.sep
+_join = os.path.join
+_stat_result = os.stat_result
+
+
+def allocated(st):
+    """Return disk space used by file with stat result st, in bytes."""
+    # no st_blocks on Windows
+    blocks = getattr(st, 'st_blocks', None)
+    return st.st_size if blocks is None else blocks * 512
+
+
+class DuFinder:
+    """Disk usage of directories from the items found by finder."""
+
+    def __init__(self, finder):
+        # finder -- find_engine.Finder, must yield items with stat result
+        #     (needStat=True)
+        finder.depthFirst = True
+        self.finder = finder
+        self.roots = [i[0] for i in finder.inputDirs]
+        # without filters everything is counted, also input directories
+        self.countRoots = not finder.fltSpec.active()
+        self.log = finder.log + ['Disk usage: %s largest directories by allocated size' % max(OPT.DU_TOP, 1)]
+        self.cntFound = 0 # directories yielded
+        self.cntHardLinks = 0 # hard links not counted again
+        self.totals = [] # (root directory, apparent size, allocated size)
+        self.stage = 'searching...'
+
+    # counters of the Finder
+    cntItems = property(lambda self: self.finder.cntItems)
+    cntDirs = property(lambda self: self.finder.cntDirs)
+    cntBinary = property(lambda self: self.finder.cntBinary)
+
+    def run(self, interval=0.5, first=None):
+        """Generator. Yield the largest directories at the end, and None every
+        interval seconds."""
+        nTop = max(OPT.DU_TOP, 1)
+        # heap -- (allocated, apparent, n, path, stat result or None), smallest first
+        heap, n = [], 0
+        # stack -- [path, apparent, allocated, stat result or None] for each
+        #   directory on the current path
+        stack = []
+        # (st_dev, st_ino) of counted files with several hard links
+        seen = set()
+
+        def close_dir():
+            """Current directory is complete: add it to its parent and to heap."""
+            nonlocal n
+            path, size, alloc, st = stack.pop()
+            if stack:
+                parent = stack[-1]
+                parent[1] += size
+                parent[2] += alloc
+            else:
+                self.totals.append((path, size, alloc))
+            n += 1
+            if len(heap) < nTop:
+                heappush(heap, (alloc, size, n, path, st))
+            elif alloc > heap[0][0]:
+                heapreplace(heap, (alloc, size, n, path, st))
+
+        def enter_dir(d):
+            """Make d the current directory: close directories that do not
+            contain d, open directories down to d."""
+            while stack:
+                p = stack[-1][0]
+                if d == p or d.startswith(p if p.endswith(_sep) else p + _sep):
+                    break
+                close_dir()
+            if stack:
+                p = stack[-1][0]
+            else:
+                p = d
+                for r in self.roots:
+                    if d.startswith(r if r.endswith(_sep) else r + _sep):
+                        p = r
+                        break
+                stack.append([p, 0, 0, None])
+                if self.countRoots:
+                    try:
+                        st = os.lstat(p)
+                        stack[-1][1:] = [st.st_size, allocated(st), st]
+                    except OSError:
+                        pass
+            if d != p:
+                for name in d[len(p):].strip(_sep).split(_sep):
+                    p = _join(p, name)
+                    stack.append([p, 0, 0, None])
+
+        found = self.finder.run(interval, first=first)
+        try:
+            for item in found:
+                if item is None:
+                    yield None
+                    continue
+                ft, d, name, st = item[:4]
+                if not stack or stack[-1][0] != d:
+                    enter_dir(d)
+                if st is None:
+                    continue
+                if ft == 'd':
+                    # items in this directory come next
+                    stack.append([_join(d, name), st.st_size, allocated(st), st])
+                    continue
+                if st.st_nlink > 1:
+                    k = (st.st_dev, st.st_ino)
+                    if k in seen:
+                        self.cntHardLinks += 1
+                        continue
+                    seen.add(k)
+                cur = stack[-1]
+                cur[1] += st.st_size
+                cur[2] += allocated(st)
+        finally:
+            found.close()
+        while stack:
+            close_dir()
+        seen = None
+
+        # largest first
+        heap.sort(reverse=True)
+        for (alloc, size, x, path, st) in heap:
+            if st is None:
+                try:
+                    st = os.lstat(path)
+                except OSError:
+                    st = _stat_result((stat.S_IFDIR, 0, 0, 0, 0, 0, 0, 0, 0, 0))
+            # from attributes: st may be file_index.IndexStat
+            st = _stat_result((st.st_mode, st.st_ino, st.st_dev, st.st_nlink, st.st_uid, st.st_gid,
+                               size, st.st_atime, st.st_mtime, st.st_ctime))
+            d, name = os.path.split(path)
+            self.cntFound += 1
+            yield ('d', d, name, st, '', {'Disk': alloc})
+
+    def errors(self):
+        """Return number of errors as string for status messages."""
+        return self.finder.errors()
+
+    def phase_rows(self):
+        """Return time of phases of FIND, see find_engine.Finder.phase_rows().
+        Summing is done by the caller of the Finder."""
+        return self.finder.phase_rows()
+
+    def report(self):
+        """Return lines for the Log after the end of FIND."""
+        res = self.finder.report()
+        res.append('')
+        for (path, size, alloc) in self.totals:
+            res.append('Disk usage: %s allocated, %s apparent size: %s'
+                       %(bytes2kibi(alloc), bytes2kibi(size), path))
+        if self.cntHardLinks:
+            res.append('Hard links to files already counted: %s' % self.cntHardLinks)
+        return res
+
+# The End
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""
+Duplicate files among FIND results, for mode "duplicates" of kintterFind.
+Usage:
+    from . import duplicates
+    finder = duplicates.DupFinder(find_engine.Finder(query, True, ...))
+    for item in finder.run(interval): ...
+
+DupFinder has the same interface as find_engine.Finder. It takes found
+regular files from the Finder and yields only files whose content is the same
+as that of another found file. Each item has a 6th value: dict with the group
+ID, {'Group': N}, see result_store.VALUE_COLUMNS. Files with the same content
+have the same group ID. Groups are numbered by size of files, largest first.
+
+Candidates are narrowed in stages, each stage reads more of fewer files:
+    1. same size (st_size); empty files are ignored, see option DUP_MIN_SIZE
+    2. same hash of the first and the last block (BLOCK bytes each); files not
+       larger than 2*BLOCK are read whole at this stage
+    3. same hash of the whole file
+Files are hashed in a pool of DUP_THREADS threads: reading and hashing release
+the GIL. Hard links to the same file, same (st_dev, st_ino), are hashed once.
+They are all shown in the group, but a group must have at least two different
+files (inodes): hard links alone are not duplicates.
+"""
+
+import os, time, hashlib
+from collections import defaultdict
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
+
+from . import kintterFind_options as OPT
+from .find_engine import bytes2kibi
+
+_time = time.time
+_join = os.path.join
+
+# bytes hashed at the start and at the end of file in stage 2
+BLOCK = 64 * 1024
+# bytes read at once in stage 3
+CHUNK = 1024 * 1024
+
+# blake2b is fast on 64-bit CPUs; Python >=3.6
+_hash = getattr(hashlib, 'blake2b', hashlib.sha1)
+
+
+def hash_ends(task):
+    """Return (task, hash of the first and the last BLOCK of file, bytes read).
+    task is (key, path, size); hash is error message on error."""
+    key, path, size = task
+    h = _hash()
+    try:
+        with open(path, 'rb') as f:
+            h.update(f.read(BLOCK))
+            if size > BLOCK:
+                if size > 2 * BLOCK:
+                    f.seek(-BLOCK, 2)
+                h.update(f.read(BLOCK))
+    except OSError as e:
+        return (task, '%s: %s' %(e.__class__.__name__, e), 0)
+    return (task, h.digest(), min(size, 2 * BLOCK))
+
+
+def hash_file(task):
+    """Return (task, hash of the whole file, bytes read), see hash_ends()."""
+    key, path, size = task
+    h = _hash()
+    n = 0
+    try:
+        with open(path, 'rb') as f:
+            for b in iter(lambda: f.read(CHUNK), b''):
+                h.update(b)
+                n += len(b)
+    except OSError as e:
+        return (task, '%s: %s' %(e.__class__.__name__, e), n)
+    return (task, h.digest(), n)
+
+
+class DupFinder:
+    """Duplicate files among the items found by finder."""
+
+    def __init__(self, finder):
+        # finder -- find_engine.Finder or find_daemon.RemoteFinder, must
+        #     yield items with stat result (needStat=True)
+        self.finder = finder
+        self.log = finder.log + ['Duplicates: same size, hash of first and last %s K, hash of file;'
+                                 ' %s threads, min size %s' %(BLOCK // 1024, max(OPT.DUP_THREADS, 1),
+                                                              OPT.DUP_MIN_SIZE)]
+        self.cntFound = 0 # duplicate files yielded
+        self.cntGroups = 0
+        self.cntHashed, self.bytesHashed, self.tHash = 0, 0, 0.0
+        self.stage = 'searching...'
+        self.logErrs = []
+
+    # counters of the Finder
+    cntItems = property(lambda self: self.finder.cntItems)
+    cntDirs = property(lambda self: self.finder.cntDirs)
+    cntBinary = property(lambda self: self.finder.cntBinary)
+
+    def run(self, interval=0.5, first=None):
+        """Generator. Yield found duplicates, and None every interval seconds."""
+        # bySize -- size: list of found items
+        bySize = defaultdict(list)
+        minSize = max(OPT.DUP_MIN_SIZE, 1)
+        found = self.finder.run(interval, first=first)
+        try:
+            for item in found:
+                if item is None:
+                    yield None
+                elif item[0] == '-' and item[3] is not None and item[3].st_size >= minSize:
+                    bySize[item[3].st_size].append(item)
+        finally:
+            found.close()
+
+        # stage 1: same size, at least two different files
+        # byKey -- (size, file key): items, file key is (st_dev, st_ino)
+        byKey = {}
+        for (size, items) in bySize.items():
+            if len(items) < 2:
+                continue
+            keys = defaultdict(list)
+            for item in items:
+                st = item[3]
+                # st_ino is 0 if not known: every path is a different file
+                keys[(st.st_dev, st.st_ino) if st.st_ino else _join(item[1], item[2])].append(item)
+            if len(keys) < 2:
+                continue
+            for (k, v) in keys.items():
+                byKey[(size, k)] = v
+        bySize = None
+
+        tHash = _time()
+        pool = ThreadPool(max(OPT.DUP_THREADS, 1))
+        try:
+            # stage 2: same size and hash of ends
+            tasks = [(k, _join(v[0][1], v[0][2]), k[0]) for (k, v) in byKey.items()]
+            ends = yield from self._hash_stage(pool, tasks, hash_ends, interval, 'first and last blocks')
+            # files not larger than 2*BLOCK were hashed whole
+            groups = [grp for grp in ends if grp[0][2] <= 2 * BLOCK]
+            # stage 3: same hash of the whole file
+            tasks = [t for grp in ends if grp[0][2] > 2 * BLOCK for t in grp]
+            groups.extend((yield from self._hash_stage(pool, tasks, hash_file, interval, 'whole files')))
+        finally:
+            # normal end, or generator was closed (FIND cancelled)
+            pool.terminate()
+            self.tHash = _time() - tHash
+
+        # largest files first
+        groups.sort(key=lambda grp: (-grp[0][2], grp[0][1]))
+        for grp in groups:
+            self.cntGroups += 1
+            values = {'Group': self.cntGroups}
+            items = [item for task in grp for item in byKey[task[0]]]
+            items.sort(key=lambda item: (item[1], item[2]))
+            for item in items:
+                self.cntFound += 1
+                yield item + (values,)
+
+    def _hash_stage(self, pool, tasks, func, interval, what):
+        """Generator. Hash tasks in pool with func, yield None every interval
+        seconds. Return groups of tasks with the same size and hash that have
+        at least two tasks, tasks are (key, path, size)."""
+        byHash = defaultdict(list)
+        n = len(tasks)
+        self.stage = 'hashing %s: 0 of %s...' %(what, n)
+        tNext = _time() + interval
+        # only the iterator with chunksize 1 has next(timeout)
+        it = pool.imap_unordered(func, tasks)
+        i = 0
+        while i < n:
+            try:
+                task, h, nbytes = it.next(max(tNext - _time(), 0))
+            except TimeoutError:
+                task = None
+            if _time() >= tNext:
+                self.stage = 'hashing %s: %s of %s...' %(what, i, n)
+                tNext = _time() + interval
+                yield None
+            if task is None:
+                continue
+            i += 1
+            self.cntHashed += 1
+            self.bytesHashed += nbytes
+            if isinstance(h, str):
+                self.logErrs.append('%s:\n    %s' %(task[1], h))
+                continue
+            byHash[(task[2], h)].append(task)
+        return [grp for grp in byHash.values() if len(grp) > 1]
+
+    def errors(self):
+        """Return number of errors as string for status messages."""
+        e = self.finder.errors()
+        return '%s, %s hashing' %(e, len(self.logErrs)) if self.logErrs else e
+
+    def phase_rows(self):
+        """Return time of phases of FIND, see find_engine.Finder.phase_rows()."""
+        rows = list(self.finder.phase_rows())
+        if self.cntHashed:
+            rows.append(('duplicates: hashing', self.cntHashed, self.tHash, False,
+                         '%s read' % bytes2kibi(self.bytesHashed)))
+        return rows
+
+    def report(self):
+        """Return lines for the Log after the end of FIND."""
+        res = self.finder.report()
+        if self.logErrs:
+            res.append('\n**OSError** (during hashing of files)')
+            res.extend(sorted(self.logErrs))
+        res.append('\nDuplicates: %s files in %s groups. Hashed %s files, %s read.'
+                   %(self.cntFound, self.cntGroups, self.cntHashed, bytes2kibi(self.bytesHashed)))
+        return res
+
+# The End
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent file index for kintterFind. Usage:
+    from . import file_index
+    fileIndex = file_index.FileIndex(dbpath)
+    for en in fileIndex.scandir(dirpath): ...
+    fileIndex.close()
+
+The index is an SQLite database that stores directory listings: for each
+directory its path and (st_mtime_ns, st_ctime_ns), for each item in it the name,
+file type and lstat() fields.
+
+FileIndex.scandir() is a replacement for os.scandir(). The directory is
+lstat()-ed first. If its mtime and ctime did not change since it was recorded,
+the listing comes from the index and no scandir() or stat() calls are made for
+its items. Otherwise the directory is scanned and the index is updated. Thus
+only changed directories are re-scanned.
+
+NOTE: Modifying a file does not change mtime of its directory. Size and
+timestamps of items in unchanged directories are the values recorded when the
+directory was last scanned.
+"""
+
+import os
+import sqlite3
+from stat import filemode
+
+# os.scandir() is available in Python >=3.5
+_scandir = getattr(os, 'scandir', None)
+if not _scandir:
+    import scandir
+    _scandir = scandir.scandir
+
+_fsencode, _fsdecode = os.fsencode, os.fsdecode
+_join = os.path.join
+_sep = os.sep
+
+# Increment when the schema changes. Old index is then discarded.
+INDEX_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE dirs (
+    id INTEGER PRIMARY KEY,
+    path BLOB UNIQUE NOT NULL,
+    mtime_ns INTEGER,
+    ctime_ns INTEGER);
+CREATE TABLE entries (
+    dir INTEGER NOT NULL,
+    name BLOB NOT NULL,
+    ft TEXT, size INTEGER, mtime REAL, ctime REAL, atime REAL,
+    mode INTEGER, uid INTEGER, gid INTEGER, nlink INTEGER, ino INTEGER, dev INTEGER,
+    blocks INTEGER);
+CREATE INDEX entries_dir ON entries(dir);
+"""
+
+# columns of table entries after name; MUST match IndexStat.from_row()
+_ENTRY_COLS = 'ft, size, mtime, ctime, atime, mode, uid, gid, nlink, ino, dev, blocks'
+
+
+class IndexStat:
+    """Stat result of an index entry. Has the st_* attributes used by
+    kintterFind, and the 10 items of os.stat_result as a sequence."""
+    __slots__ = ('st_size', 'st_mtime', 'st_ctime', 'st_atime', 'st_mode',
+                 'st_uid', 'st_gid', 'st_nlink', 'st_ino', 'st_dev', 'st_blocks')
+
+    @classmethod
+    def from_row(cls, row):
+        st = cls()
+        (st.st_size, st.st_mtime, st.st_ctime, st.st_atime, st.st_mode,
+         st.st_uid, st.st_gid, st.st_nlink, st.st_ino, st.st_dev, st.st_blocks) = row
+        return st
+
+    # sequence like os.stat_result: code that indexes or slices stat results
+    # works with index entries too
+    def _seq(self):
+        return (self.st_mode, self.st_ino, self.st_dev, self.st_nlink, self.st_uid, self.st_gid,
+                self.st_size, int(self.st_atime), int(self.st_mtime), int(self.st_ctime))
+
+    def __getitem__(self, i):
+        return self._seq()[i]
+
+    def __len__(self):
+        return 10
+
+
+class IndexEntry:
+    """Item of directory listing from the index. Mimics os.DirEntry."""
+    __slots__ = ('name', 'path', '_ft', '_st')
+
+    def __init__(self, dirpath, name, ft, st):
+        self.name = name
+        self.path = _join(dirpath, name)
+        self._ft = ft
+        self._st = st
+
+    def is_dir(self, follow_symlinks=True):
+        if follow_symlinks and self._ft == 'l':
+            return os.path.isdir(self.path)
+        return self._ft == 'd'
+
+    def is_file(self, follow_symlinks=True):
+        if follow_symlinks and self._ft == 'l':
+            return os.path.isfile(self.path)
+        return self._ft == '-'
+
+    def is_symlink(self):
+        return self._ft == 'l'
+
+    def stat(self, follow_symlinks=True):
+        if follow_symlinks and self._ft == 'l':
+            return os.stat(self.path)
+        return self._st
+
+    def inode(self):
+        return self._st.st_ino
+
+    def __repr__(self):
+        return '<IndexEntry %r>' % self.name
+
+
+class FileIndex:
+    """Persistent index of directory listings in SQLite database file dbpath."""
+
+    def __init__(self, dbpath):
+        self.dbpath = dbpath
+        d = os.path.dirname(dbpath)
+        if d and not os.path.isdir(d):
+            os.makedirs(d)
+        self.conn = sqlite3.connect(dbpath, timeout=30)
+        # this is a cache, it can be rebuilt if lost
+        self.conn.execute('PRAGMA synchronous=OFF')
+        ver = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if ver != INDEX_VERSION:
+            self.conn.executescript('DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS dirs;')
+            self.conn.executescript(SCHEMA)
+            self.conn.execute('PRAGMA user_version=%d' % INDEX_VERSION)
+            self.conn.commit()
+        # number of directories listed from index and (re)scanned
+        self.cntHits, self.cntMisses = 0, 0
+
+    def close(self):
+        """Save changes and close the database."""
+        if self.conn:
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
+
+    def scandir(self, dirpath):
+        """Return iterator over items in directory dirpath, like os.scandir().
+        Raise OSError if directory cannot be listed."""
+        # raises OSError for inaccessible directory, like scandir()
+        st = os.stat(dirpath, follow_symlinks=False)
+        conn = self.conn
+        bpath = _fsencode(dirpath)
+        row = conn.execute('SELECT id, mtime_ns, ctime_ns FROM dirs WHERE path=?', (bpath,)).fetchone()
+        if row and row[1] == st.st_mtime_ns and row[2] == st.st_ctime_ns:
+            self.cntHits += 1
+            res = []
+            for r in conn.execute('SELECT name, %s FROM entries WHERE dir=?' % _ENTRY_COLS, (row[0],)):
+                res.append(IndexEntry(dirpath, _fsdecode(r[0]), r[1], IndexStat.from_row(r[2:])))
+            return iter(res)
+
+        self.cntMisses += 1
+        res, recs, subdirs, complete = [], [], set(), True
+        for en in _scandir(dirpath):
+            try:
+                st_ = en.stat(follow_symlinks=False)
+            except OSError:
+                # let caller handle it; do not record this listing
+                res.append(en)
+                complete = False
+                continue
+            ft = filemode(st_.st_mode)[0]
+            if ft == 'd':
+                subdirs.add(en.name)
+            stRow = (st_.st_size, st_.st_mtime, st_.st_ctime, st_.st_atime, st_.st_mode,
+                     st_.st_uid, st_.st_gid, st_.st_nlink, st_.st_ino, st_.st_dev,
+                     getattr(st_, 'st_blocks', 0))
+            recs.append((_fsencode(en.name), ft) + stRow)
+            res.append(IndexEntry(dirpath, en.name, ft, IndexStat.from_row(stRow)))
+
+        if row:
+            dirID = row[0]
+            # forget subdirectories that no longer exist
+            for (name,) in conn.execute("SELECT name FROM entries WHERE dir=? AND ft='d'", (dirID,)):
+                if _fsdecode(name) not in subdirs:
+                    self.forget_tree(_join(dirpath, _fsdecode(name)))
+            conn.execute('DELETE FROM entries WHERE dir=?', (dirID,))
+        if not complete:
+            if row:
+                conn.execute('DELETE FROM dirs WHERE id=?', (dirID,))
+            return iter(res)
+        if row:
+            conn.execute('UPDATE dirs SET mtime_ns=?, ctime_ns=? WHERE id=?',
+                         (st.st_mtime_ns, st.st_ctime_ns, dirID))
+        else:
+            dirID = conn.execute('INSERT INTO dirs (path, mtime_ns, ctime_ns) VALUES (?,?,?)',
+                                 (bpath, st.st_mtime_ns, st.st_ctime_ns)).lastrowid
+        conn.executemany('INSERT INTO entries VALUES (%s,?,%s)' % (dirID, ','.join('?'*12)), recs)
+        return iter(res)
+
+    def forget_tree(self, dirpath):
+        """Remove directory dirpath and all directories under it from the index."""
+        bpath = _fsencode(dirpath)
+        bpref = _fsencode(dirpath if dirpath.endswith(_sep) else dirpath + _sep)
+        conn = self.conn
+        ids = [r[0] for r in conn.execute('SELECT id FROM dirs WHERE path=? OR substr(path, 1, ?)=?',
+                                          (bpath, len(bpref), bpref))]
+        for dirID in ids:
+            conn.execute('DELETE FROM entries WHERE dir=?', (dirID,))
+            conn.execute('DELETE FROM dirs WHERE id=?', (dirID,))
+
+
+# The End
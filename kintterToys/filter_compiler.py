@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+
+"""
+Filter compiler for kintterFind. Usage:
+    from . import filter_compiler
+    spec = filter_compiler.FilterSpec()
+    spec.name1 = (fltfuncs.flt_NameContains1, 'foo', True)
+    ...
+    match = filter_compiler.compile_filter(spec, logErrs)
+    for (endir, en, isDir) in scanner:
+        r = match(en, isDir)
+        if r is None: continue
+        enft, enstat = r
+
+FilterSpec holds parsed filter configuration: the filters Name, Path, Type,
+Size, Time, Misc. compile_filter() generates the source of one function that
+contains only the checks of active filters, with all constants (Yes/Not,
+IgnoreCase, which DirEntry methods to call) resolved, and compiles it. The
+function accepts DirEntry en and returns None if en is rejected, otherwise
+(file type, stat result):
+    file type   -- '' if not known yet, '-', 'd', 'l', 'o' (other)
+    stat result -- None if en.stat() was not called
+en.stat() is called once, before the first check that needs it. OSError from
+DirEntry methods is appended to logErrs and en is rejected.
+
+AdaptiveFilter finds a faster order of checks. It first counts how many items
+each check rejects, then orders the checks by estimated cost and measured
+selectivity. The set of accepted items does not depend on the order.
+"""
+
+from stat import filemode
+
+# Names of checks in default order (order of filter tabs).
+# 'regular' rejects items other than regular files, it is needed by filter
+# Content, which is not compiled.
+CHECKS = ('name1', 'name2', 'path1', 'path2', 'ext', 'ft',
+          'size', 'time', 'uid', 'gid', 'nlink', 'mode', 'regular')
+
+# checks that need stat result
+STAT_CHECKS = ('size', 'time', 'uid', 'gid', 'nlink', 'mode')
+
+# Estimated cost of checks, relative. The first check that needs stat result
+# also pays for en.stat(), which is not included.
+COSTS = {'name1': 1, 'name2': 1, 'path1': 2, 'path2': 2, 'ext': 1,
+         'ft': 2, 'regular': 2,
+         'size': 1, 'time': 1, 'uid': 1, 'gid': 1, 'nlink': 1, 'mode': 3}
+# cost is multiplied by this for RegExp queries
+REGEXP_COST = 4
+
+# Checks are ordered within these groups, groups are never reordered:
+# names (no system calls), file type (may need lstat), stat result.
+GROUPS = (('name1', 'name2', 'path1', 'path2', 'ext'),
+          ('ft', 'regular'),
+          STAT_CHECKS)
+
+# number of items AdaptiveFilter counts before choosing order
+SAMPLE_SIZE = 2000
+
+_NOMATCH = '        return None'
+
+
+class FilterSpec:
+    """Parsed filter configuration. None means the filter is off.
+    yes is False for Not-filters (e.g., "Not Name")."""
+
+    def __init__(self):
+        self.name1 = None   # (filter func, query, yes); called as func(en.name, query)
+        self.name2 = None
+        self.path1 = None   # (filter func, query, yes); called as func(en.path, query)
+        self.path2 = None
+        self.ext = None     # (dict or set of casefolded '.ext', yes)
+        self.ft = None      # dict or set of file types: '-', 'd', 'l', 'o'
+        self.size = None    # func(stat result), see fltfuncs.make_comp_func()
+        self.time = None    # func(stat result)
+        self.uid = None     # (set of ints, yes)
+        self.gid = None
+        self.nlink = None   # int, NLINK must be greater
+        self.mode = None    # (filter func, query, yes); called as func(filemode(st_mode), query)
+        self.regular = None # True to reject items other than regular files
+
+    def active(self):
+        """Return names of active checks in default order."""
+        return [c for c in CHECKS if getattr(self, c) is not None]
+
+
+def _yes_test(expr, yes):
+    """Return condition that rejects: expr is the test of a filter."""
+    return ('if not %s:' if yes else 'if %s:') % expr
+
+
+def order_checks(spec, order=None):
+    """Return names of active checks in order."""
+    checks = spec.active()
+    if order is not None:
+        # checks missing from order keep default order after it
+        checks = [c for c in order if c in checks] + [c for c in checks if c not in order]
+    return checks
+
+
+def compile_source(spec, order=None, counters=False):
+    """Return (source of function match(en, isDir), namespace for exec).
+    If counters, the function increments cnt[k] when it reaches k-th check,
+    and cnt[-1] when it accepts the item."""
+    checks = order_checks(spec, order)
+
+    ns = {'filemode': filemode, 'logErrs': None}
+    body = []
+    add = body.append
+    hasName, hasFT, hasStat = False, False, False
+
+    for k, c in enumerate(checks):
+        if counters:
+            add('    cnt[%s] += 1' % k)
+        v = getattr(spec, c)
+        if c in ('name1', 'name2', 'path1', 'path2', 'mode'):
+            func, query, yes = v
+            ns['f_' + c], ns['q_' + c] = func, query
+            if c.startswith('name'):
+                if not hasName:
+                    add('    enname = en.name')
+                    hasName = True
+                arg = 'enname'
+            elif c.startswith('path'):
+                arg = 'en.path'
+            else:
+                arg = 'filemode(enstat.st_mode)'
+        elif c in ('ext', 'uid', 'gid'):
+            query, yes = v
+            ns['q_' + c] = query
+        elif c in ('size', 'time'):
+            ns['f_' + c] = v
+        elif c == 'ft':
+            ns['q_ft'] = v
+        elif c == 'nlink':
+            ns['q_nlink'] = v
+
+        if c in STAT_CHECKS and not hasStat:
+            add('    try:')
+            add('        enstat = en.stat(follow_symlinks=False)')
+            add('    except OSError as e:')
+            add('        logErrs.append(str(e))')
+            add(_NOMATCH)
+            hasStat = True
+
+        if c in ('name1', 'name2', 'path1', 'path2', 'mode'):
+            add('    ' + _yes_test('f_%s(%s, q_%s)' % (c, arg, c), yes))
+            add(_NOMATCH)
+        elif c == 'ext':
+            if not hasName:
+                add('    enname = en.name')
+                hasName = True
+            add("    j = enname.rfind('.')")
+            add("    enext = enname[j:].casefold() if j > 0 else ''")
+            add('    ' + _yes_test('enext in q_ext', yes))
+            add(_NOMATCH)
+        elif c == 'ft' and hasFT:
+            # after 'regular'
+            add('    if enft not in q_ft:')
+            add(_NOMATCH)
+        elif c == 'ft':
+            add("    if isDir: enft = 'd'")
+            add('    else:')
+            add('        try:')
+            add("            if en.is_file(follow_symlinks=False): enft = '-'")
+            add("            elif en.is_symlink(): enft = 'l'")
+            add("            else: enft = 'o'")
+            add('        except OSError as e:')
+            add('            logErrs.append(str(e))')
+            add('            return None')
+            add('    if enft not in q_ft:')
+            add(_NOMATCH)
+            hasFT = True
+        elif c in ('size', 'time'):
+            add('    if not f_%s(enstat):' % c)
+            add(_NOMATCH)
+        elif c in ('uid', 'gid'):
+            add('    ' + _yes_test('enstat.st_%s in q_%s' % (c, c), yes))
+            add(_NOMATCH)
+        elif c == 'nlink':
+            add('    if enstat.st_nlink <= q_nlink:')
+            add(_NOMATCH)
+        elif c == 'regular':
+            if hasFT:
+                add("    if enft != '-':")
+                add(_NOMATCH)
+            else:
+                add('    if isDir:')
+                add(_NOMATCH)
+                add('    try:')
+                add('        if not en.is_file(follow_symlinks=False):')
+                add('            return None')
+                add('    except OSError as e:')
+                add('        logErrs.append(str(e))')
+                add(_NOMATCH)
+                add("    enft = '-'")
+                hasFT = True
+
+    if counters:
+        add('    cnt[-1] += 1')
+    add('    return (%s, %s)' % ('enft' if hasFT else "''", 'enstat' if hasStat else 'None'))
+    src = 'def match(en, isDir):\n%s\n' % '\n'.join(body)
+    return (src, ns)
+
+
+def compile_filter(spec, logErrs, order=None, cnt=None):
+    """Return function match(en, isDir) for filter configuration spec.
+    order is list of check names to use instead of default order.
+    cnt is list of counters, see compile_source()."""
+    src, ns = compile_source(spec, order, cnt is not None)
+    ns['logErrs'], ns['cnt'] = logErrs, cnt
+    exec(compile(src, '<kintterFind filter>', 'exec'), ns)
+    match = ns['match']
+    match.source = src
+    return match
+
+
+class AdaptiveFilter:
+    """Filter function that changes order of checks after sampling. Usage:
+        fltAdapt = AdaptiveFilter(spec, logErrs)
+        match = fltAdapt.match
+        ...
+        if fltAdapt.ready():
+            match = fltAdapt.optimize()
+    """
+
+    def __init__(self, spec, logErrs, sampleSize=SAMPLE_SIZE):
+        self.spec, self.logErrs = spec, logErrs
+        self.sampleSize = sampleSize
+        self.order = order_checks(spec)
+        self.optimized = False
+        # cnt[k] -- number of items that reached k-th check; cnt[-1] -- accepted
+        self.cnt = [0] * (len(self.order) + 1)
+        self.match = compile_filter(spec, logErrs, self.order, self.cnt)
+
+    def ready(self):
+        """Return True if enough items were counted and order is not chosen yet."""
+        return not self.optimized and self.cnt[0] >= self.sampleSize
+
+    def pass_rates(self):
+        """Return {check name: fraction of items that passed it}.
+        Smoothed, so that checks reached by few items get about 0.5."""
+        cnt = self.cnt
+        return {c: (cnt[k+1] + 1) / (cnt[k] + 2) for k, c in enumerate(self.order)}
+
+    def cost(self, c):
+        v = getattr(self.spec, c)
+        cost = COSTS[c]
+        if c in ('name1', 'name2', 'path1', 'path2', 'mode') and hasattr(v[1], 'pattern'):
+            cost *= REGEXP_COST
+        return cost
+
+    def optimize(self):
+        """Choose order of checks from counts. Return new function match()."""
+        # For independent checks, expected cost is minimal when they are sorted
+        # by cost / (fraction of rejected items).
+        rates = self.pass_rates()
+        order = []
+        for g in GROUPS:
+            checks = [c for c in self.order if c in g]
+            checks.sort(key=lambda c: self.cost(c) / (1.0 - rates[c]))
+            order.extend(checks)
+        self.order = order
+        self.optimized = True
+        self.match = compile_filter(self.spec, self.logErrs, order)
+        return self.match
+
+
+# The End
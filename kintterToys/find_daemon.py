@@ -0,0 +1,587 @@
+# -*- coding: utf-8 -*-
+
+"""
+Search daemon of kintterFind. Usage:
+    kintterFind_daemon.py [--address ADDRESS] [--configdir DIR]
+
+The daemon keeps the cache of directory listings (ScanCache) and parsed
+filters of recent queries between searches, and answers queries of GUI windows
+(option DAEMON_ADDRESS) and of kintterFind_cli.py --daemon. Several searches
+can run at the same time, they share the caches. ADDRESS is the path of a Unix
+domain socket, relative to the config directory, or a TCP port number on
+127.0.0.1. The socket is accessible only by the user who started the daemon.
+A TCP port is accessible by all local users, so clients must authenticate: the
+daemon writes a random token into file TOKEN_FILE in the config directory,
+readable only by its user, and a client must send it before other requests.
+Clients must use the same config directory as the daemon.
+
+Protocol: the client sends requests and receives messages as JSON objects,
+one per line (JSON Lines). Each search has an ID (string or integer) chosen by
+the client, unique among the searches running in the daemon. The first
+request on a TCP connection must be {"op": "auth", "token": TOKEN}; the reply
+is {"auth": true}, or {"auth": false, "error": MESSAGE} and the connection is
+closed. Requests:
+    {"op": "find", "id": ID, "query": QUERY, "fields": [FIELD, ...], "interval": SECONDS}
+    {"op": "cancel", "id": ID}
+    {"op": "stats"}
+    {"op": "clear"}
+QUERY is the query of find_engine.Finder. Relative paths in it are relative
+to the current directory of the daemon. FIELDS are names in find_engine.FIELDS,
+default: path. Messages of search ID, in this order:
+    {"id": ID, "start": [LOG LINE, ...]}     -- query was parsed, search started
+    {"id": ID, "item": [VALUE, ...]}         -- found item, values of FIELDS
+    {"id": ID, "status": {COUNTERS}}         -- every INTERVAL seconds (0.5)
+    {"id": ID, "end": "done"|"cancelled"|"error", "error": MESSAGE,
+     "errtype": "QueryError"|"FindError"|..., "log": [LOG LINE, ...], COUNTERS}
+COUNTERS are "found", "scanned", "dirs", "binary", "errors". A search is
+cancelled by "cancel" from any connection, or when its connection is closed.
+Message "end" with "error" can come without "start", e.g., for invalid query.
+
+RemoteFinder is the client. It has the same interface as find_engine.Finder.
+"""
+
+import sys, os, json, socket, socketserver, threading, itertools
+import hmac, binascii
+from collections import OrderedDict
+
+# local imports
+from . import kintterFind_options as OPT
+from . import find_engine
+from . import scan_cache
+from .find_engine import (FIELDS, FindError, QueryError, Filters, filter_key,
+                          full_path, _items, e_info, quoted)
+
+# default ADDRESS: socket in the config directory
+DEFAULT_ADDRESS = 'kintterFind.sock'
+
+# token for TCP port PORT, in the config directory
+TOKEN_FILE = 'kintterFind-daemon-%s.token'
+
+# number of parsed queries (Filters) kept by the daemon
+FILTER_CACHE_SIZE = 64
+
+# seconds between status messages
+STATUS_INTERVAL = 0.5
+
+_dumps = json.JSONEncoder(check_circular=False, separators=(',', ':')).encode
+
+
+def parse_address(address, configDir):
+    """Return (socket family, socket address) for ADDRESS string."""
+    address = address.strip()
+    if address.isdigit():
+        return (socket.AF_INET, ('127.0.0.1', int(address)))
+    if not hasattr(socket, 'AF_UNIX'):
+        raise FindError('Unix domain sockets are not supported, use TCP port number:\n%s' % quoted(address))
+    return (socket.AF_UNIX, full_path(address, basedir=configDir))
+
+
+def token_path(addr, configDir):
+    """Return path of token file for TCP socket address addr."""
+    return os.path.join(configDir, TOKEN_FILE % addr[1])
+
+
+def write_token(path):
+    """Write new random token into file path, readable only by this user.
+    Return the token. Raise OSError."""
+    token = binascii.hexlify(os.urandom(32)).decode('ascii')
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    # O_EXCL: do not write through a file or symlink put there by others
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with open(fd, 'w', encoding='ascii') as f:
+        f.write(token)
+    return token
+
+
+def read_token(addr, configDir):
+    """Return token of the daemon at TCP socket address addr. Raise FindError."""
+    path = token_path(addr, configDir)
+    try:
+        with open(path, encoding='ascii') as f:
+            return f.read().strip()
+    except (OSError, ValueError) as e:
+        raise FindError('Cannot read token of kintterFind daemon:%s' % e_info(e))
+
+
+def valid_id(rid):
+    """Return True if rid can be the ID of a search: str or int."""
+    return isinstance(rid, (str, int)) and not isinstance(rid, bool)
+
+
+#--- Server ----------------------------------------------------------
+
+class Handler(socketserver.StreamRequestHandler):
+    """One client connection. Each search runs in its own thread."""
+
+    # buffer found items, flush on status messages
+    wbufsize = 64 * 1024
+
+    def setup(self):
+        socketserver.StreamRequestHandler.setup(self)
+        self.wlock = threading.Lock()
+
+    def send(self, msg, flush=True):
+        """Send message. Raise OSError if client is gone."""
+        data = _dumps(msg).encode('ascii') + b'\n'
+        with self.wlock:
+            self.wfile.write(data)
+            if flush:
+                self.wfile.flush()
+
+    def handle(self):
+        threads = []
+        try:
+            self.read_requests(threads)
+        except OSError:
+            pass # connection reset by client
+        # client sent everything, results may still be wanted
+        for t in threads:
+            t.join()
+
+    def read_requests(self, threads):
+        """Read requests until the client stops sending."""
+        # TCP: the first request must be auth with the token of the server
+        authorized = self.server.token is None
+        for line in self.rfile:
+            try:
+                req = json.loads(line.decode('utf-8'))
+                if not isinstance(req, dict):
+                    raise ValueError('request must be JSON object')
+            except ValueError as e:
+                self.send({'error': 'Invalid request:%s' % e_info(e)})
+                continue
+            op = req.get('op')
+            if op == 'auth' or not authorized:
+                token = req.get('token') if op == 'auth' else None
+                authorized = authorized or (isinstance(token, str) and
+                                            hmac.compare_digest(token, self.server.token))
+                if not authorized:
+                    self.send({'auth': False, 'error': 'Not authorized: wrong or missing token'})
+                    return
+                self.send({'auth': True})
+            elif op == 'find':
+                t = threading.Thread(target=self.find, args=(req,), daemon=True)
+                t.start()
+                threads.append(t)
+            elif op == 'cancel':
+                rid = req.get('id')
+                self.send({'id': rid, 'cancel': valid_id(rid) and self.server.cancel(rid)})
+            elif op == 'stats':
+                self.send({'stats': self.server.stats()})
+            elif op == 'clear':
+                if self.server.scanCache:
+                    self.server.scanCache.clear()
+                self.send({'clear': True})
+            else:
+                self.send({'error': 'Unknown op: %s' % repr(op)})
+
+    def find(self, req):
+        """Run one search and send its messages."""
+        server, rid = self.server, req.get('id')
+        finder = None
+        try:
+            if not valid_id(rid):
+                raise QueryError('Search ID must be string or integer: %s' % repr(rid))
+            query, fields = req.get('query'), req.get('fields', ['path'])
+            if not isinstance(query, dict):
+                raise QueryError('Query must be JSON object')
+            if not isinstance(fields, list):
+                raise QueryError('Fields must be JSON array')
+            try:
+                interval = float(req.get('interval', STATUS_INTERVAL))
+            except (TypeError, ValueError):
+                raise QueryError('Interval must be number: %s' % repr(req.get('interval')))
+            bad = [f for f in fields if f not in FIELDS]
+            if bad or not fields:
+                raise QueryError('Unknown fields: %s' % ', '.join(bad))
+            getters = [FIELDS[f][0] for f in fields]
+            needStat = any([FIELDS[f][1] for f in fields])
+            finder = find_engine.Finder(query, needStat, 'linkto' in fields, server.scanCache,
+                                        server.configDir, server.filters(query))
+            server.register(rid, finder)
+        except FindError as e:
+            if finder:
+                finder.close()
+            self.send({'id': rid, 'end': 'error', 'error': str(e), 'errtype': e.__class__.__name__})
+            return
+
+        found = finder.run(interval)
+        end, err, gone = 'done', '', False
+        try:
+            self.send({'id': rid, 'start': finder.log})
+            send = self.send
+            for r in found:
+                if r is not None:
+                    send({'id': rid, 'item': [g(r) for g in getters]}, False)
+                    continue
+                if finder.cancelled:
+                    end = 'cancelled'
+                    break
+                send({'id': rid, 'status': counters(finder)})
+        except OSError:
+            # connection closed by client
+            end, gone = 'cancelled', True
+        except Exception as e:
+            end, err = 'error', '**Exception** during search:%s' % e_info(e)
+        finally:
+            found.close()
+            server.unregister(rid)
+        if gone:
+            return
+        msg = {'id': rid, 'end': end, 'log': finder.report(), 'phases': finder.phase_rows()}
+        if err:
+            msg.update(error=err, errtype='Exception')
+        msg.update(counters(finder))
+        try:
+            self.send(msg)
+        except OSError:
+            pass
+
+
+def counters(finder):
+    """Return dict of counters of Finder for status messages."""
+    return {'found': finder.cntFound, 'scanned': finder.cntItems, 'dirs': finder.cntDirs,
+            'binary': finder.cntBinary, 'errors': finder.errors()}
+
+
+class ServerMixIn:
+    """Shared state of all connections: caches and running searches."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def init(self, configDir, socketPath=None, tokenPath=None, token=None):
+        # socketPath, tokenPath -- files removed by cleanup()
+        # token -- clients must send it first (TCP), None: no authentication
+        self.configDir = configDir
+        self.socketPath, self.tokenPath = socketPath, tokenPath
+        self.token = token
+        cacheMB = OPT.DAEMON_CACHE_MB
+        self.scanCache = scan_cache.ScanCache(cacheMB * 2**20) if cacheMB > 0 else None
+        # filter_key(query): Filters; most recently used last
+        self.filterCache = OrderedDict()
+        # search ID: Finder
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    def filters(self, query):
+        """Return Filters of query, parse it if it is not in cache."""
+        key = filter_key(query)
+        with self.lock:
+            flts = self.filterCache.get(key)
+            if flts is not None:
+                self.filterCache.move_to_end(key)
+                return flts
+        # raises QueryError
+        flts = Filters(query)
+        with self.lock:
+            self.filterCache[key] = flts
+            while len(self.filterCache) > FILTER_CACHE_SIZE:
+                self.filterCache.popitem(last=False)
+        return flts
+
+    def register(self, rid, finder):
+        with self.lock:
+            if rid in self.requests:
+                raise FindError('Search ID is already used: %s' % repr(rid))
+            finder.cancelled = False
+            self.requests[rid] = finder
+
+    def unregister(self, rid):
+        with self.lock:
+            self.requests.pop(rid, None)
+
+    def cancel(self, rid):
+        """Cancel search rid. Return False if there is no such search."""
+        with self.lock:
+            finder = self.requests.get(rid)
+        if not finder:
+            return False
+        finder.cancelled = True
+        # ask Finder.run() to yield soon
+        finder.tick = True
+        return True
+
+    def stats(self):
+        res = {'searches': list(self.requests), 'filter_cache': len(self.filterCache)}
+        sc = self.scanCache
+        if sc:
+            res['scan_cache'] = {'items': sc.cntItems, 'bytes': sc.size(),
+                                 'hits': sc.cntHits, 'misses': sc.cntMisses}
+        return res
+
+    def cleanup(self):
+        """Stop listening, remove Unix socket and token file."""
+        self.server_close()
+        for path in (self.socketPath, self.tokenPath):
+            if path:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+
+class TCPServer(ServerMixIn, socketserver.ThreadingTCPServer):
+    pass
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class UnixServer(ServerMixIn, socketserver.ThreadingUnixStreamServer):
+        pass
+
+
+def make_server(address, configDir, log):
+    """Return server listening at address; serve_forever() runs it,
+    cleanup() stops listening. Append messages to list log. Raise FindError if
+    address cannot be used."""
+    family, addr = parse_address(address, configDir)
+    tokenPath = token = None
+    try:
+        if family == socket.AF_INET:
+            server = TCPServer(addr, Handler)
+            # other local users can connect, they must know the token; written
+            # after bind(): the token of a running daemon is not replaced
+            tokenPath = token_path(addr, configDir)
+            try:
+                token = write_token(tokenPath)
+            except OSError:
+                server.server_close()
+                raise
+        else:
+            if os.path.exists(addr):
+                # socket of a daemon that did not exit cleanly
+                if is_running(address, configDir):
+                    raise FindError('Daemon is already running:\n%s' % quoted(addr))
+                os.unlink(addr)
+            # only this user can connect
+            umask = os.umask(0o177)
+            try:
+                server = UnixServer(addr, Handler)
+            finally:
+                os.umask(umask)
+    except OSError as e:
+        raise FindError('Cannot listen at %s:%s' %(quoted(address), e_info(e)))
+    server.init(configDir, addr if family != socket.AF_INET else None, tokenPath, token)
+    if family == socket.AF_INET:
+        log.append('Listening at %s:%s' % addr)
+        log.append('Clients must send the token in %s' % quoted(tokenPath))
+    else:
+        log.append('Listening at %s' % quoted(addr))
+    if not server.scanCache:
+        log.append('Scan cache is off (DAEMON_CACHE_MB = 0).')
+    return server
+
+
+def is_running(address, configDir):
+    """Return True if a daemon answers at address."""
+    try:
+        sock = connect(address, configDir, 2)
+    except FindError:
+        return False
+    sock.close()
+    return True
+
+
+def connect(address, configDir, timeout=None):
+    """Return socket connected to the daemon, authenticated if it is TCP.
+    Raise FindError."""
+    family, addr = parse_address(address, configDir)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(addr)
+    except OSError as e:
+        sock.close()
+        raise FindError('Cannot connect to kintterFind daemon at %s:%s' %(quoted(address), e_info(e)))
+    if family == socket.AF_INET:
+        try:
+            authenticate(sock, read_token(addr, configDir))
+        except FindError:
+            sock.close()
+            raise
+    return sock
+
+
+def authenticate(sock, token):
+    """Send token to the daemon on TCP socket sock. Raise FindError if it
+    is not accepted."""
+    try:
+        sock.sendall(_dumps({'op': 'auth', 'token': token}).encode('ascii') + b'\n')
+        # read byte by byte: the rest of the stream is read by the caller
+        line = b''
+        while not line.endswith(b'\n'):
+            b = sock.recv(1)
+            if not b:
+                break
+            line += b
+        msg = json.loads(line.decode('ascii'))
+    except (OSError, ValueError) as e:
+        raise FindError('**Exception** while sending token to kintterFind daemon:%s' % e_info(e))
+    if not msg.get('auth'):
+        raise FindError('kintterFind daemon: %s' % msg.get('error', msg))
+
+
+#--- Client ----------------------------------------------------------
+
+class RemoteFinder:
+    """One FIND in the daemon. Same interface as find_engine.Finder: the
+    query is sent and parsed by the constructor, run() yields found items."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, query, needStat=True, wantLinkTo=False, address='', configDir=''):
+        # address -- ADDRESS of the daemon, see parse_address()
+        # Other arguments are the same as for find_engine.Finder. The daemon
+        # uses its own options and caches.
+        self.needStat, self.wantLinkTo = needStat, wantLinkTo
+        self.fields = ['type', 'dir', 'name']
+        if needStat:
+            self.fields.append('stat')
+        if wantLinkTo:
+            self.fields.append('linkto')
+        # paths are relative to the current directory of the daemon
+        q = dict(query)
+        for k in ('dirs', 'skip_dirs'):
+            if k in q:
+                q[k] = [full_path(p) for p in _items(q[k], '|')]
+        self.rid = '%s-%s' %(os.getpid(), next(self._ids))
+
+        # no reply for this long: daemon is hung
+        sock = self.sock = connect(address, configDir, 30)
+        self.rfile = sock.makefile('rb')
+        self.cntItems, self.cntFound, self.cntDirs, self.cntBinary = 0, 0, 0, 0
+        self.errs, self.closeErr, self._report = '0+0+0', '', []
+        self._phases = []
+        self.ended = False
+        try:
+            self.send({'op': 'find', 'id': self.rid, 'query': q, 'fields': self.fields,
+                       'interval': STATUS_INTERVAL})
+            msg = self.recv()
+        except (OSError, ValueError) as e:
+            self.close()
+            raise FindError('**Exception** while sending query to daemon:%s' % e_info(e))
+        if 'start' not in msg:
+            self.close()
+            if msg.get('errtype') == 'QueryError':
+                raise QueryError(msg.get('error', ''))
+            raise FindError('kintterFind daemon: %s' % msg.get('error', msg))
+        self.log = ['Daemon: %s' % quoted(address)] + msg['start']
+
+    def send(self, msg):
+        self.sock.sendall(_dumps(msg).encode('ascii') + b'\n')
+
+    def recv(self):
+        """Return next message of this search. Raise OSError if connection
+        is closed."""
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                raise ConnectionError('connection closed by daemon')
+            msg = json.loads(line.decode('ascii'))
+            if msg.get('id') == self.rid:
+                return msg
+
+    def run(self, interval=0.5, first=None):
+        """Generator. Yield found items like find_engine.Finder.run(), and
+        None on status messages of the daemon (every STATUS_INTERVAL seconds)."""
+        # arguments are accepted for compatibility with Finder.run()
+        stat_result = os.stat_result
+        iType, iDir, iName = 0, 1, 2
+        iStat = 3 if self.needStat else None
+        iLink = len(self.fields) - 1 if self.wantLinkTo else None
+        try:
+            while True:
+                msg = self.recv()
+                v = msg.get('item')
+                if v is not None:
+                    yield (v[iType], v[iDir], v[iName],
+                           stat_result(v[iStat]) if iStat else None,
+                           v[iLink] if iLink else '')
+                    continue
+                if 'status' in msg:
+                    self.update(msg['status'])
+                    yield None
+                elif 'end' in msg:
+                    self.ended = True
+                    self.update(msg)
+                    self._report = msg.get('log', [])
+                    self._phases = [tuple(r) for r in msg.get('phases', [])]
+                    if msg.get('error'):
+                        self.closeErr = msg['error']
+                    break
+        except (OSError, ValueError) as e:
+            self.closeErr = '**Exception** while receiving results from daemon:%s' % e_info(e)
+        finally:
+            # normal end, or generator was closed (FIND cancelled)
+            if not self.ended:
+                try:
+                    self.send({'op': 'cancel', 'id': self.rid})
+                except OSError:
+                    pass
+            self.close()
+
+    def update(self, c):
+        self.cntFound, self.cntItems, self.cntDirs = c['found'], c['scanned'], c['dirs']
+        self.cntBinary, self.errs = c['binary'], c['errors']
+
+    def close(self):
+        """Close connection to the daemon, cancel search if it runs."""
+        if self.sock:
+            self.rfile.close()
+            self.sock.close()
+            self.sock = None
+
+    def errors(self):
+        """Return number of errors as string for status messages."""
+        return self.errs
+
+    def phase_rows(self):
+        """Return time of phases of the search in the daemon, see
+        find_engine.Finder.phase_rows()."""
+        return self._phases
+
+    def report(self):
+        """Return lines for the Log after the end of FIND."""
+        res = list(self._report)
+        if self.closeErr:
+            res.append('\n%s' % self.closeErr)
+        return res
+
+
+def main(argv=None):
+    import argparse, signal
+    parser = argparse.ArgumentParser(prog='kintterFind_daemon.py',
+                description='Run kintterFind search daemon.')
+    parser.add_argument('--address', default='',
+                        help='Unix socket path (relative to config directory) or TCP port '
+                             'on 127.0.0.1 (default: option DAEMON_ADDRESS or %s)' % DEFAULT_ADDRESS)
+    parser.add_argument('--configdir', default='',
+                        help='config directory (default: %s)' % find_engine.CONFIGDIR)
+    args = parser.parse_args(argv)
+
+    log = []
+    configDir = find_engine.config_dir(args.configdir)
+    find_engine.load_config(configDir, 'kintterFind.config.py', log)
+    address = args.address or OPT.DAEMON_ADDRESS or DEFAULT_ADDRESS
+    try:
+        server = make_server(address, configDir, log)
+    except FindError as e:
+        log.append(str(e))
+        sys.stderr.write('%s\n' % '\n'.join(log))
+        return 2
+    sys.stderr.write('%s\n' % '\n'.join(log))
+    sys.stderr.flush()
+    # SIGTERM: exit cleanly, remove socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.cleanup()
+    return 0
+
+
+# The End
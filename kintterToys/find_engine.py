@@ -0,0 +1,1446 @@
+# -*- coding: utf-8 -*-
+
+"""
+Search engine of kintterFind, independent of the GUI. Usage:
+    from . import find_engine
+    finder = find_engine.Finder({'dirs': '~/src', 'name1': '*.py', 'name1_mode': 'WildCard'})
+    for item in finder.run():
+        if item is None: continue # timer tick: update UI, check for cancel
+        ft, dirpath, name, st, linkTo = item
+    log = finder.log + finder.report()
+
+The query is a dict with the same filters as tabs of the GUI, see
+QUERY_DEFAULTS. A filter is on if any of its keys is in the query. Text values
+are parsed the same way as input in the GUI: items separated by "|", optionally
+enclosed in "". Lists are also accepted instead of "|"-separated strings.
+Finder() raises QueryError for invalid input, FindError for other errors.
+
+Finder.run() is a generator. It yields found items one by one as they are
+found, in the order of scanning, and None on timer ticks (every `interval`
+seconds) and while waiting for content search worker processes. The consumer
+can stop the search at any time with close(). Memory use does not depend on
+the number of found items, they are not kept.
+
+Counters (cntFound, cntItems, cntDirs, cntBinary, lists of errors) are
+updated on timer ticks and at the end. Options are taken from
+kintterFind_options, see load_config().
+
+This module is used by the GUI (kintterFind.py) and by the command-line
+interface (kintterFind_cli.py).
+"""
+
+import sys, os, re, time, json
+import threading, queue
+from collections import deque
+import stat # _stat
+multiprocessing = None # lazy import
+
+# os.scandir() is available in Python >=3.5
+# users of Python 3.4 can install scandir from PyPI via pip
+_scandir = getattr(os, 'scandir', None)
+if not _scandir:
+    import scandir
+    _scandir = scandir.scandir
+
+# local imports
+from .constants import CONFIGDIR, TIME_FORMAT
+from . import kintterFind_options as OPT
+from . import config_file_parser
+from . import fltfuncs
+from . import file_index
+from . import filter_compiler
+
+# frequently used
+_sep = os.sep
+_path = os.path
+_join = os.path.join
+_normcase = os.path.normcase
+_filemode = stat.filemode
+_perf = time.perf_counter
+
+# Number of files sent at once to a content search worker process.
+CONT_BATCH = 32
+
+# Phases of FIND that run for each scanned or found item are timed for one
+# item in SAMPLE+1 and extrapolated, this is cheap. SAMPLE+1 is a power of 2.
+SAMPLE = 63
+
+# Abs path of outside dir, that is dir of "start_kintterFind.py".
+PROGRAMDIR = _path.dirname(_path.dirname(_path.abspath(__file__)))
+
+# Query keys and their default values. Keys are grouped by filter; the name of
+# filter (tab in the GUI) is the first item of each group.
+QUERY_GROUPS = (
+    ('Directories', {'dirs': '', 'recurse': True, 'xdev': False, 'index': False}),
+    ('Skipped dirs', {'skip_dirs': '',
+                      'skip_names': '', 'skip_names_mode': 'Exact', 'skip_names_ic': True}),
+    ('Name', {'name1': '', 'name1_mode': 'Contains', 'name1_ic': True, 'name1_not': False,
+              'name2': '', 'name2_mode': 'Contains', 'name2_ic': True, 'name2_not': False}),
+    ('Path', {'path1': '', 'path1_mode': 'Contains', 'path1_ic': True, 'path1_not': False,
+              'path2': '', 'path2_mode': 'Contains', 'path2_ic': True, 'path2_not': False}),
+    ('Type', {'ext': '', 'ext_not': False, 'types': '-dlo'}),
+    ('Size', {'size_min': '', 'size_max': '', 'size_units': 'K'}),
+    ('Time', {'time_min': '', 'time_max': '', 'time_what': 'MTIME'}),
+    ('Misc', {'uid': '', 'uid_not': False, 'gid': '', 'gid_not': False, 'nlink': '',
+              'mode': '', 'mode_mode': 'RegExp', 'mode_not': False}),
+    ('Content', {'content': '', 'content_mode': 'Contains', 'content_ic': True,
+                 'content_encoding': 'utf-8', 'content_errors': 'strict',
+                 'content_newline': 'None', 'content_binary': 'skip'}),
+    )
+QUERY_DEFAULTS = {}
+for g in QUERY_GROUPS:
+    QUERY_DEFAULTS.update(g[1])
+del g
+
+# choices of query values
+MATCH_MODES = ('off', 'Exact', 'Contains', 'StartsWith', 'EndsWith', 'WildCard', 'RegExp')
+CONT_MODES = ('Contains', 'StartsWith', 'WildCard', 'RegExp')
+SIZE_UNITS = {'bytes':1,
+              'K':1024, 'M':1024**2, 'G':1024**3, 'T':1024**4,
+              'k':1000, 'm':1000**2, 'g':1000**3, 't':1000**4,
+              }
+TIME_ATTRS = {'MTIME': 'st_mtime', 'CTIME': 'st_ctime', 'ATIME': 'st_atime'}
+
+
+def _stat_tuple(st):
+    """Return field stat of stat result st. Uses attributes: st can also be
+    file_index.IndexStat."""
+    return (st.st_mode, st.st_ino, st.st_dev, st.st_nlink, st.st_uid, st.st_gid, st.st_size,
+            st.st_atime, st.st_mtime, st.st_ctime)
+
+
+# Fields of found items for kintterFind_cli.py and kintterFind_daemon.py:
+# name: (function of found item, needs stat result).
+# Found item is (file type, directory path, name, stat result, LinkTo).
+# Field stat is a list of the first 7 values of stat result (st_mode, st_ino,
+# st_dev, st_nlink, st_uid, st_gid, st_size) and st_atime, st_mtime,
+# st_ctime; os.stat_result() makes stat result from it.
+FIELDS = {
+    'path':   (lambda r: _join(r[1], r[2]), False),
+    'dir':    (lambda r: r[1], False),
+    'name':   (lambda r: r[2], False),
+    'type':   (lambda r: r[0], False),
+    'linkto': (lambda r: r[4], False),
+    'size':   (lambda r: r[3].st_size, True),
+    'mtime':  (lambda r: r[3].st_mtime, True),
+    'ctime':  (lambda r: r[3].st_ctime, True),
+    'atime':  (lambda r: r[3].st_atime, True),
+    'mode':   (lambda r: _filemode(r[3].st_mode), True),
+    'uid':    (lambda r: r[3].st_uid, True),
+    'gid':    (lambda r: r[3].st_gid, True),
+    'nlink':  (lambda r: r[3].st_nlink, True),
+    'ino':    (lambda r: r[3].st_ino, True),
+    'dev':    (lambda r: r[3].st_dev, True),
+    'stat':   (lambda r: _stat_tuple(r[3]), True),
+    }
+
+
+class FindError(Exception):
+    """FIND cannot be started."""
+
+
+class QueryError(FindError):
+    """Invalid input in the query."""
+
+
+#--- Filters ---------------------------------------------------------
+
+class Filters:
+    """Parsed filters of a query, except for filter Directories. Filters do
+    not change during FIND and can be shared by several Finders."""
+
+    def __init__(self, query):
+        q = query_dict(query)
+        # lines for the Log: parsed filters
+        self.log = log = []
+        on = lambda i: [k for k in QUERY_GROUPS[i][1] if k in query]
+
+        ### filter "Skipped dirs" ------------------------------------
+        # skip directories and all files under them
+        self.skipNames, self.fltSkipNames = (), None
+        self.skipDirs = skipDirs = ()
+        if on(1):
+            # directory paths to skip
+            skipDirs = process_input_dirs(_items(q['skip_dirs'], '|'), mustexist=False, nosubdirs=False)
+            # directory names to skip
+            pttrns, func, logstr = parse_names(q['skip_names'], q['skip_names_mode'], q['skip_names_ic'])
+            if not (skipDirs or pttrns):
+                raise QueryError('Filter "Skipped dirs": nothing to search')
+            if skipDirs:
+                log.append('Skip directories: %s' %(skipDirs))
+            if pttrns:
+                log.append('Skip dirs with name: %s' % logstr)
+                self.skipNames, self.fltSkipNames = pttrns, func
+
+        fltSpec = filter_compiler.FilterSpec()
+
+        ### filters "Name", "Path" -----------------------------------
+        for i, fname, keys in ((2, 'Name', ('name1', 'name2')), (3, 'Path', ('path1', 'path2'))):
+            if not on(i):
+                continue
+            for k in keys:
+                pttrns, func, logstr = parse_names(q[k], q[k + '_mode'], q[k + '_ic'])
+                if pttrns:
+                    yes = not q[k + '_not']
+                    log.append('%s%s: %s' %('' if yes else 'Not ', fname, logstr))
+                    setattr(fltSpec, k, (func, pttrns, yes))
+            if not (getattr(fltSpec, keys[0]) or getattr(fltSpec, keys[1])):
+                raise QueryError('Filter "%s": nothing to search' % fname)
+
+        ### filter "Type" --------------------------------------------
+        if on(4):
+            # Extension
+            querExt = _items(q['ext'], '|', noempty=False)
+            if querExt:
+                for (i, s) in enumerate(querExt):
+                    if s:
+                        querExt[i] = '.%s' %(s.casefold())
+                yes = not q['ext_not']
+                log.append('%sExtension: %s' %('' if yes else 'Not ', repr(querExt)))
+                fltSpec.ext = ({}.fromkeys(querExt), yes)
+            # FileType
+            types = q['types']
+            querFT = [c for c in '-dlo' if c in types]
+            bad = [c for c in types if c not in '-dlo']
+            if bad:
+                raise QueryError('Filter "Type": unknown file types: %s\n(use -, d, l, o)' % repr(''.join(bad)))
+            if len(querFT) != 4:
+                log.append('File type: %s' %(repr(querFT)))
+                fltSpec.ft = {}.fromkeys(querFT)
+            if not (fltSpec.ext or fltSpec.ft is not None):
+                raise QueryError('Filter "Type": nothing to search')
+
+        ### filter "Size" --------------------------------------------
+        if on(5):
+            units = q['size_units']
+            if units not in SIZE_UNITS:
+                raise QueryError('Filter "Size": unknown units: %s\n(use %s)' %(repr(units), ', '.join(SIZE_UNITS)))
+            sz1, logstr1 = parse_size(q['size_min'], SIZE_UNITS[units])
+            sz2, logstr2 = parse_size(q['size_max'], SIZE_UNITS[units])
+            if (sz1 is None) and (sz2 is None):
+                raise QueryError('Filter "Size": nothing to search')
+            logstr1 = '%s < ' %logstr1 if sz1 else ''
+            logstr2 = ' < %s' %logstr2 if sz2 else ''
+            log.append('%sSize, %s%s' %(logstr1, units, logstr2))
+            fltSpec.size = fltfuncs.make_comp_func(sz1, sz2, 'st_size')
+
+        ### filter "Time" --------------------------------------------
+        if on(6):
+            what = q['time_what']
+            if what not in TIME_ATTRS:
+                raise QueryError('Filter "Time": unknown time: %s\n(use %s)' %(repr(what), ', '.join(TIME_ATTRS)))
+            tm1, logstr1 = parse_time(q['time_min'])
+            tm2, logstr2 = parse_time(q['time_max'])
+            if (tm1 is None) and (tm2 is None):
+                raise QueryError('Filter "Time": nothing to search')
+            logstr1 = '%s < ' %logstr1 if tm1 else ''
+            logstr2 = ' < %s' %logstr2 if tm2 else ''
+            log.append('%s%s%s' %(logstr1, what, logstr2))
+            fltSpec.time = fltfuncs.make_comp_func(tm1, tm2, TIME_ATTRS[what])
+
+        ### filter "Misc" --------------------------------------------
+        if on(7):
+            querUID = parse_ints(q['uid'], '|')
+            querGID = parse_ints(q['gid'], '|')
+            querNLINK = parse_ints(q['nlink'], None)
+            querMODE, funcMODE, logstr = parse_mode(q['mode'], q['mode_mode'])
+            if not (querUID or querGID or querNLINK or querMODE):
+                raise QueryError('Filter "Misc": nothing to search')
+            if querUID:
+                yes = not q['uid_not']
+                log.append('%sUID: %s' %('' if yes else 'Not ', repr(querUID)))
+                fltSpec.uid = (set(querUID), yes)
+            if querGID:
+                yes = not q['gid_not']
+                log.append('%sGID: %s' %('' if yes else 'Not ', repr(querGID)))
+                fltSpec.gid = (set(querGID), yes)
+            if querNLINK:
+                log.append('NLINK > %s' %(repr(querNLINK[0])))
+                fltSpec.nlink = querNLINK[0]
+            if querMODE:
+                yes = not q['mode_not']
+                log.append('%sMODE: %s' %('' if yes else 'Not ', logstr))
+                fltSpec.mode = (funcMODE, querMODE, yes)
+
+        ### filter "Content" -----------------------------------------
+        self.doCont = bool(on(8))
+        self.querCont, self.binQuerCont = None, None
+        if self.doCont:
+            self.querCont, self.binQuerCont, logstr = parse_content(q['content'],
+                        q['content_mode'], q['content_ic'], q['content_encoding'],
+                        q['content_errors'], q['content_newline'], q['content_binary'])
+            log.append('Content: %s' %logstr)
+            if OPT.CONT_PROCESSES > 1:
+                log[-1] += '; processes=%s' %(OPT.CONT_PROCESSES)
+            # filter Content searches only regular files
+            fltSpec.regular = True
+        self.fltSpec = fltSpec
+
+
+def query_dict(query):
+    """Return query with default values of absent keys. Raise QueryError for
+    unknown keys."""
+    unknown = [k for k in query if k not in QUERY_DEFAULTS]
+    if unknown:
+        raise QueryError('Unknown query keys: %s' % ', '.join(unknown))
+    q = dict(QUERY_DEFAULTS)
+    q.update(query)
+    return q
+
+
+def filter_key(query):
+    """Return hashable key of the filters in query, for a cache of Filters.
+    Queries with the same key have the same Filters."""
+    dirKeys = QUERY_GROUPS[0][1]
+    return json.dumps([(k, query[k]) for k in sorted(query) if k not in dirKeys])
+
+
+#--- Finder ----------------------------------------------------------
+
+class Finder:
+    """One FIND: parsed query and the state of the search."""
+
+    def __init__(self, query, needStat=True, wantLinkTo=False, scanCache=None, configDir='',
+                 filters=None):
+        # query -- dict, see QUERY_DEFAULTS
+        # needStat -- if False, found items are not stat-ed when filters did not need it
+        # wantLinkTo -- get target of found symbolic links
+        # scanCache -- ScanCache, used if file index is not used
+        # configDir -- directory of relative INDEX_FILE
+        # filters -- Filters of this query parsed before, e.g., cached by key filter_key()
+        q = query_dict(query)
+        self.query = q
+        self.needStat, self.wantLinkTo = needStat, wantLinkTo
+        # lines for the Log: parsed query
+        self.log = log = []
+
+        ### directories to search ------------------------------------
+        recurse, xdev, index = q['recurse'], q['xdev'], q['index']
+        self.recurse = recurse
+        inputDirs_v1 = _items(q['dirs'], '|')
+        if not inputDirs_v1:
+            raise QueryError('No Directories to search')
+        inputDirs_v1 = process_input_dirs(inputDirs_v1, mustexist=True, nosubdirs=recurse)
+        log.append('Directories: %s\n    recurse=%s, xdev=%s, index=%s' %(inputDirs_v1, recurse, xdev, index))
+        if recurse and OPT.SCAN_THREADS > 1 and not index:
+            log[-1] += ', threads=%s' %(OPT.SCAN_THREADS)
+
+        ### filters --------------------------------------------------
+        if filters is None:
+            filters = Filters(query)
+        log.extend(filters.log)
+        self.skipNames, self.fltSkipNames = filters.skipNames, filters.fltSkipNames
+        self.fltSpec = filters.fltSpec
+        self.doCont = filters.doCont
+        self.querCont, self.binQuerCont = filters.querCont, filters.binQuerCont
+
+        # Prepare inputDirs_v2: pair each path in inputDirs_v1 with a list
+        # of relevant path from skipDirs. Note that dirs in skipDirs were not verified.
+        self.inputDirs = inputDirs_v2 = []
+        for p in inputDirs_v1:
+            p1 = _normcase(p)
+            skipDirsNew, ok = [], True
+            for p2 in filters.skipDirs:
+                p2 = _normcase(p2)
+                if is_subdir(p1, [p2]): # input dir itself is skipped, drop it from result
+                    ok = False
+                    break
+                else:
+                    skipDirsNew.append(p2)
+                    # p2 is saved normcase-ed
+                    # p1 is not normcase-ed: result paths should be as typed by user
+            if ok:
+                dev = None
+                if xdev:
+                    try:
+                        dev = os.stat(p, follow_symlinks=False).st_dev
+                    except OSError as err:
+                        raise FindError('**OSError** while getting device number:\n%s' %(e_info(err)))
+                    if not dev:
+                        raise FindError('Cannot get device number for directory:\n%s' %(quoted(p)))
+                inputDirs_v2.append((p, skipDirsNew, dev))
+
+        ### file index ---------------------------------------------
+        self.fileIndex = None
+        if index:
+            indexPath = full_path(OPT.INDEX_FILE, basedir=configDir)
+            try:
+                self.fileIndex = file_index.FileIndex(indexPath)
+            except Exception as e:
+                raise FindError('**Exception** while opening file index:\n%s%s' %(quoted(indexPath), e_info(e)))
+            log.append('File index: %s' %(quoted(indexPath)))
+
+        # replacement for scandir()
+        self.scanCache = None
+        if self.fileIndex:
+            self.scandirFunc = self.fileIndex.scandir
+        elif scanCache:
+            self.scanCache = scanCache
+            self.scandirFunc = scanCache.scandir
+        else:
+            self.scandirFunc = _scandir
+
+        if not needStat:
+            log.append('Results: stat() is deferred (no displayed column needs it)')
+
+        # counters and errors
+        self.cntItems, self.cntFound, self.cntDirs = 0, 0, 0
+        self.cntBinary = 0 # binary files skipped by filter Content
+        self.logErrs1, self.logErrs2, self.logErrs3 = [], [], []
+        self.logXdevs = [] if xdev else None
+        self.cntIndexHits, self.cntIndexMisses = 0, 0
+        self.closeErr = ''
+        self.fltAdapt = None
+        self.scanCacheBase = (0, 0)
+        self.ph = None # Phases
+        # if True, run() yields items strictly in depth-first order of
+        # directories: no scanning threads, no content search processes
+        self.depthFirst = False
+        self.tick = False
+
+
+    def timer(self):
+        """Called by Timer: ask run() to yield None soon."""
+        self.tick = True
+
+
+    def close(self):
+        """Release resources if run() is not used."""
+        fi = self.fileIndex
+        if fi:
+            self.cntIndexHits, self.cntIndexMisses = fi.cntHits, fi.cntMisses
+            try:
+                fi.close()
+            except Exception as e:
+                self.closeErr = '**Exception** while saving file index:%s' % e_info(e)
+            self.fileIndex = None
+
+
+    def run(self, interval=0.5, first=None):
+        """Generator. Scan directories and yield found items as tuples
+        (file type, directory path, name, stat result or None, LinkTo).
+        Yield None every `interval` seconds (the first time after `first`
+        seconds) and while waiting for content search worker processes."""
+        fltSpec = self.fltSpec
+        recurse, needStat, wantLinkTo = self.recurse, self.needStat, self.wantLinkTo
+        logErrs1, logErrs2, logErrs3 = self.logErrs1, self.logErrs2, self.logErrs3
+        logXdevs = self.logXdevs
+        fileIndex, scandirFunc = self.fileIndex, self.scandirFunc
+        # cache may be shared with other FINDs, report the difference
+        sc = self.scanCache
+        self.scanCacheBase = (sc.cntHits, sc.cntMisses) if sc else (0, 0)
+        doCont = self.doCont
+        if doCont:
+            querCont, binQuerCont = self.querCont, self.binQuerCont
+        cnt, cntItems, cntFound = Cnt(), 0, 0
+        self.cntBinary = 0
+        # time of phases, see phase_rows()
+        ph = self.ph = Phases()
+        contBytes = ph.contBytes
+        # one function with all active checks, see filter_compiler.py
+        fltAdapt = None
+        if OPT.FILTER_REORDER and len(fltSpec.active()) > 1:
+            fltAdapt = self.fltAdapt = filter_compiler.AdaptiveFilter(fltSpec, logErrs2)
+            fltMatch = fltAdapt.match
+        else:
+            fltMatch = filter_compiler.compile_filter(fltSpec, logErrs2)
+
+        # process found item; items found by content search in worker
+        # processes are processed later, in the same order
+        def found_item(endir, en, isDir, enft, enstat):
+            """Return result tuple for item that passed all filters, or None."""
+            if enft == '':
+                if isDir: enft = 'd'
+                else:
+                    try:
+                        if en.is_file(follow_symlinks=False):
+                            enft = '-'
+                        elif en.is_symlink():
+                            enft = 'l'
+                        else:
+                            enft = 'o'
+                    except OSError as e:
+                        logErrs2.append(str(e))
+                        return None
+            # no-stat mode: found items are not stat-ed if not needed,
+            # other file types are told apart by st_mode
+            if not enstat and (needStat or enft == 'o'):
+                try:
+                    enstat = en.stat(follow_symlinks=False)
+                except OSError as e:
+                    logErrs2.append(str(e))
+                    return None
+            if enft == 'o':
+                enft = _filemode(enstat.st_mode)[0]
+
+            # handle column LinkTo separately because it does not need stat
+            enlink = ''
+            if wantLinkTo and enft == 'l':
+                enlink = get_link_to(endir, en.name)
+            return (enft, endir, en.name, enstat, enlink)
+
+        def found_item_timed(args):
+            """Like found_item(), for one item in SAMPLE: time found_item()
+            and the caller."""
+            t = _perf()
+            r = found_item(*args)
+            t1 = _perf()
+            ph.tFound += t1 - t
+            ph.nFound += 1
+            if r:
+                yield r
+                ph.tUser += _perf() - t1
+                ph.nUser += 1
+
+        def tick():
+            """Yield None, time the caller."""
+            t = _perf()
+            yield None
+            ph.tTick += _perf() - t
+            ph.nTick += 1
+
+        self.tick = False
+        timer = Timer(interval, self.timer, first=first)
+        timer.start()
+        # pool of worker processes for filter Content
+        # contBatch -- items not yet sent to the pool
+        # contPending -- deque of (AsyncResult, items) sent to the pool
+        contPool, contBatch, contPending = None, [], deque()
+        scanner = None
+        try:
+            if doCont and OPT.CONT_PROCESSES > 1 and not self.depthFirst:
+                global multiprocessing
+                if multiprocessing is None:
+                    import multiprocessing
+                contPool = multiprocessing.get_context('spawn').Pool(OPT.CONT_PROCESSES)
+            maxPending = 2 * OPT.CONT_PROCESSES
+            for (inputDir, skipDirs, xdev) in self.inputDirs:
+                # file index (SQLite) cannot be used from several threads
+                if recurse and OPT.SCAN_THREADS > 1 and not fileIndex and not self.depthFirst:
+                    scanner = scantree_mt(inputDir, recurse, xdev,
+                                            logErrs1, logXdevs,
+                                            skipDirs, self.skipNames, self.fltSkipNames,
+                                            OPT.SCAN_THREADS, scandirFunc, cnt)
+                else:
+                    scanner = scantree(inputDir, recurse, xdev,
+                                            logErrs1, logXdevs,
+                                            skipDirs, self.skipNames, self.fltSkipNames,
+                                            OPT.SCAN_BREADTH_FIRST and not self.depthFirst,
+                                            scandirFunc, cnt)
+                for (endir, en, isDir) in scanner:
+                    ### periodically let the consumer update UI and cancel
+                    if self.tick:
+                        self.tick = False
+                        # enough items were checked to choose order of filters
+                        if fltAdapt and fltAdapt.ready():
+                            fltMatch = fltAdapt.optimize()
+                        self.cntItems, self.cntFound, self.cntDirs = cntItems, cntFound, cnt.d
+                        yield from tick()
+
+                    ### what we got from scandir()
+                    if not en:
+                        continue
+                    cntItems += 1
+
+                    ### apply filters to current DirEntry item en --------------
+                    if cntItems & SAMPLE != 1:
+                        r = fltMatch(en, isDir)
+                    else:
+                        t = _perf()
+                        r = fltMatch(en, isDir)
+                        ph.tFlt += _perf() - t
+                        ph.nFlt += 1
+                    if r is None:
+                        continue
+                    enft, enstat = r
+
+                    if doCont:
+                        if contPool:
+                            contBatch.append((endir, en, isDir, enft, enstat))
+                            if len(contBatch) < CONT_BATCH:
+                                continue
+                            contPending.append((contPool.apply_async(fltfuncs.flt_ContBatch,
+                                                ([i[1].path for i in contBatch], querCont, binQuerCont)),
+                                                contBatch))
+                            ph.nCont += len(contBatch)
+                            contBatch = []
+                            for r in self._cont_collect(contPending, maxPending):
+                                if r is None:
+                                    self.cntItems, self.cntFound, self.cntDirs = cntItems, cntFound, cnt.d
+                                    yield from tick()
+                                    continue
+                                cntFound += 1
+                                if cntFound & SAMPLE != 1:
+                                    r = found_item(*r)
+                                    if r: yield r
+                                else:
+                                    yield from found_item_timed(r)
+                            continue
+                        t = _perf()
+                        try:
+                            r = fltfuncs.flt_ContFile(en.path, querCont, binQuerCont, contBytes)
+                        except Exception as e:
+                            logErrs3.append('%s:\n    %s: %s' %(en.path, e.__class__.__name__, e))
+                            r = 0
+                        ph.tCont += _perf() - t
+                        ph.nCont += 1
+                        if r != 1:
+                            if r == fltfuncs.BINARY_SKIPPED:
+                                self.cntBinary += 1
+                            continue
+
+                    ### process found item ---------------------------
+                    cntFound += 1
+                    if cntFound & SAMPLE != 1:
+                        r = found_item(endir, en, isDir, enft, enstat)
+                        if r: yield r
+                    else:
+                        yield from found_item_timed((endir, en, isDir, enft, enstat))
+                # stop worker threads
+                scanner.close()
+                scanner = None
+
+            # wait for content search of remaining items
+            if contPool:
+                if contBatch:
+                    contPending.append((contPool.apply_async(fltfuncs.flt_ContBatch,
+                                        ([i[1].path for i in contBatch], querCont, binQuerCont)),
+                                        contBatch))
+                    ph.nCont += len(contBatch)
+                for r in self._cont_collect(contPending, 0):
+                    if r is None:
+                        self.cntFound = cntFound
+                        yield from tick()
+                        continue
+                    cntFound += 1
+                    if cntFound & SAMPLE != 1:
+                        r = found_item(*r)
+                        if r: yield r
+                    else:
+                        yield from found_item_timed(r)
+
+        finally:
+            # normal end, or generator was closed (FIND cancelled)
+            timer.cancel()
+            if scanner:
+                scanner.close()
+            if contPool:
+                contPool.terminate()
+            self.close()
+            self.cntItems, self.cntFound, self.cntDirs = cntItems, cntFound, cnt.d
+            ph.t1 = _perf()
+
+
+    def _cont_collect(self, pending, maxPending):
+        """Generator. Yield items that matched from finished content search
+        batches, oldest batches first. Wait while more than maxPending batches
+        are pending in the worker pool, yield None while waiting."""
+        while pending:
+            ar, items = pending[0]
+            if not ar.ready():
+                if len(pending) <= maxPending:
+                    break
+                # time of content search: waiting for worker processes
+                t = _perf()
+                ar.wait(0.1)
+                self.ph.tCont += _perf() - t
+                yield None
+                continue
+            pending.popleft()
+            res, nbytes = ar.get()
+            self.ph.contBytes[0] += nbytes
+            for item, (r, err) in zip(items, res):
+                if err:
+                    self.logErrs3.append(err)
+                elif r == 1:
+                    yield item
+                elif r == fltfuncs.BINARY_SKIPPED:
+                    self.cntBinary += 1
+
+
+    def phase_rows(self):
+        """Return time of phases of run() as rows for phase_table():
+        (phase, calls, seconds, estimated, note)."""
+        ph = self.ph
+        if not ph:
+            return []
+        est = lambda t, n, total: t * total / n if n else 0.0
+        rate = lambda n, t: '%.0f items/s' %(n / t) if t > 0 else ''
+        tFlt = est(ph.tFlt, ph.nFlt, self.cntItems)
+        tFound = est(ph.tFound, ph.nFound, self.cntFound)
+        tUser = est(ph.tUser, ph.nUser, self.cntFound)
+        # traversal is the rest of time spent in run()
+        tScan = max((ph.t1 - ph.t0) - ph.tTick - tUser - tFlt - tFound - ph.tCont, 0.0)
+        rows = [('scandir, traversal', self.cntDirs, tScan, True, rate(self.cntItems, tScan)),
+                ('filters', self.cntItems, tFlt, True, rate(self.cntItems, tFlt))]
+        if self.doCont:
+            b = ph.contBytes[0]
+            note = '%s read' % bytes2kibi(b)
+            if ph.tCont > 0:
+                note += ', %s/s' % bytes2kibi(b / ph.tCont)
+            name = 'content, waiting for workers' if OPT.CONT_PROCESSES > 1 and not self.depthFirst else 'content'
+            rows.append((name, ph.nCont, ph.tCont, False, note))
+        rows.append(('found items: stat, LinkTo', self.cntFound, tFound, True, ''))
+        rows.append(('caller: results', self.cntFound, tUser, True, ''))
+        rows.append(('caller: status, cancel', ph.nTick, ph.tTick, False, ''))
+        return rows
+
+
+    def errors(self):
+        """Return number of errors as string for status messages."""
+        return '%s+%s+%s' %(len(self.logErrs1), len(self.logErrs2), len(self.logErrs3))
+
+
+    def report(self):
+        """Return lines for the Log after the end of FIND: errors and
+        statistics."""
+        res = []
+        if self.logErrs1:
+            res.append('\n**OSError** (during file system traversal)')
+            res.extend(sorted(self.logErrs1))
+        if self.logErrs2:
+            res.append('\n**OSError** (during item processing)')
+            res.extend(sorted(self.logErrs2))
+        if self.logErrs3:
+            res.append('\n**Exception** (during file content search)')
+            res.extend(sorted(self.logErrs3))
+        if self.fltAdapt and self.fltAdapt.optimized:
+            res.append('\nFilter order: %s' %(', '.join(self.fltAdapt.order)))
+        if self.logXdevs is not None:
+            res.append('\nxdev-ed: %s' %repr(self.logXdevs))
+        if self.query['index']:
+            res.append('\nFile index: %s directories listed from index, %s directories scanned'
+                       %(self.cntIndexHits, self.cntIndexMisses))
+        elif self.scanCache:
+            sc, (hits, misses) = self.scanCache, self.scanCacheBase
+            res.append('\nScan cache: %s hits, %s misses; %s items (~%s) in cache'
+                       %(sc.cntHits - hits, sc.cntMisses - misses, sc.cntItems, bytes2kibi(sc.size())))
+        if self.closeErr:
+            res.append('\n%s' % self.closeErr)
+        return res
+
+
+def load_config(configDir, configFile, log):
+    """Get options from config file in directory configDir, replace options in
+    kintterFind_options with them. Append messages to list log."""
+    cf = os.path.join(configDir, configFile)
+    # can be symbolic link to a file, allow it
+    if _path.isfile(cf):
+        log.append('config file:\n    %s' %(quoted(cf)))
+    else:
+        log.append('config file (NOT FOUND):\n    %s' %(quoted(cf)))
+        return
+
+    options, errors = config_file_parser.parse(cf, OPT.options_table)
+    if errors:
+        log.extend(errors)
+    if not options:
+        return
+
+    # replace default option values with user values
+    for o in options:
+        setattr(OPT, o, options[o])
+
+
+def config_dir(configDir=''):
+    """Return full path of config directory."""
+    if not configDir:
+        configDir = CONFIGDIR
+    return full_path(configDir, basedir=PROGRAMDIR)
+
+
+#--- Timer -----------------------------------------------------------
+
+class Timer(threading.Thread):
+    """Adapted from class Timer(Thread) in Lib/threading.py.
+    Like threading.Timer(), but instead of running function once, repeat it
+    indefinitely until cancel() is called.
+    If `first` is given, it is the interval before the first call.
+    """
+
+    def __init__(self, interval, function, first=None):
+        threading.Thread.__init__(self, daemon=True)
+        self.interval = interval
+        self.function = function
+        self.first = interval if first is None else first
+        self.finished = threading.Event()
+
+    def cancel(self):
+        """Stop the timer if it hasn't finished yet."""
+        self.finished.set()
+
+    def run(self):
+        interval = self.first
+        while not self.finished.is_set():
+            self.finished.wait(interval)
+            if not self.finished.is_set():
+                self.function()
+            interval = self.interval
+
+
+#--- Phase timing ----------------------------------------------------
+
+class Phases:
+    """Time spent in phases of one Finder.run(). Sampled: time of one item in
+    SAMPLE+1, see Finder.phase_rows()."""
+
+    def __init__(self):
+        self.t0 = self.t1 = _perf() # start and end of run()
+        self.tFlt, self.nFlt = 0.0, 0 # filters, sampled
+        self.tFound, self.nFound = 0.0, 0 # found_item(), sampled
+        self.tUser, self.nUser = 0.0, 0 # caller, on found items, sampled
+        self.tTick, self.nTick = 0.0, 0 # caller, on timer ticks
+        self.tCont, self.nCont = 0.0, 0 # filter Content
+        self.contBytes = [0] # bytes read by filter Content
+
+
+def phase_table(rows, total=0):
+    """Return lines for the Log: table of phases. rows are (phase, calls,
+    seconds, estimated, note), see Finder.phase_rows(). total is the run
+    time of FIND in seconds."""
+    if not rows:
+        return []
+    if not total:
+        total = sum([r[2] for r in rows])
+    res = ['\n%-30s %9s %10s %6s' %('Phase', 'calls', 'seconds', '%')]
+    for (name, calls, t, estimated, note) in rows:
+        res.append(('%-30s %9s %10s %6.1f  %s' %(name, calls, '%s%.3f' %('~' if estimated else '', t),
+                                                 100.0 * t / total if total > 0 else 0, note)).rstrip())
+    res.append('%-30s %9s %10.3f' %('total', '', total))
+    res.append('(~ estimated from 1 of %s items)' %(SAMPLE + 1))
+    return res
+
+
+#--- Directory traversal ---------------------------------------------
+
+class Cnt:
+    """Number of scanned directories. Each FIND has its own counter, FINDs
+    can run at the same time in several threads."""
+
+    def __init__(self):
+        self.d = 0
+
+
+def scantree(dirpath, recurse, xdev, logErrs, logXdevs, skipPaths, skipNames, fltName, bfs=False,
+             scandirFunc=_scandir, cnt=None):
+    """Scan directory dirpath with scandir().
+    Yield (dirpath, DirEntry, isDirectory).
+    If bfs, traverse directories breadth-first instead of depth-first."""
+    # dirpath -- abs directory path
+    # recurse -- True or False
+    # xdev -- device number (not 0) of entry directory or None
+    # logErrs -- list to which errors are appended
+    # logXdevs -- list to which xdev-ed directories are appended
+    # skipPaths -- list of directory paths to skip, must be abspath-ed and normcase-ed
+    # skipNames -- list of directory names to skip
+    # fltName -- filter function to use with names in skipNames
+    # bfs -- True or False
+    # scandirFunc -- scandir() or its replacement, e.g., FileIndex.scandir()
+    # cnt -- Cnt, number of scanned directories is added to cnt.d
+    # When directory is skipped, skip it and everything in it (do not descent into it).
+    #
+    # Traversal is iterative, not recursive, so that the cost per item does
+    # not depend on directory depth and there is no recursion limit.
+    # stack -- (dirpath, scandir iterator) for each directory being scanned;
+    #   depth-first: subdirectory is pushed as soon as it is found;
+    #   breadth-first: there is only one iterator at a time.
+    # todo -- breadth-first: paths of directories waiting to be scanned.
+    if cnt is None:
+        cnt = Cnt()
+    stack, todo = [], deque()
+    nextDir = dirpath
+    try:
+        while True:
+            if nextDir is not None:
+                cnt.d += 1
+                try:
+                    stack.append((nextDir, scandirFunc(nextDir)))
+                except OSError as err:
+                    cnt.d -= 1
+                    logErrs.append('%s: %s' %(err.__class__.__name__, err))
+                    yield (nextDir, None, None)
+                nextDir = None
+                continue
+            if not stack:
+                if todo:
+                    nextDir = todo.popleft()
+                    continue
+                break
+
+            curDir, it = stack[-1]
+            try:
+                en = next(it, None)
+            except OSError as err:
+                stack.pop()
+                scandir_close(it)
+                cnt.d -= 1
+                logErrs.append('%s: %s' %(err.__class__.__name__, err))
+                yield (curDir, None, None)
+                continue
+            if en is None: # end of directory
+                stack.pop()
+                scandir_close(it)
+                continue
+
+            try:
+                isDir = en.is_dir(follow_symlinks=False)
+            except OSError as err:
+                logErrs.append('en.is_dir(): %s: %s' %(err.__class__.__name__, err))
+                yield (curDir, en, None)
+                continue
+            if isDir:
+                if skipPaths and is_subdir(_normcase(en.path), skipPaths):
+                    continue
+                if skipNames and fltName(en.name, skipNames):
+                    continue
+                yield (curDir, en, True)
+                if recurse:
+                    if xdev:
+                        try:
+                            xdev_ = en.stat(follow_symlinks=False).st_dev # 0 on Windows
+                            if xdev_ != xdev:
+                                if not xdev_:
+                                    logErrs.append('xdev check failed: st_dev=0: %s' %en.path)
+                                logXdevs.append(en.path)
+                                continue
+                        except OSError as err:
+                            logErrs.append('en.stat(): %s: %s' %(err.__class__.__name__, err))
+                            continue
+                    if bfs:
+                        todo.append(en.path)
+                    else:
+                        nextDir = en.path
+            else:
+                yield (curDir, en, False)
+    finally:
+        # generator was closed before the end (FIND cancelled)
+        for curDir, it in stack:
+            scandir_close(it)
+
+
+def scandir_close(it):
+    """Close scandir() iterator it, release file descriptor."""
+    # scandir iterator has no close() in Python < 3.6
+    close = getattr(it, 'close', None)
+    if close:
+        close()
+
+
+def scantree_mt(dirpath, recurse, xdev, logErrs, logXdevs, skipPaths, skipNames, fltName, nthreads,
+                scandirFunc=_scandir, cnt=None):
+    """Scan directory dirpath with scandir() in nthreads worker threads.
+    Yield (dirpath, DirEntry, isDirectory) like scantree(), but the order of
+    items is not the same."""
+    # Arguments are the same as for scantree().
+    # Workers take directory paths from queue qDirs, scan each directory with
+    # scandir_one() and put results in queue qRes. The generator itself reads
+    # qRes, puts new subdirectories into qDirs, and yields items.
+    # cnt.d is only modified here, in the consumer thread.
+    if cnt is None:
+        cnt = Cnt()
+    qDirs = queue.Queue()
+    qRes = queue.Queue(maxsize=nthreads*4) # limit memory if consumer is slow
+
+    def worker():
+        while True:
+            d = qDirs.get()
+            if d is None:
+                break
+            try:
+                res = scandir_one(d, recurse, xdev, logErrs, logXdevs,
+                                  skipPaths, skipNames, fltName, scandirFunc)
+            except BaseException as e: # pass it to consumer, otherwise it waits forever
+                res = e
+            qRes.put(res)
+
+    threads = []
+    for i in range(nthreads):
+        t = threading.Thread(target=worker, daemon=True)
+        t.start()
+        threads.append(t)
+
+    qDirs.put(dirpath)
+    pending = 1 # number of directories put in qDirs and not yet received from qRes
+    try:
+        while pending:
+            res = qRes.get()
+            pending -= 1
+            if isinstance(res, BaseException):
+                raise res
+            ok, items, subdirs = res
+            if ok:
+                cnt.d += 1
+            # give workers more work before yielding
+            for d in subdirs:
+                qDirs.put(d)
+                pending += 1
+            for item in items:
+                yield item
+    finally:
+        # Normal end, or generator was closed (FIND cancelled).
+        # Discard directories not yet taken by workers, stop all workers.
+        try:
+            while True:
+                qDirs.get_nowait()
+        except queue.Empty:
+            pass
+        for t in threads:
+            qDirs.put(None)
+        # unblock workers waiting on full qRes
+        try:
+            while True:
+                qRes.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def scandir_one(dirpath, recurse, xdev, logErrs, logXdevs, skipPaths, skipNames, fltName,
+                scandirFunc=_scandir):
+    """Scan one directory dirpath with scandir(), do not descend into subdirectories.
+    Return (ok, items, subdirs). items is list of (dirpath, DirEntry, isDirectory)
+    as yielded by scantree(). subdirs is list of paths of subdirectories to scan
+    next. ok is False if there was an error during scandir()."""
+    # Arguments are the same as for scantree(). This can run in worker threads.
+    items, subdirs = [], []
+    try:
+        for en in scandirFunc(dirpath):
+            try:
+                isDir = en.is_dir(follow_symlinks=False)
+            except OSError as err:
+                logErrs.append('en.is_dir(): %s: %s' %(err.__class__.__name__, err))
+                items.append((dirpath, en, None))
+                continue
+            if isDir:
+                if skipPaths and is_subdir(_normcase(en.path), skipPaths):
+                    continue
+                if skipNames and fltName(en.name, skipNames):
+                    continue
+                items.append((dirpath, en, True))
+                if recurse:
+                    if xdev:
+                        try:
+                            xdev_ = en.stat(follow_symlinks=False).st_dev # 0 on Windows
+                            if xdev_ != xdev:
+                                if not xdev_:
+                                    logErrs.append('xdev check failed: st_dev=0: %s' %en.path)
+                                logXdevs.append(en.path)
+                                continue
+                        except OSError as err:
+                            logErrs.append('en.stat(): %s: %s' %(err.__class__.__name__, err))
+                            continue
+                    subdirs.append(en.path)
+            else:
+                items.append((dirpath, en, False))
+    except OSError as err:
+        logErrs.append('%s: %s' %(err.__class__.__name__, err))
+        items.append((dirpath, None, None))
+        return (False, items, subdirs)
+    return (True, items, subdirs)
+
+
+#--- Input parsing ---------------------------------------------------
+
+def _items(v, sep='|', noempty=True):
+    """Return list of strings from query value v: string with items
+    separated by sep (see inpstr_to_items()), or list."""
+    if isinstance(v, str):
+        return inpstr_to_items(v, sep=sep, noempty=noempty)
+    res = ['%s' %i for i in v]
+    return [i for i in res if i] if noempty else res
+
+
+def _item(v):
+    """Return one string from query value v, see inpstr_to_items()."""
+    if isinstance(v, str):
+        return inpstr_to_items(v, sep=None)
+    if isinstance(v, (int, float)):
+        return '%s' % v
+    raise QueryError('Expected one string, not list: %s' % repr(v))
+
+
+def parse_names(s, mode='Contains', ic=True):
+    """Parse patterns for filters Name, Path, Skipped dirs.
+    Return (patterns, filter function, logstr); patterns is None if there is
+    nothing to search."""
+    if mode not in MATCH_MODES:
+        raise QueryError('Unknown match mode: %s\n(use %s)' %(repr(mode), ', '.join(MATCH_MODES)))
+    if mode == 'off':
+        return (None, None, '')
+
+    if mode == 'RegExp': # treat 'Name:' input as one string item
+        pttrns = _item(s)
+    else:
+        pttrns = _items(s, '|')
+
+    if not pttrns:
+        return (None, None, '')
+
+    ic = int(bool(ic)) # ignore case, 0 or 1
+
+    if mode == 'RegExp':
+        logstr = '%s\n    %s, IgnoreCase=%s' %(repr(pttrns), mode, ic)
+        flags = re.IGNORECASE if ic else 0
+        pttrns, msg = compile_regexp(pttrns, flags=flags)
+        if msg:
+            raise QueryError(msg)
+        qn = 1
+    else:
+        if ic:
+            pttrns = [s.casefold() for s in pttrns]
+        if len(pttrns) == 1:
+            pttrns, qn = pttrns[0], 1
+        else:
+            qn = 2
+        logstr = '%s\n    %s, IgnoreCase=%s' %(repr(pttrns), mode, ic)
+
+    if qn == 2:
+        pttrns, filterFunc = fltfuncs.compile_names(mode, pttrns, ic)
+    else:
+        filterFunc = fltfuncs.flt_NameMatchers[(mode, qn, ic)]
+
+    return (pttrns, filterFunc, logstr)
+
+
+def parse_mode(s, mode='RegExp'):
+    """Parse patterns for MODE in filter Misc.
+    Return (patterns, filter function, logstr); patterns is None if there is
+    nothing to search."""
+    if mode not in ('WildCard', 'RegExp'):
+        raise QueryError('Unknown match mode for MODE: %s\n(use WildCard, RegExp)' % repr(mode))
+    if mode == 'RegExp': # treat 'MODE:' input as one string item
+        pttrns = _item(s)
+    else:
+        pttrns = _items(s, '|')
+    if not pttrns:
+        return (None, None, '')
+    if mode == 'RegExp':
+        logstr = '%s\n    %s' %(repr(pttrns), mode)
+        pttrns, msg = compile_regexp(pttrns, flags=0)
+        if msg:
+            raise QueryError(msg)
+        qn = 1
+    else:
+        if len(pttrns) == 1:
+            pttrns, qn = pttrns[0], 1
+        else:
+            qn = 2
+        logstr = '%s\n    %s' %(repr(pttrns), mode)
+    if qn == 2:
+        return fltfuncs.compile_names(mode, pttrns, 0) + (logstr,) # IgnoreCase=0
+    return (pttrns, fltfuncs.flt_NameMatchers[(mode, qn, 0)], logstr) # IgnoreCase=0
+
+
+def parse_ints(v, sep='|'):
+    """Return list of integers from query value v: string, int, or list."""
+    if isinstance(v, int):
+        return [v]
+    if not isinstance(v, str):
+        v = '|'.join(['%s' %i for i in v])
+        sep = '|'
+    res, msg = inpstr_to_ints(v, sep=sep)
+    if msg:
+        raise QueryError(msg)
+    return res
+
+
+def parse_content(s, mode='Contains', ic=True, enc='utf-8', errors='strict',
+                  newline='None', binary='skip'):
+    """Parse data for filter Content.
+    Return (query, binary query, logstr), see fltfuncs.flt_ContFile()."""
+    pttrn = _item(s)
+    if not pttrn:
+        raise QueryError('Filter "Content": nothing to search')
+    if mode not in CONT_MODES:
+        raise QueryError('Filter "Content": unknown match mode: %s\n(use %s)' %(repr(mode), ', '.join(CONT_MODES)))
+    if binary not in ('skip', 'bytes', 'search'):
+        raise QueryError('Filter "Content": unknown binary: %s\n(use skip, bytes, search)' % repr(binary))
+    ic = int(bool(ic))
+
+    if mode == 'RegExp':
+        logstr = '%s\n    %s, IgnoreCase=%s' %(repr(pttrn), mode, ic)
+        flags = re.IGNORECASE if ic else 0
+        pttrn, msg = compile_regexp(pttrn, flags=flags)
+        if msg:
+            raise QueryError(msg)
+    else:
+        if ic:
+            pttrn = pttrn.casefold()
+        logstr = '%s\n    %s, IgnoreCase=%s' %(repr(pttrn), mode, ic)
+
+    matcherFunc = fltfuncs.flt_ContMatchers[(mode, ic)]
+
+    kwargs = {}
+    if '#' in enc:
+        enc, x = enc.split('#', 1)
+    enc = enc.strip()
+    if not enc:
+        raise QueryError('Filter "Content": no encoding')
+    kwargs['encoding'] = enc
+    kwargs['errors'] = errors
+    if newline == 'None':
+        kwargs['newline'] = None
+    elif newline == "''":
+        kwargs['newline'] = ''
+    else:
+        kwargs['newline'] = newline.replace('\\n', '\n').replace('\\r', '\r')
+    logstr += '; encoding=%s, errors=%s, newline=%s' % (repr(kwargs['encoding']), repr(kwargs['errors']), repr(kwargs['newline']))
+
+    query = (matcherFunc, pttrn, kwargs)
+
+    # Contains without IgnoreCase: search encoded pattern in raw bytes of file
+    # the result is the same as for decoded lines if pattern has no newlines,
+    # encoding is UTF-8 or single-byte, and errors neither fail nor create or
+    # remove text: not with 'strict', which raises UnicodeDecodeError for
+    # invalid bytes anywhere in the file, unless decoding cannot fail (latin-1)
+    bpttrn = None
+    if (OPT.CONT_BYTES_SEARCH and mode == 'Contains' and not ic
+            and '\n' not in pttrn and '\r' not in pttrn
+            and fltfuncs.is_bytes_codec(enc)):
+        try:
+            bpttrn = pttrn.encode(enc)
+        except UnicodeError:
+            pass
+    if (bpttrn and (kwargs['errors'] in ('replace', 'surrogateescape') or fltfuncs.is_total_codec(enc))
+            and not (kwargs['errors'] == 'replace' and '\ufffd' in pttrn)):
+        query = (fltfuncs.flt_ContContainsBytes, bpttrn, {'mode': 'rb'})
+        logstr += '; searching bytes'
+
+    # binary files (NUL in the first block): skip, search ignoring decoding
+    # errors, or search as text files
+    try:
+        isWide = b'\0' in 'a'.encode(enc) # NUL is normal in UTF-16, UTF-32 text
+    except LookupError:
+        isWide = False
+    if binary == 'search' or isWide:
+        binQuery = query
+    elif binary == 'skip':
+        binQuery = None
+    elif bpttrn:
+        binQuery = (fltfuncs.flt_ContContainsBytes, bpttrn, {'mode': 'rb'})
+    else:
+        binQuery = (matcherFunc, pttrn, dict(kwargs, errors='surrogateescape'))
+    logstr += '; binary=%s' % binary
+
+    return (query, binQuery, logstr)
+
+
+def parse_time(s):
+    """Convert time string (TIME_FORMAT) or number (seconds since the epoch)
+    to time. Return (time, logstr); time is None if s is empty."""
+    if isinstance(s, (int, float)):
+        return (s, '%s' % s)
+    s = s.strip()
+    if not s:
+        return (None, '')
+    logstr = s
+    try:
+        tm = time.strptime(s, TIME_FORMAT)
+        tm = time.mktime(tm)
+    except Exception as e:
+        raise QueryError('Cannot convert string to time: %s\n**Exception**:%s' %(repr(s), e_info(e)))
+    logstr = '%s (%s)' %(logstr, tm)
+    return (tm, logstr)
+
+
+def parse_size(s, units):
+    """Convert size string or number to file size in bytes.
+    Return (size, logstr); size is None if s is empty."""
+    s = ('%s' % s).strip()
+    if not s:
+        return (None, '')
+    logstr = s
+    try:
+        sz = float(s)
+        sz = int('%.0f' %(sz * units))
+    except Exception as e:
+        raise QueryError('Cannot convert string to file size: %s\n**Exception**:%s' %(repr(s), e_info(e)))
+    logstr = '%s (%s bytes)' %(logstr, sz)
+    return (sz, logstr)
+
+
+def inpstr_to_items(s, sep='|', noempty=True):
+    """Convert input string s to a list of strings, or one string item.
+    Items are separated by `sep` and may be surrounded by `"`.
+    Whitespace is stripped: leading, trailing, around `sep`.
+    Then enclosing "" are removed. If resulting string is empty, skip it.
+    if `sep` and not `noempty`: allow `""` as an item to denote empty string.
+    If not `sep`, process `s` as one item and return as string.
+    """
+    if sep:
+        res = []
+        items = s.split(sep)
+        for i in items:
+            j = i.strip()
+            if not j: continue
+            if len(j) > 1 and j[0] == '"' and j[-1] == '"':
+                j = j[1:-1]
+                if not j and noempty: continue
+            res.append(j)
+    else:
+        res = s.strip()
+        if len(res) > 1 and res[0] == '"' and res[-1] == '"':
+            res = res[1:-1]
+    return res
+
+
+def inpstr_to_ints(s, sep='|'):
+    """Convert input string s to a list of integers, or list with one integer."""
+    if sep:
+        items = s.split(sep)
+    else:
+        items = [s.strip()]
+    res = []
+    for i in items:
+        j = i.strip()
+        if not j: continue
+        try:
+            j = int(j)
+            res.append(j)
+        except Exception as e:
+            msg = 'Cannot convert to integer: %s\n**Exception**:%s' %(repr(j), e_info(e))
+            return ([], msg)
+    return (res, '')
+
+
+def process_input_dirs(dirs, mustexist=True, nosubdirs=True):
+    """Process list of input directories: expand user and vars, absolutize,
+    normalize, remove duplicates. Optionally: check for existence (raise
+    QueryError), remove subdirs."""
+    if not dirs:
+        return []
+    res, seen = [], {}
+    for d in dirs:
+        d = full_path(d)
+        # always remove duplicates
+        d_nc = _normcase(d)
+        if d_nc in seen:
+            continue
+        # when each entry must be a valid dir
+        if mustexist and (not _path.isdir(d) or _path.islink(d)):
+            raise QueryError('Path is not accessible or not a directory:\n%s' %(quoted(d)))
+        res.append(d)
+        seen[d_nc] = 1
+    # when searching recursively, subdirs must be removed
+    if nosubdirs:
+        res1 = []
+        for d in res:
+            d_nc = _normcase(d)
+            ok = True
+            for d2 in seen:
+                if d_nc != d2 and is_subdir(d_nc, [d2]): # duplicates have been removed already
+                    ok = False
+                    break
+            if ok:
+                res1.append(d)
+        return res1
+    else:
+        return res
+
+
+def is_subdir(subDir, parDirs):
+    """subDir is a directroy. parDirs is a list of directories.
+    Return True if subDir is sub-directory of, or same as, one of directories in parDirs.
+    IMPORTANT: all directores MUST be abspath-ed and normcase-ed.
+    """
+    for parDir in parDirs:
+        if not subDir.startswith(parDir):
+            continue
+        len_parDir = len(parDir)
+        # identical dirs
+        if len(subDir) == len_parDir:
+            return True
+        # parDir is a root dir such as / or C:\ -- otherwise abspath() removes end sep
+        elif parDir[-1] == _sep:
+            return True
+        elif subDir[len_parDir] == _sep:
+            return True
+    return False
+
+
+def full_path(p, basedir=None):
+    """Convert string p to full path. Expand ~, $HOME, etc. Normalize.
+    If basedir is given and p does not resolve to an absolute path, p is
+    relative to basedir, which must be full path to a dir.
+    """
+    p = _path.expanduser(p)
+    p = _path.expandvars(p)
+    if basedir:
+        if not _path.isabs(p):
+            p = _path.join(basedir, p)
+        p = _path.normpath(p)
+    else:
+        p = _path.abspath(p)
+    return p
+
+
+def compile_regexp(pttrn, flags):
+        try:
+            regexp = re.compile(pttrn, flags=flags)
+        except Exception as e:
+            msg = 'Cannot compile RegExp: %s\n**Exception**:%s' %(repr(pttrn), e_info(e))
+            return (None, msg)
+        else:
+            return (regexp, '')
+
+
+def bytes2kibi(b):
+    """Convert size in bytes to human-readable format using kibi-bytes.
+    Round to whole number."""
+    if b < 2**10:
+        return '%d B'   % (b)
+    elif b < 2**20-2**9:
+        return '%.0f K' % (b / 2**10)
+    elif b < 2**30-2**19:
+        return '%.0f M' % (b / 2**20)
+    elif b < 2**40-2**29:
+        return '%.0f G' % (b / 2**30)
+    elif b < 2**50-2**39:
+        return '%.0f T' % (b / 2**40)
+    else:
+        return '>= 1 P'
+
+
+def get_link_to(d, name):
+    """Return value of column LinkTo for symbolic link `name` in directory `d`."""
+    lp = os.readlink(_join(d, name))
+    if _path.isabs(lp):
+        lap = lp
+    else:
+        lap = _path.normpath(_join(d, lp))
+    return '[%s] %s' %(get_path_ft(lap), lp)
+
+
+def get_path_ft(p):
+    """Get filetype char for path p."""
+    try:
+        mode = os.stat(p, follow_symlinks=False).st_mode
+    except OSError:
+        return '!'
+    return _filemode(mode)[0]
+
+
+def get_ext(name):
+    """Return extension of file name."""
+    j = name.rfind('.')
+    if j > 0:
+        return name[j:]
+    return ''
+
+
+def e_info(e):
+    """Return info message string for Exception e."""
+    return '\n    %s: %s' %(e.__class__.__name__, e)
+
+
+if sys.platform == 'win32':
+
+    def quoted(s):
+        return '"%s"' % s
+
+else:
+
+    def quoted(s):
+        return "'%s'" % (s.replace("'", "'\\''"))
+
+
+# The End
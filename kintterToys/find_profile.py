@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+"""
+Profiling of one FIND for kintterFind: menu View -> Profile Next FIND, or
+option --profile of start_kintterFind.py. Usage:
+    from . import find_profile
+    prof = find_profile.Profile(configDir)
+    prof.start()
+    ... FIND ...
+    log.extend(prof.stop())
+
+FIND runs under cProfile and tracemalloc. Two files are written into the config
+directory, NAME is kintterFind-profile-YYYYmmdd-HHMMSS:
+    NAME.prof      -- cProfile statistics; view with "python3 -m pstats FILE",
+                      or with snakeviz, gprof2dot, etc.
+    NAME.alloc.txt -- largest allocations of memory still in use at the end of
+                      FIND (results, caches), with tracebacks
+The hottest functions and the largest allocations are summarized in the Log.
+
+cProfile sees only the thread that runs FIND. Time spent in directory scanning
+threads (option SCAN_THREADS), content search processes (CONT_PROCESSES), or
+in the search daemon (DAEMON_ADDRESS) shows up as waiting for them. Tracing
+memory allocations makes FIND several times slower, times are relative.
+"""
+
+import os, time
+import cProfile, pstats, tracemalloc
+
+from .find_engine import bytes2kibi
+
+# number of functions and allocations summarized in the Log
+TOP_LOG = 15
+# number of allocations written into NAME.alloc.txt
+TOP_FILE = 50
+# frames of tracebacks of allocations
+FRAMES = 10
+
+_path = os.path
+
+
+def func_name(func):
+    """Return short name of function from pstats key (file, line, name)."""
+    fn, line, name = func
+    if fn == '~' and line == 0: # built-in
+        return name
+    return '%s:%s(%s)' %(_path.basename(fn), line, name)
+
+
+class Profile:
+    """cProfile and tracemalloc around one FIND."""
+
+    def __init__(self, configDir):
+        self.configDir = configDir
+        self.prof = None
+        self.ownTracing = False # tracemalloc was started by us
+        self.mem0 = 0
+        self.t0 = 0
+
+    def start(self):
+        self.ownTracing = not tracemalloc.is_tracing()
+        if self.ownTracing:
+            tracemalloc.start(FRAMES)
+        self.mem0 = tracemalloc.get_traced_memory()[0]
+        self.t0 = time.time()
+        self.prof = cProfile.Profile()
+        self.prof.enable()
+
+    def stop(self):
+        """Stop profiling and write files. Return lines for the Log."""
+        self.prof.disable()
+        tT = time.time() - self.t0
+        snap = tracemalloc.take_snapshot()
+        mem1, peak = tracemalloc.get_traced_memory()
+        if self.ownTracing:
+            tracemalloc.stop()
+        snap = snap.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                   tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+                                   tracemalloc.Filter(False, '<unknown>')))
+
+        log = ['\nPROFILE OF FIND (cProfile, tracemalloc), %.3f seconds:' % tT]
+        name = _path.join(self.configDir, time.strftime('kintterFind-profile-%Y%m%d-%H%M%S'))
+        try:
+            self.prof.dump_stats(name + '.prof')
+            with open(name + '.alloc.txt', 'w', encoding='utf-8') as f:
+                self.write_allocs(f, snap)
+            log.append('    %s\n    %s' %(name + '.prof', name + '.alloc.txt'))
+        except OSError as e:
+            log.append('**OSError** while writing profile files:\n    %s' % e)
+
+        ### hottest functions ----------------------------------------
+        st = pstats.Stats(self.prof).stats
+        # func: (primitive calls, calls, own time, cumulative time, callers)
+        funcs = sorted(st.items(), key=lambda i: i[1][2], reverse=True)[:TOP_LOG]
+        log.append('Hottest functions (own time):')
+        log.append('%10s %9s %9s  %s' %('calls', 'own', 'cumul', 'function'))
+        for (func, (cc, nc, tt, ct, callers)) in funcs:
+            log.append('%10s %9.3f %9.3f  %s' %(nc, tt, ct, func_name(func)))
+
+        ### largest allocations --------------------------------------
+        x = ', peak %s' % bytes2kibi(peak) if self.ownTracing else ''
+        log.append('Memory in use: %s more than before FIND%s. Largest allocations:'
+                   %(bytes2kibi(mem1 - self.mem0), x))
+        for s in snap.statistics('lineno')[:TOP_LOG]:
+            fr = s.traceback[0]
+            log.append('%10s %9s  %s:%s' %(bytes2kibi(s.size), s.count,
+                                          _path.basename(fr.filename), fr.lineno))
+        return log
+
+    def write_allocs(self, f, snap):
+        """Write largest allocations with tracebacks into file f."""
+        stats = snap.statistics('traceback')
+        f.write('%s memory blocks in use at the end of FIND, %s\n'
+                %(sum([s.count for s in stats]), bytes2kibi(sum([s.size for s in stats]))))
+        for (i, s) in enumerate(stats[:TOP_FILE]):
+            f.write('\n#%s: %s in %s blocks\n' %(i + 1, bytes2kibi(s.size), s.count))
+            for line in s.traceback.format():
+                f.write('%s\n' % line)
+
+# The End
@@ -1,15 +1,20 @@
 # Filter functions.
 
-from fnmatch import fnmatchcase
-from time import strftime, localtime
-from stat import filemode
+from fnmatch import fnmatchcase, translate
+import re
+import os
+import codecs
+import io
+import mmap
 
-from .constants import TIME_FORMAT
+from .aho_corasick import AhoCorasick
 
-__all__ = ['flt_NameMatchers', 'flt_ContMatchers', "enst_Functions", 'make_comp_func']
+__all__ = ['flt_NameMatchers', 'compile_names', 'AC_MIN_PATTERNS', 'flt_ContMatchers', 'flt_ContContainsBytes', 'is_bytes_codec',
+           'is_total_codec', 'flt_ContFile', 'flt_ContBatch', 'BINARY_SKIPPED', 'make_comp_func']
 
 
 #--- filter Name functions -------------------------------------------
+# Functions for >=2 queries (*2, *2_IC) take queries made by compile_names().
 
 def flt_NameExact1(name, s):
     if s == name:
@@ -19,15 +24,14 @@ def flt_NameExact1_IC(name, s):
     if s == name.casefold():
         return 1
 
+# ss is frozenset
 def flt_NameExact2(name, ss):
-    for s in ss:
-        if s == name:
-            return 1
+    if name in ss:
+        return 1
 
 def flt_NameExact2_IC(name, ss):
-    for s in ss:
-        if s == name.casefold():
-            return 1
+    if name.casefold() in ss:
+        return 1
 
 #---
 def flt_NameContains1(name, s):
@@ -48,6 +52,18 @@ def flt_NameContains2_IC(name, ss):
         if s in name.casefold():
             return 1
 
+# ac is AhoCorasick automaton; used instead of flt_NameContains2 when there
+# are at least AC_MIN_PATTERNS patterns, a loop over few patterns is faster
+AC_MIN_PATTERNS = 32
+
+def flt_NameContainsAC(name, ac):
+    if ac.search(name):
+        return 1
+
+def flt_NameContainsAC_IC(name, ac):
+    if ac.search(name.casefold()):
+        return 1
+
 #---
 def flt_NameStartswith1(name, s):
     if name.startswith(s):
@@ -57,15 +73,14 @@ def flt_NameStartswith1_IC(name, s):
     if name.casefold().startswith(s):
         return 1
 
+# ss is tuple
 def flt_NameStartswith2(name, ss):
-    for s in ss:
-        if name.startswith(s):
-            return 1
+    if name.startswith(ss):
+        return 1
 
 def flt_NameStartswith2_IC(name, ss):
-    for s in ss:
-        if name.casefold().startswith(s):
-            return 1
+    if name.casefold().startswith(ss):
+        return 1
 
 #---
 def flt_NameEndswith1(name, s):
@@ -76,15 +91,14 @@ def flt_NameEndswith1_IC(name, s):
     if name.casefold().endswith(s):
         return 1
 
+# ss is tuple
 def flt_NameEndswith2(name, ss):
-    for s in ss:
-        if name.endswith(s):
-            return 1
+    if name.endswith(ss):
+        return 1
 
 def flt_NameEndswith2_IC(name, ss):
-    for s in ss:
-        if name.casefold().endswith(s):
-            return 1
+    if name.casefold().endswith(ss):
+        return 1
 
 #---
 def flt_NameWildcard1(name, w):
@@ -95,15 +109,14 @@ def flt_NameWildcard1_IC(name, w):
     if fnmatchcase(name.casefold(), w):
         return 1
 
+# ww is compiled regexp: all wildcards joined with |
 def flt_NameWildcard2(name, ww):
-    for w in ww:
-        if fnmatchcase(name, w):
-            return 1
+    if ww.match(name):
+        return 1
 
 def flt_NameWildcard2_IC(name, ww):
-    for w in ww:
-        if fnmatchcase(name.casefold(), w):
-            return 1
+    if ww.match(name.casefold()):
+        return 1
 
 #---
 def flt_NameRegexp(name, regExp):
@@ -140,6 +153,33 @@ flt_NameMatchers = {
             ('WildCard',   2, 1): flt_NameWildcard2_IC,
             }
 
+# keys are IgnoreCase; query is AhoCorasick(patterns)
+flt_NameContainsMany = {
+            0: flt_NameContainsAC,
+            1: flt_NameContainsAC_IC,
+            }
+
+
+def compile_names(mode, pttrns, ic):
+    """Prepare list of >=2 patterns for filter Name function of match mode
+    mode. Patterns must be casefolded if ic (IgnoreCase) is 1. Return (query,
+    filter function). Cost of the filter function then barely depends on the
+    number of patterns."""
+    func = flt_NameMatchers[(mode, 2, ic)]
+    if mode == 'Exact':
+        query = frozenset(pttrns)
+    elif mode in ('StartsWith', 'EndsWith'):
+        query = tuple(pttrns)
+    elif mode == 'WildCard':
+        # fnmatch.translate() adds \Z to each pattern
+        query = re.compile('|'.join([translate(w) for w in pttrns]))
+    elif mode == 'Contains' and len(pttrns) >= AC_MIN_PATTERNS:
+        query = AhoCorasick(pttrns)
+        func = flt_NameContainsMany[ic]
+    else:
+        query = pttrns
+    return (query, func)
+
 
 #--- filter Content functions ----------------------------------------
 # fl is opened file
@@ -182,6 +222,17 @@ def flt_ContRegexp(fl, regExp):
         if regExp.search(line):
             return 1
 
+#---
+def flt_ContContainsBytes(fl, b):
+    # fl is opened in binary mode; b is encoded pattern
+    try:
+        mm = mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError: # empty file
+        return
+    with mm:
+        if mm.find(b) >= 0:
+            return 1
+
 #--- filter Content func map ---
 flt_ContMatchers = {
             ('Contains',   0): flt_ContContains,
@@ -195,50 +246,85 @@ flt_ContMatchers = {
             ('RegExp',     1): flt_ContRegexp,
             }
 
-
-#--- DirEntry.stat() functions ---------------------------------------
-# Functions for getting values for DirEntry stat object.
-# There is no enst_size because Size is handled specially.
-
-def enst_mtime(st):
-    return strftime(TIME_FORMAT, localtime(st.st_mtime))
-
-def enst_ctime(st):
-    return strftime(TIME_FORMAT, localtime(st.st_ctime))
-
-def enst_atime(st):
-    return strftime(TIME_FORMAT, localtime(st.st_atime))
-
-def enst_mode(st):
-    return filemode(st.st_mode)
-
-def enst_uid(st):
-    return st.st_uid
-
-def enst_gid(st):
-    return st.st_gid
-
-def enst_nlink(st):
-    return st.st_nlink
-
-def enst_ino(st):
-    return st.st_ino
-
-def enst_dev(st):
-    return st.st_dev
-
-#--- DirEntry stat func map ---
-enst_Functions = {
-            'MTIME': enst_mtime,
-            'CTIME': enst_ctime,
-            'ATIME': enst_atime,
-            'MODE':  enst_mode,
-            'UID':   enst_uid,
-            'GID':   enst_gid,
-            'NLINK': enst_nlink,
-            'INO':   enst_ino,
-            'DEV':   enst_dev,
-            }
+#--- filter Content on bytes ---
+def is_bytes_codec(enc):
+    """Return True if a str can be searched in text encoded with enc by
+    searching for the encoded str in bytes: UTF-8 and single-byte encodings."""
+    try:
+        name = codecs.lookup(enc).name
+    except LookupError:
+        return False
+    if name == 'utf-8':
+        return True
+    try:
+        return len(bytes(range(256)).decode(name, 'replace')) == 256
+    except Exception:
+        return False
+
+def is_total_codec(enc):
+    """Return True if enc is a single-byte encoding in which every byte is a
+    character (latin-1, cp437, etc.): decoding with errors='strict' cannot fail."""
+    try:
+        return len(bytes(range(256)).decode(enc, 'strict')) == 256
+    except Exception:
+        return False
+
+#--- filter Content: one file ---
+# size of the first block of file that is checked for NUL bytes
+BINARY_BLOCK = 8192
+# flt_ContFile() result for binary file that was skipped
+BINARY_SKIPPED = -1
+
+def flt_ContFile(path, query, binQuery, nbytes=None):
+    """Search content of file at path. Return 1 if found, 0 if not found.
+    query is (matcherFunc, pattern, kwargs for open()).
+    binQuery is used instead of query if file is binary (has NUL byte in the
+    first block). If binQuery is None, binary file is skipped and
+    BINARY_SKIPPED is returned. If binQuery is query, there is no check.
+    If nbytes is a list, the number of bytes read is added to nbytes[0]."""
+    if binQuery is query:
+        matcherFunc, pttrn, kwargs = query
+        with open(path, **kwargs) as f:
+            r = 1 if matcherFunc(f, pttrn) else 0
+            if nbytes is not None:
+                nbytes[0] += bytes_read(getattr(f, 'buffer', f))
+            return r
+    with open(path, 'rb') as fb:
+        if b'\0' in fb.read(BINARY_BLOCK):
+            if binQuery is None:
+                if nbytes is not None:
+                    nbytes[0] += fb.tell()
+                return BINARY_SKIPPED
+            query = binQuery
+        matcherFunc, pttrn, kwargs = query
+        fb.seek(0)
+        if kwargs.get('mode') == 'rb':
+            f = fb
+        else:
+            f = io.TextIOWrapper(fb, **kwargs)
+        r = 1 if matcherFunc(f, pttrn) else 0
+        if nbytes is not None:
+            nbytes[0] += bytes_read(fb)
+        return r
+
+def bytes_read(fb):
+    """Return number of bytes read from binary file fb by a matcher."""
+    n = fb.tell()
+    # flt_ContContainsBytes() searches mmap-ed file, file position is 0
+    return n if n else os.fstat(fb.fileno()).st_size
+
+#--- filter Content in worker process ---
+def flt_ContBatch(paths, query, binQuery):
+    """Search content of files in paths. This runs in a worker process.
+    Return (list of (flt_ContFile() result, error message) in the same order
+    as paths, number of bytes read)."""
+    res, nbytes = [], [0]
+    for p in paths:
+        try:
+            res.append((flt_ContFile(p, query, binQuery, nbytes), ''))
+        except Exception as e:
+            res.append((0, '%s:\n    %s: %s' %(p, e.__class__.__name__, e)))
+    return (res, nbytes[0])
 
 
 #--- filter Time, Size functions -------------------------------------
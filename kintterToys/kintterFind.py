@@ -1,5 +1,4 @@
-import sys, os, re, time
-import threading
+import sys, os, time
 import stat # _stat
 import subprocess, shlex
 import tkinter as tk
@@ -10,13 +9,6 @@ import tkinter.messagebox as tkMessageBox
 import traceback # already in sys.modules
 shutil = None # lazy import
 
-# os.scandir() is available in Python >=3.5
-# users of Python 3.4 can install scandir from PyPI via pip
-_scandir = getattr(os, 'scandir', None)
-if not _scandir:
-    import scandir
-    _scandir = scandir.scandir
-
 # pwd, grp (non-Windows)
 try:
     import pwd, grp
@@ -32,8 +24,17 @@ if not (getattr(os, 'major', None) and getattr(os, 'minor', None)):
 from .constants import *
 from . import kintterFind_options as OPT
 from . import treeview_themes
-from . import config_file_parser
-from . import fltfuncs
+from . import treeview_rows
+from . import scan_cache
+from . import result_store
+from . import find_engine
+from . import find_profile
+from . import find_daemon
+from . import duplicates
+from . import disk_usage
+from . import top_results
+from .find_engine import (PROGRAMDIR, inpstr_to_items, full_path, bytes2kibi,
+                          get_link_to, get_path_ft, get_ext, e_info, quoted)
 
 # frequently used
 _sep = os.sep
@@ -45,8 +46,14 @@ _strftime = time.strftime
 _localtime = time.localtime
 _filemode = stat.filemode
 
-# Abs path of outside dir, that is dir of "start_kintterFind.py".
-PROGRAMDIR = _path.dirname(_path.dirname(_path.abspath(__file__)))
+# Max number of results put into Treeview on one timer tick during FIND.
+STREAM_BATCH = 2000
+
+# What FIND shows in Results, see c_btnFIND():
+# files -- found items
+# duplicates -- groups of found files with the same content, see duplicates.py
+# disk usage -- directories that use the most disk space, see disk_usage.py
+FIND_MODES = ('files', 'duplicates', 'disk usage')
 
 # Window title.
 if getattr(os, 'geteuid', None) and os.geteuid() == 0:
@@ -57,7 +64,7 @@ else:
 ######################################################################
 
 class Application:
-    def __init__(self, root, configDir, startupDir, startupLog):
+    def __init__(self, root, configDir, startupDir, startupLog, profile=False):
         self.root = root
         root.title(TITLE)
         root.resizable(width=True, height=True)
@@ -66,13 +73,15 @@ class Application:
 
         self._isBusy = False # True during FIND process
         self._isCancelled = False # True after CANCEL button pressed during FIND
+        self._profile = profile # profile the next FIND, see find_profile.py
 
-        self.RSLTS = []
+        # results of the last FIND, see result_store.py
+        self.RSLTS = result_store.ResultStore()
 
         # location of last mouse right-click; these are for Treeview popup menus
         self._popCID = '' # column id; this is column name (not '#1', '#2', etc)
         self._popIID = '' # item id of item under the cursor (clicked upon)
-        self._popIIDS = () # items id's of all selected items when click happened
+        self._popITXS = [] # indexes into RSLTS of all selected items when click happened
 
         # column id of last sorted column (has SL2H or SH2L at the end of heading)
         self._sortedCID = ''
@@ -81,9 +90,7 @@ class Application:
         startupLog.append('Starting...')
         startupLog.append('program directory:\n    %s' %(quoted(PROGRAMDIR)))
 
-        if not configDir:
-            configDir = CONFIGDIR
-        configDir = full_path(configDir, basedir=PROGRAMDIR)
+        configDir = find_engine.config_dir(configDir)
         self.configDir = configDir
         if _path.isdir(configDir): x = ''
         else: x = ' (NOT FOUND)'
@@ -92,6 +99,12 @@ class Application:
         # parse config file, replace options in OPT with user options
         self.do_configfile(configDir, 'kintterFind.config.py')
 
+        # cache of directory listings, kept between FINDs
+        if OPT.SCAN_CACHE_MB > 0:
+            self.scanCache = scan_cache.ScanCache(OPT.SCAN_CACHE_MB * 2**20)
+        else:
+            self.scanCache = None
+
         # set up application icon, if any
         if OPT.ICON:
             icon_path = full_path(OPT.ICON, basedir=configDir)
@@ -146,7 +159,8 @@ class Application:
         # ttk widgets that are always visible
         self.clickablesA = (self.ntbkResults, self.ntbkFilters,
                             #self.trvwResults, # disabling does not work, not needed
-                            self.cmbbDir, self.btnDirChooser, self.ckbRecurse, self.ckbXdev)
+                            self.cmbbDir, self.btnDirChooser, self.ckbRecurse, self.ckbXdev, self.ckbIndex,
+                            self.opmMode, self.entTop, self.opmTopBy)
         # ttk widgets in tabs of notebook Filters
         self.clickablesB = {0: (self.cmbbSkipDir, self.btnSkipDirChooser,
                                 self.cmbbSkipName, self.opmSkipNameMode, self.ckbSkipNameIC),
@@ -161,7 +175,8 @@ class Application:
                             6: (self.opmUID, self.entUID, self.opmGID, self.entGID,
                                 self.opmMODE, self.cmbbMODE, self.opmMODEMode, self.entNLINK),
                             7: (self.cmbbCont, self.opmContMode, self.ckbContIC,
-                                self.cmbbContEnc, self.opmContErrors, self.opmContNewline), }
+                                self.cmbbContEnc, self.opmContErrors, self.opmContNewline,
+                                self.opmContBinary), }
 
         # create menu bar
         # must be done after creating widgets: need Treeview columns
@@ -232,26 +247,7 @@ class Application:
 
     def do_configfile(self, configDir, configFile):
         """Get options from config file in directory configDir."""
-        log = self.startupLog
-
-        cf = os.path.join(configDir, configFile)
-        # can be symbolic link to a file, allow it
-        if _path.isfile(cf):
-            log.append('config file:\n    %s' %(quoted(cf)))
-        else:
-            log.append('config file (NOT FOUND):\n    %s' %(quoted(cf)))
-            return
-
-        options, errors = config_file_parser.parse(cf, OPT.options_table)
-        if errors:
-            log.extend(errors)
-        if not options:
-            return
-
-        # replace default option values with user values
-        # copy.deepcopy() ?
-        for o in options:
-            setattr(OPT, o, options[o])
+        find_engine.load_config(configDir, configFile, self.startupLog)
 
 
     def configure_tkFonts(self):
@@ -423,7 +419,7 @@ class Application:
         # first columns, always present in "columns" and have values
         self.trvwColumnsA = ('FileType', 'Directory', 'Name', 'Ext', 'SIZE', 'Size')
         # other columns, optional, may be added to and removed from "columns"
-        self.trvwColumnsB = ('MTIME', 'CTIME', 'ATIME', 'LinkTo', 'MODE', 'UID', 'GID', 'NLINK', 'INO', 'DEV')
+        self.trvwColumnsB = ('MTIME', 'CTIME', 'ATIME', 'LinkTo', 'MODE', 'UID', 'GID', 'NLINK', 'INO', 'DEV', 'Group', 'Disk')
         # all available columns
         self.trvwColumnsAB = self.trvwColumnsA + self.trvwColumnsB
 
@@ -453,9 +449,12 @@ class Application:
         # Scrollbars for Treeview
         scbyTreeview = ttk.Scrollbar(master, orient=tk.VERTICAL)
         scbxTreeview = ttk.Scrollbar(master, orient=tk.HORIZONTAL)
-        scbyTreeview.configure(command=_trvw.yview)
         scbxTreeview.configure(command=_trvw.xview)
-        _trvw.configure(yscrollcommand=scbyTreeview.set, xscrollcommand=scbxTreeview.set)
+        _trvw.configure(xscrollcommand=scbxTreeview.set)
+
+        # Treeview items for rows of RSLTS; this also handles vertical scrolling
+        fullLimit = OPT.VIRTUAL_RESULTS_MIN if OPT.VIRTUAL_RESULTS else sys.maxsize
+        self.trvwRows = treeview_rows.TreeviewRows(_trvw, scbyTreeview, self.trvw_row, fullLimit)
 
         # grid Treeview and its scrollbars
         frmResults.columnconfigure(0, weight=1)
@@ -530,6 +529,27 @@ class Application:
         self.var_ckbXdev.set(0)
         self.ckbXdev.grid(in_=frmPanelRow0, row=0, column=4, sticky=tk.W, padx=2)
 
+        # Checkbutton 'index'
+        self.var_ckbIndex = tk.IntVar()
+        self.ckbIndex = ttk.Checkbutton(master, text='index', variable=self.var_ckbIndex)
+        self.var_ckbIndex.set(0)
+        self.ckbIndex.grid(in_=frmPanelRow0, row=0, column=5, sticky=tk.W, padx=2)
+
+        # OptionMenu 'mode', see FIND_MODES
+        self.var_opmMode = tk.StringVar()
+        self.opmMode = tk_make_optionmenu(master, self.var_opmMode, FIND_MODES, default='files')
+        self.opmMode.grid(in_=frmPanelRow0, row=0, column=6, sticky=tk.W, padx=2)
+
+        # Entry 'top' and OptionMenu 'by': only the N best files, see top_results.py
+        lbl = ttk.Label(master, text='top')
+        lbl.grid(in_=frmPanelRow0, row=0, column=7, sticky=tk.W, padx=2)
+        self.entTop = ttk.Entry(master, width=6)
+        self.entTop.grid(in_=frmPanelRow0, row=0, column=8, sticky=tk.W)
+        self.var_opmTopBy = tk.StringVar()
+        self.opmTopBy = tk_make_optionmenu(master, self.var_opmTopBy, list(top_results.TOP_KEYS),
+                                           default='SIZE', width=5)
+        self.opmTopBy.grid(in_=frmPanelRow0, row=0, column=9, sticky=tk.W, padx=2)
+
 
         #--- frmPanelRow1 --------------------------------------------
         frmPanelRow1 = ttk.Frame(master)
@@ -918,6 +938,16 @@ class Application:
                                 default='None')
         self.opmContNewline.grid(in_=frm2, row=0, column=5, sticky=tk.W)
 
+        # Label
+        lblContBinary = ttk.Label(master, text='    binary=')
+        lblContBinary.grid(in_=frm2, row=0, column=6, sticky=tk.E)
+        # OptionMenu: what to do with files that have NUL in the first block
+        self.var_opmContBinary = tk.StringVar()
+        self.opmContBinary = tk_make_optionmenu(master, self.var_opmContBinary,
+                                ['skip', 'bytes', 'search'],
+                                default='skip')
+        self.opmContBinary.grid(in_=frm2, row=0, column=7, sticky=tk.W)
+
 
         #--- frmPanelRow1, col 1 -------------------------------------
         frm = ttk.Frame(master)
@@ -984,6 +1014,14 @@ class Application:
             headingKW[c]['anchor'] = tk.E
             columnKW[c]['anchor'] = tk.E
 
+        columnKW['Group']['width'] = 7*wi
+        headingKW['Group']['anchor'] = tk.E
+        columnKW['Group']['anchor'] = tk.E
+
+        columnKW['Disk']['width'] = 7*wi
+        headingKW['Disk']['anchor'] = tk.E
+        columnKW['Disk']['anchor'] = tk.E
+
 
     def trvw_configure_cols(self, colNames):
         """Configure Treeview headings and columns."""
@@ -1047,6 +1085,12 @@ class Application:
         self.var_rdbTrvwTheme.set(self.trvwThemeName)
 
         mnView.add_command(label='Clear Results', underline=1, command=self.c_trvw_clear)
+        if self.scanCache:
+            mnView.add_command(label='Clear Scan Cache', underline=6, command=self.c_clear_scancache)
+        mnView.add_separator()
+        self.var_ckbProfile = tk.IntVar()
+        self.var_ckbProfile.set(int(self._profile))
+        mnView.add_checkbutton(label='Profile Next FIND', underline=0, variable=self.var_ckbProfile)
 
         # Menu 'Help'
         mnHelp = tk.Menu(mnBar, tearoff=0)
@@ -1065,7 +1109,7 @@ class Application:
         not visible or has no selection."""
         if self._isBusy: return
 
-        if self.trvwResults.selection() and self.ntbkResults.index(self.ntbkResults.select()) == 0:
+        if self.trvwRows.has_selection() and self.ntbkResults.index(self.ntbkResults.select()) == 0:
             st = tk.NORMAL
         else:
             st = tk.DISABLED
@@ -1202,15 +1246,15 @@ class Application:
         elif rID == 'cell': # tree column not included
             if not iID: # empty area
                 return
-            selectedItems = _trvw.selection() # tuple of iID's of selected items
+            itx = int(iID) - 1
             # if item under mouse is not selected: select it, deselect other
-            if iID not in selectedItems:
-                _trvw.focus(iID)
-                _trvw.selection_set(iID)
-                self._popIIDS = (iID,)
+            if not self.trvwRows.is_selected(itx):
+                self.trvwRows.focus(itx)
+                self.trvwRows.selection_set([itx])
+                self._popITXS = [itx]
             else:
-                _trvw.focus(iID)
-                self._popIIDS = selectedItems
+                self.trvwRows.focus(itx)
+                self._popITXS = self.trvwRows.selection() # list of itx's of selected items
             # pop up menu for items
             self.pmenuResults.tk_popup(event.x_root, event.y_root)
             return
@@ -1371,24 +1415,37 @@ class Application:
                 else:
                     dispcols.append(colName)
             _trvw['displaycolumns'] = dispcols
+            # rows added without stat need values of the displayed column now
+            self.RSLTS.set_hidden([c for c in self.trvwColumnsA if c not in dispcols])
+            if self.RSLTS.stat_pending():
+                self.trvwRows.refresh()
             return
 
-        # column is also removed from or added to "columns"
-        # this means Treeview must be cleared of data, columns reconfigured
+        # column is also removed from or added to "columns" and RSLTS
+        # values of added column are obtained when rows are displayed
         cols = list(_trvw['columns'])
         if colName in dispcols:
             dispcols.remove(colName)
             cols.remove(colName)
+            self.RSLTS.remove_column(colName)
         else:
             dispcols.append(colName)
             cols.append(colName)
+            self.RSLTS.add_column(colName)
 
-        _trvw.delete(*_trvw.get_children())
-        self.RSLTS = []
+        # columns are reconfigured, this removes sort sign
+        sortedCID = self._sortedCID if self._sortedCID in cols else ''
+        if sortedCID:
+            h = _trvw.heading(sortedCID, option='text')
         _trvw['displaycolumns'] = [] # needed when removing
         _trvw['columns'] = cols
         _trvw['displaycolumns'] = dispcols
         self.trvw_configure_cols(cols)
+        if sortedCID:
+            _trvw.heading(sortedCID, text=h)
+        self._sortedCID = sortedCID
+        # put rows with new columns into Treeview, keep selection
+        self.trvwRows.refresh()
 
         # MUST match the order in cols
         self.trvwColumns2 = []
@@ -1400,12 +1457,18 @@ class Application:
     def c_trvw_clear(self):
         """Clear Results."""
         if self._isBusy: return
-        _trvw = self.trvwResults
-        _trvw.delete(*_trvw.get_children())
-        self.RSLTS = []
+        self.RSLTS = result_store.ResultStore()
+        self.trvwRows.set_data(0)
         self.lblStatus['text'] = 'Ready...'
 
 
+    def c_clear_scancache(self):
+        """Forget all cached directory listings."""
+        if self._isBusy: return
+        self.scanCache.clear()
+        self.lblStatus['text'] = 'Scan cache cleared.'
+
+
     def c_trvw_sort(self, how, c=None):
         """Sort Treeview column."""
         if self._isBusy: return
@@ -1442,19 +1505,14 @@ class Application:
         ### sort
         # sort data table and put it into Treeview (almost same as during FIND)
 
-        # clear Treeview
-        _trvw.delete(*_trvw.get_children())
-
         # sort items
-        _cols = _trvw['columns']
         colName = cID
         if colName == 'Size': # when sorting by size, always sort by actual size in bytes
             colName = 'SIZE'
-        idx = _cols.index(colName)
-        self.RSLTS.sort(key=lambda j: j[idx], reverse=isReverse)
+        self.RSLTS.sort([colName], reverse=isReverse)
 
         # put sorted items into Treeview
-        self.trvw_populate(self.RSLTS)
+        self.trvwRows.set_data(len(self.RSLTS))
 
         ### put sort sign in the heading of sorted column
         h = '%s%s' %(_trvw.heading(cID, option='text'), hSign)
@@ -1480,10 +1538,9 @@ class Application:
                 wi = self.width_char * 3
                 _trvw.column(cn, width=wi)
                 continue
-            cnx = _trvw['columns'].index(cn)
             maxlen = len(_trvw.heading(cn, option='text')) + 1
-            for row in self.RSLTS:
-                l = len('%s' % row[cnx])
+            for v in self.RSLTS.values(cn):
+                l = len('%s' % v)
                 if l > maxlen:
                     maxlen = l
             # add extra space to compensate for lack of gridlines
@@ -1498,35 +1555,31 @@ class Application:
         Copy to clipboard value in colName: Path, Directory, Name."""
         if self._isBusy: return
 
-        _cols = self.trvwResults['columns']
         _RSLTS = self.RSLTS
 
         # copy for one item under the cursor
         if not allsel:
             itx = int(self._popIID) - 1
             if colName == 'Path':
-                cnxD, cnxN = _cols.index('Directory'), _cols.index('Name')
-                v = _join(_RSLTS[itx][cnxD], _RSLTS[itx][cnxN])
+                v = _join(_RSLTS.value(itx, 'Directory'), _RSLTS.value(itx, 'Name'))
             else:
-                cnxX = _cols.index(colName)
-                v = _RSLTS[itx][cnxX]
+                v = _RSLTS.value(itx, colName)
             tk_clipboard_put(self.root, v)
             return
 
         # copy for all selected items
         vals = []
-        itxs = [(int(i) - 1) for i in self._popIIDS]
-        #itxs.sort() # not needed
+        itxs = self._popITXS
 
         if colName == 'Path':
-            cnxD, cnxN = _cols.index('Directory'), _cols.index('Name')
+            getD, getN = _RSLTS.getter('Directory'), _RSLTS.getter('Name')
             for itx in itxs:
-                v = _join(_RSLTS[itx][cnxD], _RSLTS[itx][cnxN])
+                v = _join(getD(itx), getN(itx))
                 vals.append(v)
         else:
-            cnxX = _cols.index(colName)
+            getX = _RSLTS.getter(colName)
             for itx in itxs:
-                v = _RSLTS[itx][cnxX]
+                v = getX(itx)
                 vals.append(v)
 
         # copy line-wise: put each value on a separate line
@@ -1550,78 +1603,31 @@ class Application:
         if self._isBusy: return
 
         _trvw = self.trvwResults
-        _cols = _trvw['columns']
         dispcols = _trvw['displaycolumns']
-        _RSLTS = self.RSLTS
-
-        cnxs = []
-        maxlens, anchors = {}, {}
-        firstrow = []
-        for cn in dispcols:
-            cnx = _cols.index(cn)
-            cnxs.append(cnx)
-            maxlens[cnx] = len(_trvw.heading(cn, option='text'))
-            anchors[cnx] = str(_trvw.column(cn, option='anchor')) == str(tk.W)
-            firstrow.append(_trvw.heading(cn, option='text'))
-
-        itxs = [(int(i) - 1) for i in self._popIIDS]
-        #itxs.sort() # not needed
-
-        # iterate over selected items to get maximum width of each column
-        for itx in itxs:
-            items = _RSLTS[itx]
-            for cnx in cnxs:
-                val = items[cnx]
-                wi = len('%s' % val)
-                if wi > maxlens[cnx]:
-                    maxlens[cnx] = wi
-
-        table = []
-
-        # first row of table: headings
-        row = ''
-        for i, cnx in enumerate(cnxs):
-            val = firstrow[i]
-            if anchors[cnx]:
-                row += '%-*s|' %(maxlens[cnx], val)
-            else:
-                row +=  '%*s|' %(maxlens[cnx], val)
-        table.append(row)
-
-        # iterate over selected items again and construct the table
-        for itx in itxs:
-            row = ''
-            items = _RSLTS[itx]
-            for cnx in cnxs:
-                val = items[cnx]
-                if anchors[cnx]:
-                    row += '%-*s|' %(maxlens[cnx], val)
-                else:
-                    row +=  '%*s|' %(maxlens[cnx], val)
-            table.append(row)
-
-        #table.append('')
-        txt = '\n'.join(table)
+        headings = [_trvw.heading(cn, option='text') for cn in dispcols]
+        left = [str(_trvw.column(cn, option='anchor')) == str(tk.W) for cn in dispcols]
+        # formatted by ResultStore.table_text(), also timed by benchmark.py
+        txt = self.RSLTS.table_text(self._popITXS, dispcols, headings, left)
         tk_clipboard_put(self.root, txt)
 
 
     def c_trvw_kb_selectall(self, event):
         """Select all items in Treeview."""
         if self._isBusy: return
-        self.trvwResults.selection_set(self.trvwResults.get_children())
+        self.trvwRows.select_all()
 
 
     def c_trvw_kb_scroll(self, event):
         """Treeview scrolling actions."""
         if self._isBusy: return
-        l = len(self.trvwResults.get_children())
+        l = len(self.RSLTS)
         if not l: return
         keysym = event.keysym
         #print(keysym)
         if keysym in ('KP_Home', 'Home'):
-            self.trvwResults.see('1')
+            self.trvwRows.see(0)
         elif keysym in ('KP_End', 'End'):
-            self.trvwResults.see(str(l))
+            self.trvwRows.see(l-1)
         elif keysym == 'KP_Prior': # PageUp
             self.trvwResults.event_generate('<Prior>')
         elif keysym == 'KP_Next': # PageDown
@@ -1653,9 +1659,8 @@ class Application:
         if not iID: # called from popup menu
             iID = self._popIID
         itx = int(iID) - 1
-        _cols = self.trvwResults['columns']
-        di = self.RSLTS[itx][_cols.index('Directory')]
-        na = self.RSLTS[itx][_cols.index('Name')]
+        di = self.RSLTS.value(itx, 'Directory')
+        na = self.RSLTS.value(itx, 'Name')
         pa = _join(di, na)
 
         if how == 'open':
@@ -1707,9 +1712,8 @@ class Application:
             iID = self._popIID
         itx = int(iID) - 1
 
-        _cols = self.trvwResults['columns']
-        di = self.RSLTS[itx][_cols.index('Directory')]
-        na = self.RSLTS[itx][_cols.index('Name')]
+        di = self.RSLTS.value(itx, 'Directory')
+        na = self.RSLTS.value(itx, 'Name')
         pa = _join(di, na)
 
         props = file_properties(pa)
@@ -1724,27 +1728,25 @@ class Application:
         if self._isBusy: return
 
         _RSLTS = self.RSLTS
-        _cols = self.trvwResults['columns']
-        cnxFT, cnxSIZE = _cols.index('FileType'), _cols.index('SIZE')
+        getFT, getSIZE = _RSLTS.getter('FileType'), _RSLTS.getter('SIZE')
 
         # count file types and their sizes: directory, regular file, symlink, other
         fileTypes = {'-':0, 'd':0, 'l':0, 'other':0}
         fileSizes = {'-':0, 'd':0, 'l':0, 'other':0}
         totalSize = 0
-        for iid in self._popIIDS:
-            itx = int(iid) - 1
-            ft = _RSLTS[itx][cnxFT]
+        for itx in self._popITXS:
+            ft = getFT(itx)
             if ft not in fileTypes:
                 ft = 'other'
             fileTypes[ft] += 1
-            b = _RSLTS[itx][cnxSIZE]
+            b = getSIZE(itx) or 0 # '' if lstat() failed
             fileSizes[ft] += b
             totalSize += b
 
-        m = len('%s' % max(list(fileTypes.values()) + [len(self._popIIDS)]))
+        m = len('%s' % max(list(fileTypes.values()) + [len(self._popITXS)]))
         res =   []
         for (txt, cnt, b) in [
-                ('       all items: ', len(self._popIIDS), totalSize),
+                ('       all items: ', len(self._popITXS), totalSize),
                 ('   regular files: ', fileTypes['-'], fileSizes['-']),
                 ('     directories: ', fileTypes['d'], fileSizes['d']),
                 ('  symbolic links: ', fileTypes['l'], fileSizes['l']),
@@ -1771,15 +1773,12 @@ class Application:
         global shutil
         if shutil is None:
             import shutil
-        _trvw = self.trvwResults
         _RSLTS = self.RSLTS
-        _cols = _trvw['columns']
-        cnxFT, cnxD, cnxN = _cols.index('FileType'), _cols.index('Directory'), _cols.index('Name')
-        selectedItems = _trvw.selection()
-        itxs = [(int(i) - 1) for i in selectedItems]
+        getFT, getD, getN = _RSLTS.getter('FileType'), _RSLTS.getter('Directory'), _RSLTS.getter('Name')
+        itxs = self.trvwRows.selection()
 
         # verify itxs
-        ok, msg = self.verify_itxs(selectedItems, itxs, cnxFT, cnxD, cnxN)
+        ok, msg = self.verify_itxs(itxs)
         if not ok:
             tk_msg_err('DELETE ABORTED.\nINTERNAL ERROR.\nSee Log for details.')
             self.log_put(LHR)
@@ -1792,7 +1791,7 @@ class Application:
         if not lenItems: return
         if lenItems == 1:
             itx = itxs[0]
-            ft, di, na = _RSLTS[itx][cnxFT], _RSLTS[itx][cnxD], _RSLTS[itx][cnxN]
+            ft, di, na = getFT(itx), getD(itx), getN(itx)
             pa = _join(di, na)
             ft_desc = '%s (%s)' %(ft, FT_DESCRIP.get(ft, 'n/a'))
             msg = 'Are you sure you want to\nPERMANENTLY DELETE this file?\n\nPath: %s\n\nName: %s\n\nType: %s' % (quoted(pa), quoted(na), ft_desc)
@@ -1809,8 +1808,8 @@ class Application:
         self.master.update_idletasks()
         pa_deleted, itx_deleted, pa_notdeleted = [], [], []
         for n, itx in enumerate(itxs):
-            pa = _join(_RSLTS[itx][cnxD], _RSLTS[itx][cnxN])
-            ft = _RSLTS[itx][cnxFT]
+            pa = _join(getD(itx), getN(itx))
+            ft = getFT(itx)
             itxs[n] = (pa, ft, itx)
         # reverse-sort by path to ensure that files in subdirs are deleted first
         itxs.sort(reverse=True)
@@ -1830,11 +1829,8 @@ class Application:
         if itx_deleted:
             self.lblStatus['text'] = 'displaying...'
             self.master.update_idletasks()
-            itx_deleted.sort(reverse=True)
-            for itx in itx_deleted:
-                del _RSLTS[itx]
-            _trvw.delete(*_trvw.get_children())
-            self.trvw_populate(_RSLTS)
+            _RSLTS.delete(itx_deleted)
+            self.trvwRows.set_data(len(_RSLTS))
 
         statusmsg = 'Deleted %s files.' % len(pa_deleted)
         self.log_put(LHR)
@@ -1848,28 +1844,33 @@ class Application:
         self.lblStatus['text'] = statusmsg
 
 
-    def verify_itxs(self, iids, itxs, cnxFT, cnxD, cnxN):
-        """Verify list of itxs (indexes into RSLTS) vs list of Treeview iids."""
+    def verify_itxs(self, itxs):
+        """Verify list of itxs (indexes into RSLTS) vs Treeview items."""
         # Get Directory/Name for the first and the last item using both RSLTS
         # and Treeview as source of data. Compare the two. This is intended to
         # detect one-off coding errors and blunders during critical operations
         # such as deleting selected files.
+        # Selected items can be scrolled out of Treeview (see TreeviewRows),
+        # then the first item in Treeview is checked instead.
 
         _RSLTS = self.RSLTS
         _trvw = self.trvwResults
 
         lenItems = len(itxs)
-        if lenItems != len(iids):
-            return (False, 'lengths of two lists are not equal')
         if lenItems > 1:
-            ii = [0, -1]
+            check = [itxs[0], itxs[-1]]
         elif lenItems == 1:
-            ii = [0]
+            check = [itxs[0]]
         else:
             return (True, '')
-        for i in ii:
-            itx, iid = itxs[i], iids[i]
-            ft1, di1, na1 = _RSLTS[itx][cnxFT], _RSLTS[itx][cnxD], _RSLTS[itx][cnxN]
+        if min(itxs) < 0 or max(itxs) >= len(_RSLTS):
+            return (False, 'index out of range')
+        check = [itx for itx in check if _trvw.exists(str(itx+1))]
+        if not check:
+            check = [self.trvwRows.wstart]
+        for itx in check:
+            iid = str(itx+1)
+            ft1, di1, na1 = _RSLTS.value(itx, 'FileType'), _RSLTS.value(itx, 'Directory'), _RSLTS.value(itx, 'Name')
             try: # UnicodeDecodeError error if invalid byte
                 ft2 = _trvw.set(iid, column='FileType')
                 di2 = _trvw.set(iid, column='Directory')
@@ -1882,246 +1883,137 @@ class Application:
         return (True, '')
 
 
+    def get_query(self):
+        """Return query for find_engine.Finder from input widgets. Only
+        filters on enabled tabs are included."""
+        q = {'dirs': self.cmbbDir.get(),
+             'recurse': self.var_ckbRecurse.get(),
+             'xdev': self.var_ckbXdev.get(),
+             'index': self.var_ckbIndex.get()}
+        isNot = lambda var: var.get().startswith('Not')
+        if self.tab_is_on(0):
+            q.update(skip_dirs=self.cmbbSkipDir.get(),
+                     skip_names=self.cmbbSkipName.get(),
+                     skip_names_mode=self.var_opmSkipNameMode.get(),
+                     skip_names_ic=self.var_ckbSkipNameIC.get())
+        for (tab, k, cmbb, opm, opmMode, ckbIC) in (
+                (1, 'name1', self.cmbbName1, self.var_opmName1, self.var_opmName1Mode, self.var_ckbName1IC),
+                (1, 'name2', self.cmbbName2, self.var_opmName2, self.var_opmName2Mode, self.var_ckbName2IC),
+                (2, 'path1', self.cmbbPath1, self.var_opmPath1, self.var_opmPath1Mode, self.var_ckbPath1IC),
+                (2, 'path2', self.cmbbPath2, self.var_opmPath2, self.var_opmPath2Mode, self.var_ckbPath2IC)):
+            if self.tab_is_on(tab):
+                q[k], q[k + '_not'] = cmbb.get(), isNot(opm)
+                q[k + '_mode'], q[k + '_ic'] = opmMode.get(), ckbIC.get()
+        if self.tab_is_on(3):
+            q['ext'], q['ext_not'] = self.cmbbExts.get(), isNot(self.var_opmExts)
+            q['types'] = ''.join([c for (c, var) in (('-', self.var_ckbTypeF), ('d', self.var_ckbTypeD),
+                                                     ('l', self.var_ckbTypeL), ('o', self.var_ckbTypeO))
+                                  if var.get()])
+        if self.tab_is_on(4):
+            q.update(size_min=self.entSize1.get(), size_max=self.entSize2.get(),
+                     size_units=self.var_opmSize.get().split(',')[1].strip())
+        if self.tab_is_on(5):
+            q.update(time_min=self.entTime1.get(), time_max=self.entTime2.get(),
+                     time_what=self.var_opmTime.get())
+        if self.tab_is_on(6):
+            q.update(uid=self.entUID.get(), uid_not=isNot(self.var_opmUID),
+                     gid=self.entGID.get(), gid_not=isNot(self.var_opmGID),
+                     nlink=self.entNLINK.get(),
+                     mode=self.cmbbMODE.get(), mode_mode=self.var_opmMODEMode.get(),
+                     mode_not=isNot(self.var_opmMODE))
+        if self.tab_is_on(7):
+            q.update(content=self.cmbbCont.get(), content_mode=self.var_opmContMode.get(),
+                     content_ic=self.var_ckbContIC.get(), content_encoding=self.cmbbContEnc.get(),
+                     content_errors=self.var_opmContErrors.get(),
+                     content_newline=self.var_opmContNewline.get(),
+                     content_binary=self.var_opmContBinary.get())
+        return q
+
+
     def c_btnFIND(self):
         """Command for button FIND. Run the FIND process."""
         if self._isBusy: return
 
         tT0 = _time() # start of total run time
         logFind = [LHR]
+        _trvw = self.trvwResults
+        mode = self.var_opmMode.get() # see FIND_MODES
+        # top -- keep only this many files with the largest column topBy
+        top, topBy = self.entTop.get().strip(), self.var_opmTopBy.get()
+        if top and mode == 'files':
+            try:
+                top = int(top)
+                if top < 1: raise ValueError
+            except ValueError:
+                tk_msg_errinp('Top: expected a positive integer, got: %s' % top)
+                return
+        else:
+            top = 0
 
-        ### directories to search ------------------------------------
-        var_ckbRecurse = self.var_ckbRecurse.get()
-        var_ckbXdev = self.var_ckbXdev.get()
+        # no-stat mode: if no displayed column needs stat, found items are not
+        # stat-ed; stat values are obtained later if needed, see result_store.py
+        dispcols = _trvw['displaycolumns']
+        # modes other than files, and Top-N, need stat
+        needStat = bool('SIZE' in dispcols or 'Size' in dispcols or mode != 'files' or top or
+                        [c for c in self.trvwColumns2 if c not in ('LinkTo', 'Group', 'Disk')])
+        # handle column LinkTo separately because it does not need stat
+        wantLinkTo = 'LinkTo' in self.trvwColumns2
 
-        inputDirs_v1 = inpstr_to_items(self.cmbbDir.get(), sep='|')
-        if not inputDirs_v1:
-            tk_msg_errinp('No Directories to search')
+        ### parse input, see find_engine.py ---------------------------
+        try:
+            # disk usage needs items in depth-first order, the daemon may use threads
+            if OPT.DAEMON_ADDRESS and mode != 'disk usage':
+                # shared caches in kintterFind_daemon.py
+                finder = find_daemon.RemoteFinder(self.get_query(), needStat, wantLinkTo,
+                                                  OPT.DAEMON_ADDRESS, self.configDir)
+            else:
+                finder = find_engine.Finder(self.get_query(), needStat, wantLinkTo,
+                                            self.scanCache, self.configDir)
+        except find_engine.QueryError as e:
+            tk_msg_errinp(str(e))
             return
-        inputDirs_v1 = process_input_dirs(inputDirs_v1, mustexist=True, nosubdirs=var_ckbRecurse)
-        if not inputDirs_v1:
+        except find_engine.FindError as e:
+            tk_msg_err(str(e))
             return
-        logFind.append('Directories: %s\n    recurse=%s, xdev=%s' %(inputDirs_v1, var_ckbRecurse, var_ckbXdev))
+        modeCol = ''
+        if mode == 'duplicates':
+            # found files are hashed, see duplicates.py
+            finder, modeCol = duplicates.DupFinder(finder), 'Group'
+        elif mode == 'disk usage':
+            # sizes of found items are summed per directory, see disk_usage.py
+            finder, modeCol = disk_usage.DuFinder(finder), 'Disk'
+        elif top:
+            # heap of the best items, see top_results.py
+            finder, modeCol = top_results.TopFinder(finder, top, topBy), topBy
+        # show column with values of the mode
+        if modeCol and modeCol not in dispcols:
+            self.c_trvw_toggle_col(modeCol)
+            self.vars_ckbToggleCol[self.trvwColumnsAB.index(modeCol)].set(1)
+            dispcols = _trvw['displaycolumns']
+        logFind.extend(finder.log)
+
+        # save input strings in dropdown lists
         tk_cmbb_save(self.cmbbDir, OPT.DROPDOWN_DIRECTORIES)
-
-        ### filter "Skipped dirs" ------------------------------------
-        # skip directories and all files under them
-        if self.tab_is_on(0):
-            # directory paths to skip (Combobox in row 1)
-            skipDirs = inpstr_to_items(self.cmbbSkipDir.get(), sep='|')
-            skipDirs = process_input_dirs(skipDirs, mustexist=False, nosubdirs=False)
-            # directory names to skip (Combobox and OptionMenu in row 2)
-            ok, pttnsSkipNames, fltfuncSkipNames, logstr = get_input_names(self.cmbbSkipName, self.var_opmSkipNameMode, self.var_ckbSkipNameIC)
-            if not ok: return
-            if not (skipDirs or pttnsSkipNames):
-                tk_msg_errinp('Filter "Skipped dirs": nothing to search')
-                return
-            if skipDirs:
-                logFind.append('Skip directories: %s' %(skipDirs))
-                tk_cmbb_save(self.cmbbSkipDir, OPT.DROPDOWN_SKIP_DIRECTORIES)
-            if pttnsSkipNames:
-                logFind.append('Skip dirs with name: %s' % logstr)
-                tk_cmbb_save(self.cmbbSkipName, OPT.DROPDOWN_SKIP_DIRS_WITH_NAME)
-        else:
-            skipDirs, pttnsSkipNames, fltfuncSkipNames = (), (), None
-
-        # Prepare inputDirs_v2: pair each path in inputDirs_v1 with a list
-        # of relevant path from skipDirs. Note that dirs in skipDirs were not verified.
-        inputDirs_v2 = []
-        for p in inputDirs_v1:
-            p1 = _normcase(p)
-            skipDirsNew, ok = [], True
-            for p2 in skipDirs:
-                p2 = _normcase(p2)
-                if is_subdir(p1, [p2]): # input dir itself is skipped, drop it from result
-                    ok = False
-                    break
-                else:
-                    skipDirsNew.append(p2)
-                    # p2 is saved normcase-ed
-                    # p1 is not normcase-ed: result paths should be as typed by user
-            if ok:
-                xdev = None
-                if var_ckbXdev:
-                    try:
-                        xdev = os.stat(p, follow_symlinks=False).st_dev
-                    except OSError as err:
-                        tk_msg_err('**OSError** while getting device number:\n%s' %(e_info(err)))
-                        return
-                    if not xdev:
-                        tk_msg_err('Cannot get device number for directory:\n%s' %(quoted(p)))
-                        return
-                inputDirs_v2.append((p, skipDirsNew, xdev))
-
-
-        ### filter "Name" --------------------------------------------
-        doName1, doName2 = False, False
-        if self.tab_is_on(1):
-            # combobox Name1
-            ok, querName1, fltfuncName1, logstr = get_input_names(self.cmbbName1, self.var_opmName1Mode, self.var_ckbName1IC)
-            if not ok: return
-            if querName1:
-                doName1 = True
-                yesName1 = self.var_opmName1.get()
-                logFind.append('%s %s' %(yesName1, logstr))
-                yesName1 = not yesName1.startswith('Not')
-                tk_cmbb_save(self.cmbbName1, OPT.DROPDOWN_NAME_1)
-            # combobox Name2
-            ok, querName2, fltfuncName2, logstr = get_input_names(self.cmbbName2, self.var_opmName2Mode, self.var_ckbName2IC)
-            if not ok: return
-            if querName2:
-                doName2 = True
-                yesName2 = self.var_opmName2.get()
-                logFind.append('%s %s' %(yesName2, logstr))
-                yesName2 = not yesName2.startswith('Not')
-                tk_cmbb_save(self.cmbbName2, OPT.DROPDOWN_NAME_2)
-            if not (doName1 or doName2):
-                tk_msg_errinp('Filter "Name": nothing to search')
-                return
-
-        ### filter "Path" --------------------------------------------
-        doPath1, doPath2 = False, False
-        if self.tab_is_on(2):
-            # combobox Path1
-            ok, querPath1, fltfuncPath1, logstr = get_input_names(self.cmbbPath1, self.var_opmPath1Mode, self.var_ckbPath1IC)
-            if not ok: return
-            if querPath1:
-                doPath1 = True
-                yesPath1 = self.var_opmPath1.get()
-                logFind.append('%s %s' %(yesPath1, logstr))
-                yesPath1 = not yesPath1.startswith('Not')
-                tk_cmbb_save(self.cmbbPath1, OPT.DROPDOWN_PATH_1)
-            # combobox Path2
-            ok, querPath2, fltfuncPath2, logstr = get_input_names(self.cmbbPath2, self.var_opmPath2Mode, self.var_ckbPath2IC)
-            if not ok: return
-            if querPath2:
-                doPath2 = True
-                yesPath2 = self.var_opmPath2.get()
-                logFind.append('%s %s' %(yesPath2, logstr))
-                yesPath2 = not yesPath2.startswith('Not')
-                tk_cmbb_save(self.cmbbPath2, OPT.DROPDOWN_PATH_2)
-            if not (doPath1 or doPath2):
-                tk_msg_errinp('Filter "Path": nothing to search')
-                return
-
-        ### filter "Type" --------------------------------------------
-        doFT, doExt = False, False
-        if self.tab_is_on(3):
-            # Extension
-            querExt = inpstr_to_items(self.cmbbExts.get(), sep='|', noempty=False)
-            if querExt:
-                doExt = True
-                for (i, s) in enumerate(querExt):
-                    if s:
-                        querExt[i] = '.%s' %(s.casefold())
-                yesExt = self.var_opmExts.get()
-                logFind.append('%s %s' %(yesExt, repr(querExt)))
-                querExt = {}.fromkeys(querExt)
-                yesExt = not yesExt.startswith('Not')
-                tk_cmbb_save(self.cmbbExts, OPT.DROPDOWN_EXTENSION)
-            # FileType
-            querFT = []
-            if self.var_ckbTypeF.get(): querFT.append('-')
-            if self.var_ckbTypeD.get(): querFT.append('d')
-            if self.var_ckbTypeL.get(): querFT.append('l')
-            if self.var_ckbTypeO.get(): querFT.append('o')
-            if len(querFT) != 4:
-                doFT = True
-                logFind.append('File type: %s' %(repr(querFT)))
-                querFT = {}.fromkeys(querFT)
-
-            if not (doExt or doFT):
-                tk_msg_errinp('Filter "Type": nothing to search')
-                return
-
-        ### filter "Size" --------------------------------------------
-        doSize = self.tab_is_on(4)
-        if doSize:
-            what = self.var_opmSize.get()
-            units = what.split(',')[1].strip()
-            units = {'bytes':1,
-                    'K':1024, 'M':1024**2, 'G':1024**3, 'T':1024**4,
-                    'k':1000, 'm':1000**2, 'g':1000**3, 't':1000**4,
-                    }[units]
-            ok, sz1, logstr1 = get_input_size(self.entSize1, units)
-            if not ok: return
-            ok, sz2, logstr2 = get_input_size(self.entSize2, units)
-            if not ok: return
-            if (sz1 is None) and (sz2 is None):
-                tk_msg_errinp('Filter "Size": nothing to search')
-                return
-            logstr1 = '%s < ' %logstr1 if sz1 else ''
-            logstr2 = ' < %s' %logstr2 if sz2 else ''
-            logFind.append('%s%s%s' %(logstr1, what, logstr2))
-            fltfuncSize = fltfuncs.make_comp_func(sz1, sz2, 'st_size')
-
-        ### filter "Time" --------------------------------------------
-        doTime = self.tab_is_on(5)
-        if doTime:
-            ok, tm1, logstr1 = get_input_time(self.entTime1)
-            if not ok: return
-            ok, tm2, logstr2 = get_input_time(self.entTime2)
-            if not ok: return
-            if (tm1 is None) and (tm2 is None):
-                tk_msg_errinp('Filter "Time": nothing to search')
-                return
-            what = self.var_opmTime.get()
-            logstr1 = '%s < ' %logstr1 if tm1 else ''
-            logstr2 = ' < %s' %logstr2 if tm2 else ''
-            logFind.append('%s%s%s' %(logstr1, what, logstr2))
-            if what == 'MTIME':   att = 'st_mtime'
-            elif what == 'CTIME': att = 'st_ctime'
-            elif what == 'ATIME': att = 'st_atime'
-            fltfuncTime = fltfuncs.make_comp_func(tm1, tm2, att)
-
-        ### filter "Misc" --------------------------------------------
-        doMisc = self.tab_is_on(6)
-        if doMisc:
-            ok, querUID, querGID, querNLINK, querMODE, fltfuncMODE, logstr = get_input_misc(self.entUID, self.entGID, self.entNLINK, self.cmbbMODE, self.var_opmMODEMode)
-            if not ok: return
-            if not (querUID or querGID or querNLINK or querMODE):
-                tk_msg_errinp('Filter "Misc": nothing to search')
-                return
-            if querUID:
-                yesUID = self.var_opmUID.get()
-                logFind.append('%s %s' %(yesUID, repr(list(querUID))))
-                yesUID = not yesUID.startswith('Not')
-            if querGID:
-                yesGID = self.var_opmGID.get()
-                logFind.append('%s %s' %(yesGID, repr(list(querGID))))
-                yesGID = not yesGID.startswith('Not')
-            if querNLINK:
-                querNlink = querNLINK[0]
-                logFind.append('NLINK > %s' %(repr(querNlink)))
-            if querMODE:
-                yesMODE = self.var_opmMODE.get()
-                logFind.append('%s %s' %(yesMODE, logstr))
-                yesMODE = not yesMODE.startswith('Not')
-                tk_cmbb_save(self.cmbbMODE, OPT.DROPDOWN_MODE)
-
-        ### filter "Content" -----------------------------------------
-        doCont = self.tab_is_on(7)
-        if doCont:
-            ok, querCont, fltfuncCont, kwargsCont, logstr = get_input_content(self.cmbbCont, self.var_opmContMode, self.var_ckbContIC, self.cmbbContEnc, self.var_opmContErrors, self.var_opmContNewline)
-            if not ok: return
-            logFind.append('Content: %s' %logstr)
-            tk_cmbb_save(self.cmbbCont, OPT.DROPDOWN_LINE)
-            tk_cmbb_save(self.cmbbContEnc, OPT.DROPDOWN_ENCODING)
-
-        ### needEnstat
-        if doTime or doSize or doMisc:
-            needEnstat = True
-        else:
-            needEnstat = False
-
+        for (tab, cmbb, defaults) in (
+                (0, self.cmbbSkipDir, OPT.DROPDOWN_SKIP_DIRECTORIES),
+                (0, self.cmbbSkipName, OPT.DROPDOWN_SKIP_DIRS_WITH_NAME),
+                (1, self.cmbbName1, OPT.DROPDOWN_NAME_1),
+                (1, self.cmbbName2, OPT.DROPDOWN_NAME_2),
+                (2, self.cmbbPath1, OPT.DROPDOWN_PATH_1),
+                (2, self.cmbbPath2, OPT.DROPDOWN_PATH_2),
+                (3, self.cmbbExts, OPT.DROPDOWN_EXTENSION),
+                (6, self.cmbbMODE, OPT.DROPDOWN_MODE),
+                (7, self.cmbbCont, OPT.DROPDOWN_LINE),
+                (7, self.cmbbContEnc, OPT.DROPDOWN_ENCODING)):
+            if self.tab_is_on(tab):
+                tk_cmbb_save(cmbb, defaults)
 
         ### prepare to scan ------------------------------------------
-        _trvw = self.trvwResults
-        resTable, logErrs1, logErrs2, logErrs3, logXdevs = [], [], [], [], None
-        if var_ckbXdev: logXdevs = []
-        Cnt.d, cntItems, cntFound = 0, 0, 0
-
-        # handle column LinkTo separately because it does not need stat
-        wantLinkTo = 'LinkTo' in self.trvwColumns2
+        # columns MUST be in same order as in Treeview "columns"
+        resTable = result_store.ResultStore(list(self.trvwColumnsA) + self.trvwColumns2,
+                                            get_ext, bytes2kibi, get_link_to,
+                                            dirSizes=(mode == 'disk usage'))
+        resTable.set_hidden([c for c in self.trvwColumnsA if c not in dispcols])
 
         # prepare widgets
         self._isBusy = True
@@ -2129,8 +2021,11 @@ class Application:
         self.btnFIND['state'] = tk.DISABLED
         self.btnCANCEL['state'] = tk.NORMAL
         self.txtLog['state'] = tk.DISABLED
-        _trvw.delete(*_trvw.get_children())
-        self.RSLTS = []
+        # resTable grows during FIND; Treeview shows its first cntShown rows
+        self.RSLTS = resTable
+        self.trvwRows.set_data(0)
+        self.trvw_remove_sort_sign(self._sortedCID)
+        self._sortedCID = ''
         self.lblStatus['text'] = 'searching...'
 
         # index of currently selected (visible) tab in notebook Filters
@@ -2142,269 +2037,112 @@ class Application:
         self.master.update_idletasks()
 
         ### start of scanning ----------------------------------------
-        # Iterate over input dirs and find matching files.
-        self._isTime = False
-        self._timer = Timer(2, self.timer)
-        self._timer.start()
+        # Found items come from the engine one by one. On each timer tick the
+        # engine yields None: update Statusbar and check if CANCEL was pressed.
+        # When streaming, found items are put into Treeview unsorted on each
+        # timer tick; the first tick is soon after start.
+        # cntShown -- number of items from resTable already in Treeview
+        # maxShown -- max number of items displayed before the end of FIND
+        doStream, cntShown = OPT.STREAM_RESULTS, 0
+        maxShown = sys.maxsize if OPT.VIRTUAL_RESULTS else OPT.MAX_RESULTS
+        if doStream:
+            found = finder.run(0.5, first=0.2)
+        else:
+            found = finder.run(2)
+        # cProfile and tracemalloc, see find_profile.py
+        prof = None
+        if self.var_ckbProfile.get():
+            self.var_ckbProfile.set(0)
+            prof = find_profile.Profile(self.configDir)
+            prof.start()
         tT1 = _time() # start of scanning time
         ### try: -----------------------------------------------------
         try:
             ok, notok = False, False
-            for (inputDir, skipDirs, xdev) in inputDirs_v2:
-                for (endir, en, isDir) in scantree(inputDir, var_ckbRecurse, xdev,
-                                            logErrs1, logXdevs,
-                                            skipDirs, pttnsSkipNames, fltfuncSkipNames):
-                    # TESTING: reduce scan speed
-                    #time.sleep(0.2)
-                    ### periodically update Statusbar and check if CANCEL button was pressed
-                    if self._isTime:
-                        self._isTime = False
-                        tNow = _time()
-                        self.status_put('searching...', cntFound, cntItems, Cnt.d,
-                                        '%s+%s+%s' %(len(logErrs1), len(logErrs2), len(logErrs3)),
-                                        tNow-tT1, tNow-tT0)
-                        self.master.update()
-                        if self._isCancelled:
-                            self.status_put('cancelled...', cntFound, cntItems, Cnt.d,
-                                            '%s+%s+%s' %(len(logErrs1), len(logErrs2), len(logErrs3)),
-                                            _time()-tT1, _time()-tT0)
-                            self._timer.cancel()
-                            break
-
-                    ### what we got from scandir()
-                    if not en:
-                        continue
-                    cntItems += 1
-
-                    ### apply filters to current DirEntry item en --------------
-                    enname = en.name
-
-                    if doName1:
-                        if fltfuncName1(enname, querName1):
-                            if not yesName1: continue
-                        else:
-                            if yesName1: continue
-
-                    if doName2:
-                        if fltfuncName2(enname, querName2):
-                            if not yesName2: continue
-                        else:
-                            if yesName2: continue
-
-                    if doPath1:
-                        if fltfuncPath1(en.path, querPath1):
-                            if not yesPath1: continue
-                        else:
-                            if yesPath1: continue
-
-                    if doPath2:
-                        if fltfuncPath2(en.path, querPath2):
-                            if not yesPath2: continue
-                        else:
-                            if yesPath2: continue
-
-                    resCache = {}
-                    if doExt:
-                        enext = get_ext(enname)
-                        if enext.casefold() in querExt:
-                            if not yesExt: continue
-                        else:
-                            if yesExt: continue
-                        resCache['Ext'] = enext
-
-                    enft = ''
-                    if doFT:
-                        if isDir: enft = 'd'
-                        else:
-                            try:
-                                if en.is_file(follow_symlinks=False): enft = '-'
-                                elif en.is_symlink(): enft = 'l'
-                                else: enft = 'o'
-                            except OSError as e:
-                                logErrs2.append(str(e))
-                                continue
-                        if enft not in querFT: continue
-
-                    # call en.stat() only once the first time enstat is needed
-                    # do this now if enstat is needed for one of next filters
-                    enstat = None
-                    if needEnstat:
-                        try:
-                            enstat = en.stat(follow_symlinks=False)
-                        except OSError as e:
-                            logErrs2.append(str(e))
-                            continue
-
-                        if doSize:
-                            if not fltfuncSize(enstat): continue
-
-                        if doTime:
-                            if not fltfuncTime(enstat): continue
-
-                        if doMisc:
-                            if querUID:
-                                if enstat.st_uid in querUID:
-                                    if not yesUID: continue
-                                else:
-                                    if yesUID: continue
-                            if querGID:
-                                if enstat.st_gid in querGID:
-                                    if not yesGID: continue
-                                else:
-                                    if yesGID: continue
-                            if querNLINK:
-                                if enstat.st_nlink <= querNlink: continue
-                            if querMODE:
-                                enmode = _filemode(enstat.st_mode)
-                                if fltfuncMODE(enmode, querMODE):
-                                    if not yesMODE: continue
-                                else:
-                                    if yesMODE: continue
-                                resCache['MODE'] = enmode
-
-                    if doCont:
-                        # reject items other than regular files
-                        if enft == '':
-                            if isDir: continue
-                            try:
-                                if en.is_file(follow_symlinks=False): enft = '-'
-                                else: continue
-                            except OSError as e:
-                                logErrs2.append(str(e))
-                                continue
-                        elif enft != '-':
-                            continue
-                        try:
-                            with open(en.path, **kwargsCont) as f:
-                                if not fltfuncCont(f, querCont):
-                                    continue
-                        except Exception as e:
-                            logErrs3.append('%s:\n    %s: %s' %(en.path, e.__class__.__name__, e))
-                            continue
-
-                    ### process found item ---------------------------
-                    cntFound += 1
-                    enpath = en.path
-                    if not enstat:
-                        try:
-                            enstat = en.stat(follow_symlinks=False)
-                        except OSError as e:
-                            logErrs2.append(str(e))
-                            continue
-                    if enft == '':
-                        if isDir: enft = 'd'
-                        else:
-                            try:
-                                if en.is_file(follow_symlinks=False):
-                                    enft = '-'
-                                elif en.is_symlink():
-                                    enft = 'l'
-                                else:
-                                    enft = _filemode(enstat.st_mode)[0]
-                            except OSError as e:
-                                logErrs2.append(str(e))
-                                continue
-                    elif enft == 'o':
-                        enft = _filemode(enstat.st_mode)[0]
-
-                    if 'Ext' in resCache:
-                        enext = resCache['Ext']
-                    else:
-                        enext = get_ext(enname)
-
-                    # handle columns SIZE and Size (always available together)
-                    ensize = enstat.st_size
-                    if isDir:
-                        enSize = '<DIR>'
+            _append = resTable.append
+            for item in found:
+                if item is not None:
+                    _append(*item)
+                    continue
+                # TESTING: reduce scan speed
+                #time.sleep(0.2)
+                if doStream and cntShown < len(resTable) and cntShown < maxShown:
+                    # virtual Treeview gets only visible rows, no need to limit
+                    if self.trvwRows.virtual:
+                        cntShown = len(resTable)
                     else:
-                        enSize = bytes2kibi(ensize)
-
-                    # row for insertion into results table
-                    # items MUST be in same order as in self.trvwColumns
-                    # append values for first 6 columns which are always present:
-                    #   'FileType', 'Directory', 'Name', 'Ext', 'SIZE', 'Size'
-                    res = [enft, endir, enname, enext, ensize, enSize]
-
-                    # handle column LinkTo
-                    if wantLinkTo:
-                        if enft == 'l':
-                            lp = os.readlink(enpath)
-                            if _path.isabs(lp):
-                                lap = lp
-                            else:
-                                lap = _path.normpath(_join(endir, lp))
-                            lft = get_path_ft(lap)
-                            resCache['LinkTo'] = '[%s] %s' %(lft, lp)
-                        else:
-                            resCache['LinkTo'] = ''
-
-                    # append values for all other (optional) columns
-                    # they are always derived from stat
-                    for c in self.trvwColumns2:
-                        if c in resCache:
-                            res.append(resCache[c])
-                        else:
-                            res.append(fltfuncs.enst_Functions[c](enstat))
-
-                    # add this row to results
-                    resTable.append(tuple(res))
-                    # end of processing found item -------------------
+                        cntShown = min(len(resTable), maxShown, cntShown + STREAM_BATCH)
+                    self.trvwRows.grow(cntShown)
+                tNow = _time()
+                self.status_put(finder.stage if mode != 'files' or top else 'searching...', finder.cntFound, finder.cntItems, finder.cntDirs,
+                                finder.errors(), tNow-tT1, tNow-tT0, binary=finder.cntBinary)
+                self.master.update()
                 if self._isCancelled:
+                    # stops worker threads and processes
+                    found.close()
+                    self.status_put('cancelled...', finder.cntFound, finder.cntItems, finder.cntDirs,
+                                    finder.errors(), _time()-tT1, _time()-tT0, binary=finder.cntBinary)
                     break
 
             ### end of scanning --------------------------------------
-            self._timer.cancel()
             tT1 = _time()-tT1 # scanning time
-            lenErrs = '%s+%s+%s' %(len(logErrs1), len(logErrs2), len(logErrs3))
+            lenErrs = finder.errors()
 
             # cannot cancel while tree is being populated
             self.btnCANCEL['state'] = tk.DISABLED
-            self.status_put('displaying...', cntFound, cntItems, Cnt.d, lenErrs, tT1, _time()-tT0)
+            self.status_put('displaying...', finder.cntFound, finder.cntItems, finder.cntDirs,
+                            lenErrs, tT1, _time()-tT0, binary=finder.cntBinary)
             self.master.update_idletasks()
 
             ### save errors ------------------------------------------
-            if logErrs1:
-                logFind.append('\n**OSError** (during file system traversal)')
-                logErrs1.sort()
-                logFind.extend(logErrs1)
-            if logErrs2:
-                logFind.append('\n**OSError** (during item processing)')
-                logErrs2.sort()
-                logFind.extend(logErrs2)
-            if logErrs3:
-                logFind.append('\n**Exception** (during file content search)')
-                logErrs3.sort()
-                logFind.extend(logErrs3)
-            if var_ckbXdev:
-                logFind.append('\nxdev-ed: %s' %repr(logXdevs))
+            logFind.extend(finder.report())
 
             ### warn if there are too many results to display --------
-            if cntFound > OPT.MAX_RESULTS:
+            # not needed when only visible rows are put into Treeview
+            if len(resTable) > OPT.MAX_RESULTS and not OPT.VIRTUAL_RESULTS:
                 tT00 = _time()
-                yesno = tkMessageBox.askyesno('%s -- Confirm' % TITLE, 'Display %s results?' % cntFound)
+                yesno = tkMessageBox.askyesno('%s -- Confirm' % TITLE, 'Display %s results?' % len(resTable))
                 tT0 += _time() - tT00
                 if not yesno:
                     logFind.append('\nRESULTS NOT DISPLAYED')
+                    self.RSLTS = result_store.ResultStore()
+                    self.trvwRows.set_data(0)
                     ok = True
                     return
 
             ### populate Treeview with results -----------------------
+            phases = []
             if resTable:
-                resTable.sort(key=lambda j: j[2]) # sort by Name
-                resTable.sort(key=lambda j: j[1]) # sort by Directory
-                self.trvw_populate(resTable)
+                tT00 = _time()
+                if top:
+                    # already sorted by TopFinder, largest first
+                    sortCols, reverse = [topBy], True
+                elif mode == 'files':
+                    sortCols, reverse = ['Directory', 'Name'], False
+                elif mode == 'duplicates':
+                    sortCols, reverse = ['Group'], False
+                else:
+                    sortCols, reverse = ['Disk'], True
+                if not top:
+                    resTable.sort(sortCols, reverse)
+                tSort = _time() - tT00
+                # replace streamed unsorted items
+                self.trvwRows.set_data(len(resTable))
+                self.master.update_idletasks()
+                phases = [('display: sort', len(resTable), tSort, False, ''),
+                          ('display: Treeview', len(resTable), _time()-tT00-tSort, False, '')]
 
-                self.RSLTS = resTable
                 #_trvw.selection_set('1')
                 #_trvw.focus('1')
 
                 # remove old sort sign
                 self.trvw_remove_sort_sign(self._sortedCID)
-                # put new sort sign in Directory heading
-                h = '%s%s' %(_trvw.heading('Directory', option='text'), SL2H)
-                _trvw.heading('Directory', text=h)
-                self._sortedCID = 'Directory'
+                # put new sort sign in Directory (Group, Disk) heading
+                h = '%s%s' %(_trvw.heading(sortCols[0], option='text'), SH2L if reverse else SL2H)
+                _trvw.heading(sortCols[0], text=h)
+                self._sortedCID = sortCols[0]
 
+            logFind.extend(find_engine.phase_table(finder.phase_rows() + phases, _time()-tT0))
             ok = True
 
         ### except: --------------------------------------------------
@@ -2421,7 +2159,12 @@ class Application:
 
         ### finally: -------------------------------------------------
         finally:
-            self._timer.cancel()
+            found.close()
+            if prof:
+                try:
+                    logFind.extend(prof.stop())
+                except Exception as e:
+                    logFind.append('**Exception** while saving profile:%s' % e_info(e))
             self.btnFIND['state'] = tk.NORMAL
             self.btnCANCEL['state'] = tk.DISABLED
             # print to log
@@ -2437,7 +2180,8 @@ class Application:
                 self.lblStatus.configure(background='yellow', foreground='red')
             else:
                 x = 'DONE.' if not self._isCancelled else 'CANCELLED.'
-                self.status_put(x, cntFound, cntItems, Cnt.d, lenErrs, tT1, _time()-tT0, True)
+                self.status_put(x, finder.cntFound, finder.cntItems, finder.cntDirs, lenErrs, tT1,
+                                _time()-tT0, True, binary=finder.cntBinary)
             self.txtLog.see(tk.END)
 
         # end of FIND
@@ -2450,18 +2194,17 @@ class Application:
         self.btnCANCEL['state'] = tk.DISABLED
 
 
-    def trvw_populate(self, resTable):
-        """Populate empty Treeview with data from resTable."""
-        _trvw = self.trvwResults
-        _tags = {'d': 'd', 'l': 'l'}
-        for n, i in enumerate(resTable, start=1):
-            if i[0] == '-':
-                t = []
-            else:
-                t = [_tags.get(i[0], 'o')]
-            if not n % 2:
-                t.append('s')
-            _trvw.insert('', 'end', iid='%s' %n, values=i, tags=t)
+    def trvw_row(self, itx, _tags={'d': 'd', 'l': 'l'}):
+        """Return (values, tags) of Treeview item for row itx of RSLTS.
+        Called by TreeviewRows when the item is put into Treeview."""
+        row = self.RSLTS[itx]
+        if row[0] == '-':
+            t = []
+        else:
+            t = [_tags.get(row[0], 'o')]
+        if itx % 2:
+            t.append('s')
+        return (row, t)
 
 
     def trvw_remove_sort_sign(self, col):
@@ -2480,11 +2223,6 @@ class Application:
         return self.ntbkFilters.tab(idx, option='text').startswith(TAB_ON)
 
 
-    def timer(self):
-        if not self._isBusy: return
-        self._isTime = True
-
-
     def disable_gui_state(self, disable, clickables):
         # Disable or un-disable clickable ttk widgets, toplevel menus,
         # detachable menus.
@@ -2513,9 +2251,12 @@ class Application:
                 m.entryconfigure(i, state=tkState)
 
 
-    def status_put(self, status, found, scanned, dirs, errs, time2, time1, toLog=False):
+    def status_put(self, status, found, scanned, dirs, errs, time2, time1, toLog=False, binary=0):
         # Put message on statusbar during FIND.
-        s = '%s Found %s items. %s errors. Scanned %s items in %s directories in %.2f sec. Run time %.2f sec.' %(status, found, errs, scanned, dirs, time2, time1)
+        s = '%s Found %s items. %s errors.' %(status, found, errs)
+        if binary:
+            s += ' Skipped %s binary files.' %(binary)
+        s += ' Scanned %s items in %s directories in %.2f sec. Run time %.2f sec.' %(scanned, dirs, time2, time1)
         self.lblStatus['text'] = s
         if toLog:
             self.txtLog.insert(tk.END, '\n%s\n' %s)
@@ -2535,372 +2276,6 @@ class Application:
         self.txtLog.see(tk.END)
 
 
-class Timer(threading.Thread):
-    """Adapted from class Timer(Thread) in Lib/threading.py.
-    Like threading.Timer(), but instead of running function once, repeat it
-    indefinitely until cancel() is called.
-    """
-
-    def __init__(self, interval, function):
-        threading.Thread.__init__(self)
-        self.interval = interval
-        self.function = function
-        self.finished = threading.Event()
-
-    def cancel(self):
-        """Stop the timer if it hasn't finished yet."""
-        self.finished.set()
-
-    def run(self):
-        while not self.finished.is_set():
-            self.finished.wait(self.interval)
-            if not self.finished.is_set():
-                self.function()
-
-
-class Cnt:
-    d = 0
-
-
-def scantree(dirpath, recurse, xdev, logErrs, logXdevs, skipPaths, skipNames, fltName):
-    """Scan directory dirpath with scandir().
-    Yield (dirpath, DirEntry, isDirectory)."""
-    # dirpath -- abs directory path
-    # recurse -- True or False
-    # xdev -- device number (not 0) of entry directory or None
-    # logErrs -- list to which errors are appended
-    # logXdevs -- list to which xdev-ed directories are appended
-    # skipPaths -- list of directory paths to skip, must be abspath-ed and normcase-ed
-    # skipNames -- list of directory names to skip
-    # fltName -- filter function to use with names in skipNames
-    # When directory is skipped, skip it and everything in it (do not descent into it).
-    Cnt.d += 1
-    try:
-        for en in _scandir(dirpath):
-            try:
-                isDir = en.is_dir(follow_symlinks=False)
-            except OSError as err:
-                logErrs.append('en.is_dir(): %s: %s' %(err.__class__.__name__, err))
-                yield (dirpath, en, None)
-                continue
-            if isDir:
-                if skipPaths and is_subdir(_normcase(en.path), skipPaths):
-                    continue
-                if skipNames and fltName(en.name, skipNames):
-                    continue
-                yield (dirpath, en, True)
-                if recurse:
-                    if xdev:
-                        try:
-                            xdev_ = en.stat(follow_symlinks=False).st_dev # 0 on Windows
-                            if xdev_ != xdev:
-                                if not xdev_:
-                                    logErrs.append('xdev check failed: st_dev=0: %s' %en.path)
-                                logXdevs.append(en.path)
-                                continue
-                        except OSError as err:
-                            logErrs.append('en.stat(): %s: %s' %(err.__class__.__name__, err))
-                            continue
-                    for item in scantree(en.path, recurse, xdev, logErrs, logXdevs,
-                                            skipPaths, skipNames, fltName):
-                        yield item
-            else:
-                yield (dirpath, en, False)
-    except OSError as err:
-        Cnt.d -= 1
-        logErrs.append('%s: %s' %(err.__class__.__name__, err))
-        yield (dirpath, None, None)
-
-
-def inpstr_to_items(s, sep='|', noempty=True):
-    """Convert input string s to a list of strings, or one string item.
-    Items are separated by `sep` and may be surrounded by `"`.
-    Whitespace is stripped: leading, trailing, around `sep`.
-    Then enclosing "" are removed. If resulting string is empty, skip it.
-    if `sep` and not `noempty`: allow `""` as an item to denote empty string.
-    If not `sep`, process `s` as one item and return as string.
-    """
-    if sep:
-        res = []
-        items = s.split(sep)
-        for i in items:
-            j = i.strip()
-            if not j: continue
-            if len(j) > 1 and j[0] == '"' and j[-1] == '"':
-                j = j[1:-1]
-                if not j and noempty: continue
-            res.append(j)
-    else:
-        res = s.strip()
-        if len(res) > 1 and res[0] == '"' and res[-1] == '"':
-            res = res[1:-1]
-    return res
-
-
-def inpstr_to_ints(s, sep='|'):
-    """Convert input string s to a list of integers, or list with one integer."""
-    if sep:
-        items = s.split(sep)
-    else:
-        items = [s.strip()]
-    res = []
-    for i in items:
-        j = i.strip()
-        if not j: continue
-        try:
-            j = int(j)
-            res.append(j)
-        except Exception as e:
-            msg = 'Cannot convert to integer: %s\n**Exception**:%s' %(repr(j), e_info(e))
-            return ([], msg)
-    return (res, '')
-
-
-def process_input_dirs(dirs, mustexist=True, nosubdirs=True):
-    """Process list of input directories: expand user and vars, absolutize,
-    normalize, remove duplicates. Optionally: check for existence, remove subdirs."""
-    if not dirs:
-        return []
-    res, seen = [], {}
-    for d in dirs:
-        d = full_path(d)
-        # always remove duplicates
-        d_nc = _normcase(d)
-        if d_nc in seen:
-            continue
-        # when each entry must be a valid dir
-        if mustexist and (not _path.isdir(d) or _path.islink(d)):
-            tk_msg_errinp('Path is not accessible or not a directory:\n%s' %(quoted(d)))
-            return None
-        res.append(d)
-        seen[d_nc] = 1
-    # when searching recursively, subdirs must be removed
-    if nosubdirs:
-        res1 = []
-        for d in res:
-            d_nc = _normcase(d)
-            ok = True
-            for d2 in seen:
-                if d_nc != d2 and is_subdir(d_nc, [d2]): # duplicates have been removed already
-                    ok = False
-                    break
-            if ok:
-                res1.append(d)
-        return res1
-    else:
-        return res
-
-
-def get_input_names(cmbbName, var_opmNameMode, var_ckbNameIC):
-    """Process string entered in combobox Name or Path.
-    Return (ok, list-of-patterns, filter-function, logstr)."""
-
-    s = cmbbName.get()
-
-    var_mode = var_opmNameMode.get() # which filter function to use
-    if var_mode == 'off':
-        return (1, None, None, '')
-
-    if var_mode == 'RegExp': # treat 'Name:' input as one string item
-        pttrns = inpstr_to_items(s, sep=None)
-    else:
-        pttrns = inpstr_to_items(s, sep='|')
-
-    if not pttrns:
-        return (1, None, None, '')
-
-    var_ic = var_ckbNameIC.get() # ignore case, 0 or 1
-
-    if var_mode == 'RegExp':
-        logstr = '%s\n    %s, IgnoreCase=%s' %(repr(pttrns), var_mode, var_ic)
-        flags = re.IGNORECASE if var_ic else 0
-        pttrns, msg = compile_regexp(pttrns, flags=flags)
-        if msg:
-            tk_msg_errinp(msg)
-            return (0, None, None, '')
-        qn = 1
-    else:
-        if var_ic:
-            pttrns = [s.casefold() for s in pttrns]
-        if len(pttrns) == 1:
-            pttrns, qn = pttrns[0], 1
-        else:
-            qn = 2
-        logstr = '%s\n    %s, IgnoreCase=%s' %(repr(pttrns), var_mode, var_ic)
-
-    filterFunc = fltfuncs.flt_NameMatchers[(var_mode, qn, var_ic)]
-
-    return (1, pttrns, filterFunc, logstr)
-
-
-def get_input_content(cmbbCont, var_opmContMode, var_ckbContIC,
-                      cmbbContEnc, var_opmContErrors, var_opmContNewline):
-    """Process data entered in filter Content.
-    Return (ok, pattern, filter-function, kwargs, logstr)."""
-
-    pttrn = inpstr_to_items(cmbbCont.get(), sep=None)
-    if not pttrn:
-        tk_msg_errinp('Filter "Content": nothing to search')
-        return (0, None, None, None, '')
-
-    var_mode = var_opmContMode.get()
-    var_ic = var_ckbContIC.get()
-
-    if var_mode == 'RegExp':
-        logstr = '%s\n    %s, IgnoreCase=%s' %(repr(pttrn), var_mode, var_ic)
-        flags = re.IGNORECASE if var_ic else 0
-        pttrn, msg = compile_regexp(pttrn, flags=flags)
-        if msg:
-            tk_msg_errinp(msg)
-            return (0, None, None, None, '')
-    else:
-        if var_ic:
-            pttrn = pttrn.casefold()
-        logstr = '%s\n    %s, IgnoreCase=%s' %(repr(pttrn), var_mode, var_ic)
-
-    matcherFunc = fltfuncs.flt_ContMatchers[(var_mode, var_ic)]
-
-    kwargs = {}
-    enc = cmbbContEnc.get()
-    if '#' in enc:
-        enc, x = enc.split('#', 1)
-    enc = enc.strip()
-    if not enc:
-            tk_msg_errinp('Filter "Content": no encoding')
-            return (0, None, None, None, '')
-    kwargs['encoding'] = enc
-    kwargs['errors'] = var_opmContErrors.get()
-    newln = var_opmContNewline.get()
-    if newln == 'None':
-        kwargs['newline'] = None
-    elif newln == "''":
-        kwargs['newline'] = ''
-    else:
-        kwargs['newline'] = newln.replace('\\n', '\n').replace('\\r', '\r')
-    logstr += '; encoding=%s, errors=%s, newline=%s' % (repr(kwargs['encoding']), repr(kwargs['errors']), repr(kwargs['newline']))
-
-    return (1, pttrn, matcherFunc, kwargs, logstr)
-
-
-def get_input_misc(entUID, entGID, entNLINK, cmbbMODE, var_opmMODEMode):
-    """Process data entered in filter Misc.
-    Return (ok, UIDs, GIDs, NLINK, MODEs, MODE func, MODE logstr)."""
-    querUID, querGID, querNLINK, querMODE, fltfuncMODE, logstr = None, None, None, None, None, None
-    error = ('', None, None, None, None, None, None)
-
-    # UID
-    querUID, msg = inpstr_to_ints(entUID.get(), sep='|')
-    if msg:
-        tk_msg_errinp(msg)
-        return error
-    # GID
-    querGID, msg = inpstr_to_ints(entGID.get(), sep='|')
-    if msg:
-        tk_msg_errinp(msg)
-        return error
-    # NLINK
-    querNLINK, msg = inpstr_to_ints(entNLINK.get(), sep=None)
-    if msg:
-        tk_msg_errinp(msg)
-        return error
-
-    # MODE
-    s = cmbbMODE.get()
-    var_mode = var_opmMODEMode.get() # which filter function to use
-    if var_mode == 'RegExp': # treat 'Name:' input as one string item
-        pttrns = inpstr_to_items(s, sep=None)
-    else:
-        pttrns = inpstr_to_items(s, sep='|')
-    if pttrns:
-        if var_mode == 'RegExp':
-            logstr = '%s\n    %s' %(repr(pttrns), var_mode)
-            pttrns, msg = compile_regexp(pttrns, flags=0)
-            if msg:
-                tk_msg_errinp(msg)
-                return error
-            qn = 1
-        else:
-            if len(pttrns) == 1:
-                pttrns, qn = pttrns[0], 1
-            else:
-                qn = 2
-            logstr = '%s\n    %s' %(repr(pttrns), var_mode)
-        querMODE = pttrns
-        fltfuncMODE = fltfuncs.flt_NameMatchers[(var_mode, qn, 0)] # IgnoreCase=0
-
-    return (1, set(querUID), set(querGID), querNLINK, querMODE, fltfuncMODE, logstr)
-
-
-def get_input_time(entBox):
-    """Get time string from Entry entBox and convert it to actual time.
-    Return (ok, time, logstr)."""
-    s = entBox.get().strip()
-    if not s:
-        return (1, None, '')
-    logstr = s
-    try:
-        tm = time.strptime(s, TIME_FORMAT)
-        tm = time.mktime(tm)
-    except Exception as e:
-        tk_msg_errinp('Cannot convert string to time: %s\n**Exception**:%s' %(repr(s), e_info(e)))
-        return (0, None, '')
-    logstr = '%s (%s)' %(logstr, tm)
-    return (1, tm, logstr)
-
-
-def get_input_size(entBox, units):
-    """Get size string from Entrybox entBox and convert it to file size.
-    Return (ok, size, logstr)."""
-    s = entBox.get().strip()
-    if not s:
-        return (1, None, '')
-    logstr = s
-    try:
-        sz = float(s)
-        sz = int('%.0f' %(sz * units))
-    except Exception as e:
-        tk_msg_errinp('Cannot convert string to file size: %s\n**Exception**:%s' %(repr(s), e_info(e)))
-        return (0, None, '')
-    logstr = '%s (%s bytes)' %(logstr, sz)
-    return (1, sz, logstr)
-
-
-def is_subdir(subDir, parDirs):
-    """subDir is a directroy. parDirs is a list of directories.
-    Return True if subDir is sub-directory of, or same as, one of directories in parDirs.
-    IMPORTANT: all directores MUST be abspath-ed and normcase-ed.
-    """
-    for parDir in parDirs:
-        if not subDir.startswith(parDir):
-            continue
-        len_parDir = len(parDir)
-        # identical dirs
-        if len(subDir) == len_parDir:
-            return True
-        # parDir is a root dir such as / or C:\ -- otherwise abspath() removes end sep
-        elif parDir[-1] == _sep:
-            return True
-        elif subDir[len_parDir] == _sep:
-            return True
-    return False
-
-
-def full_path(p, basedir=None):
-    """Convert string p to full path. Expand ~, $HOME, etc. Normalize.
-    If basedir is given and p does not resolve to an absolute path, p is
-    relative to basedir, which must be full path to a dir.
-    """
-    p = _path.expanduser(p)
-    p = _path.expandvars(p)
-    if basedir:
-        if not _path.isabs(p):
-            p = _path.join(basedir, p)
-        p = _path.normpath(p)
-    else:
-        p = _path.abspath(p)
-    return p
-
-
 def expand_placeholders(args, d):
     """ `args` is a list of strings. Keys in `d` are %P, %D, %N. 
     Replace items '%P', '%D', '%N' with values from `d`.
@@ -2933,33 +2308,6 @@ def expand_placeholders(args, d):
     return args_new
 
 
-def compile_regexp(pttrn, flags):
-        try:
-            regexp = re.compile(pttrn, flags=flags)
-        except Exception as e:
-            msg = 'Cannot compile RegExp: %s\n**Exception**:%s' %(repr(pttrn), e_info(e))
-            return (None, msg)
-        else:
-            return (regexp, '')
-
-
-def bytes2kibi(b):
-    """Convert size in bytes to human-readable format using kibi-bytes.
-    Round to whole number."""
-    if b < 2**10:
-        return '%d B'   % (b)
-    elif b < 2**20-2**9:
-        return '%.0f K' % (b / 2**10)
-    elif b < 2**30-2**19:
-        return '%.0f M' % (b / 2**20)
-    elif b < 2**40-2**29:
-        return '%.0f G' % (b / 2**30)
-    elif b < 2**50-2**39:
-        return '%.0f T' % (b / 2**40)
-    else:
-        return '>= 1 P'
-
-
 def bytes2size(b, how):
     """Convert size in bytes to human-readable format.
     Show 4 decimal points unless it's exact multiple."""
@@ -3082,23 +2430,6 @@ def file_properties(p):
     return res
 
 
-def get_path_ft(p):
-    """Get filetype char for path p."""
-    try:
-        mode = os.stat(p, follow_symlinks=False).st_mode
-    except OSError:
-        return '!'
-    return _filemode(mode)[0]
-
-
-def get_ext(name):
-    """Return extension of file name."""
-    j = name.rfind('.')
-    if j > 0:
-        return name[j:]
-    return ''
-
-
 def delete_one_file(p, ft):
     """Delete one file. `p` is path. `ft` is file type."""
     try:
@@ -3111,11 +2442,6 @@ def delete_one_file(p, ft):
         return (False, '%s: %s' %(e.__class__.__name__, e))
 
 
-def e_info(e):
-    """Return info message string for Exception e."""
-    return '\n    %s: %s' %(e.__class__.__name__, e)
-
-
 #--- Tkinter helpers--------------------------------------------------
 
 def tk_clipboard_get(root):
@@ -3202,9 +2528,6 @@ def tk_msg_errinp(message):
 ### OS is Windows
 if sys.platform == 'win32':
 
-    def quoted(s):
-        return '"%s"' % s
-
     def startfile(p, log_put):
         p = os.path.normpath(p)
         try:
@@ -3219,9 +2542,6 @@ if sys.platform == 'win32':
 ### OS is non-Windows
 else:
 
-    def quoted(s):
-        return "'%s'" % (s.replace("'", "'\\''"))
-
     def startfile(p, log_put):
         try:
             pid = subprocess.Popen(['xdg-open', p]).pid
@@ -3235,9 +2555,9 @@ else:
 
 #---------------------------------------------------------------------
 
-def start_GUI(configDir, startupDir, startupLog):
+def start_GUI(configDir, startupDir, startupLog, profile=False):
     root = tk.Tk()
-    Application(root, configDir, startupDir, startupLog)
+    Application(root, configDir, startupDir, startupLog, profile)
     root.mainloop()
 
 # The End
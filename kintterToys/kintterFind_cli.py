@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+"""
+Command-line interface of kintterFind. Usage:
+    kintterFind_cli.py [options] [DIR ...]
+
+Runs the same search as the GUI, see find_engine.py, and writes found items to
+stdout as they are found, unsorted. Memory use does not depend on the number
+of found items. Filters are given as options, e.g., --name1 '*.py'
+--name1-mode WildCard, or as a JSON object with the same keys as the query of
+find_engine.Finder (--query FILE, "-" is stdin). Options override the JSON
+query. A filter is on if any of its options is given.
+
+Output formats:
+    ndjson -- one JSON object per line, keys are --fields; times are seconds
+              since the epoch
+    csv    -- header line, then one line per item; times are formatted as in
+              the GUI
+    nul    -- full paths separated by NUL, for xargs -0
+
+With --top N, only the N found items with the largest --top-by value (SIZE,
+MTIME, ...) are written, best first, at the end of the search. They are kept
+in a heap while searching, see top_results.py.
+
+With --daemon, the search runs in kintterFind_daemon.py, which keeps its cache
+of directory listings between searches, see find_daemon.py.
+
+Exit status is 0 if something was found, 1 if nothing was found, 2 on error.
+Names that cannot be decoded are written as the original bytes.
+"""
+
+import sys, os, time, json, csv, argparse
+
+from . import find_engine
+from . import find_daemon
+from . import top_results
+from .find_engine import QUERY_GROUPS, FIELDS, e_info
+from .result_store import format_time
+
+_join = os.path.join
+
+# output fields, see find_engine.FIELDS
+TIME_FIELDS = ('mtime', 'ctime', 'atime')
+DEFAULT_FIELDS = 'path,type,size,mtime'
+
+# help for query options; other options are described by their defaults
+HELP = {
+    'recurse': 'search subdirectories',
+    'xdev': 'do not descend into directories on other file systems',
+    'index': 'use file index (option INDEX_FILE)',
+    'skip_dirs': 'directories to skip, separated by |',
+    'skip_names': 'names of directories to skip, separated by |',
+    'name1': 'name patterns, separated by |',
+    'path1': 'path patterns, separated by |',
+    'ext': 'extensions without dot, separated by |',
+    'types': 'file types to find: - d l o (regular, directory, link, other)',
+    'size_min': 'size must be greater than this',
+    'size_max': 'size must be less than this',
+    'time_min': 'time must be later than this, "YYYY-MM-DD HH:MM:SS"',
+    'time_max': 'time must be earlier than this, "YYYY-MM-DD HH:MM:SS"',
+    'nlink': 'NLINK must be greater than this',
+    'mode': 'patterns of MODE string, e.g. "^-rwx"',
+    'content': 'line content to search in regular files',
+    }
+CHOICES = {
+    'skip_names_mode': find_engine.MATCH_MODES,
+    'size_units': list(find_engine.SIZE_UNITS),
+    'time_what': list(find_engine.TIME_ATTRS),
+    'mode_mode': ('WildCard', 'RegExp'),
+    'content_mode': find_engine.CONT_MODES,
+    'content_errors': ('strict', 'ignore', 'replace', 'surrogateescape', 'backslashreplace'),
+    'content_binary': ('skip', 'bytes', 'search'),
+    }
+for k in ('name1', 'name2', 'path1', 'path2'):
+    CHOICES[k + '_mode'] = find_engine.MATCH_MODES
+
+
+def make_parser():
+    """Return ArgumentParser. Options of the query have the names of query
+    keys, with - instead of _. Absent options are absent from the result."""
+    parser = argparse.ArgumentParser(prog='kintterFind_cli.py',
+                description='Find files like kintterFind and write them to stdout.',
+                argument_default=argparse.SUPPRESS)
+    parser.add_argument('dirs', nargs='*', metavar='DIR',
+                        help='directories to search')
+    parser.add_argument('--query', metavar='FILE',
+                        help='JSON object with query keys, see find_engine.py; "-" is stdin')
+    parser.add_argument('--format', choices=('ndjson', 'csv', 'nul'), default='ndjson',
+                        help='output format (default: ndjson)')
+    parser.add_argument('--fields', default=DEFAULT_FIELDS,
+                        help='comma-separated fields for ndjson and csv: %s (default: %s)'
+                             %(','.join(FIELDS), DEFAULT_FIELDS))
+    parser.add_argument('--configdir', default='',
+                        help='config directory (default: %s)' % find_engine.CONFIGDIR)
+    parser.add_argument('--log', action='store_true', default=False,
+                        help='write the Log (parsed query, errors) to stderr')
+    parser.add_argument('--daemon', metavar='ADDRESS',
+                        help='run the search in kintterFind_daemon.py at ADDRESS (socket path or port)')
+    parser.add_argument('--top', metavar='N', type=int,
+                        help='write only N items with the largest --top-by, best first')
+    parser.add_argument('--top-by', dest='top_by', choices=list(top_results.TOP_KEYS), default='SIZE',
+                        help='column for --top (default: SIZE)')
+
+    for (title, keys) in QUERY_GROUPS:
+        grp = parser.add_argument_group('filter "%s"' % title if title != 'Directories' else title)
+        for (k, v) in keys.items():
+            if k == 'dirs':
+                continue
+            opt = '--%s' % k.replace('_', '-')
+            h = HELP.get(k, '')
+            if isinstance(v, bool):
+                grp.add_argument(opt, dest=k, action='store_const', const=True,
+                                 help=h or ('default' if v else None))
+                grp.add_argument('--no-%s' % k.replace('_', '-'), dest=k,
+                                 action='store_const', const=False,
+                                 help=None if v else 'default')
+            else:
+                if v:
+                    h = '%s (default: %s)' %(h, v) if h else 'default: %s' % v
+                grp.add_argument(opt, dest=k, metavar=k.split('_')[-1].upper(),
+                                 choices=CHOICES.get(k), help=h or None)
+    return parser
+
+
+def main(argv=None):
+    args = make_parser().parse_args(argv)
+    opts = vars(args)
+
+    ### query ----------------------------------------------------
+    query = {}
+    if 'query' in opts:
+        try:
+            if args.query == '-':
+                query = json.load(sys.stdin)
+            else:
+                with open(args.query, encoding='utf-8') as f:
+                    query = json.load(f)
+        except (OSError, ValueError) as e:
+            sys.stderr.write('kintterFind: cannot read query:%s\n' % e_info(e))
+            return 2
+        if not isinstance(query, dict):
+            sys.stderr.write('kintterFind: query must be a JSON object\n')
+            return 2
+    for k in find_engine.QUERY_DEFAULTS:
+        if k in opts and k != 'dirs':
+            query[k] = opts[k]
+    if opts.get('dirs'):
+        query['dirs'] = opts['dirs']
+
+    ### output ---------------------------------------------------
+    fields = [f.strip() for f in args.fields.split(',') if f.strip()]
+    if args.format == 'nul':
+        fields = ['path']
+    bad = [f for f in fields if f not in FIELDS]
+    if bad or not fields:
+        sys.stderr.write('kintterFind: unknown fields: %s\n' % ','.join(bad))
+        return 2
+    getters = [FIELDS[f][0] for f in fields]
+    needStat = any([FIELDS[f][1] for f in fields])
+    top = opts.get('top', 0)
+    if 'top' in opts and top < 1:
+        sys.stderr.write('kintterFind: --top must be a positive integer\n')
+        return 2
+    if args.format == 'csv':
+        for (i, f) in enumerate(fields):
+            if f in TIME_FIELDS:
+                getters[i] = (lambda g: lambda r: format_time(g(r)))(getters[i])
+
+    log = []
+    configDir = find_engine.config_dir(args.configdir)
+    find_engine.load_config(configDir, 'kintterFind.config.py', log)
+    try:
+        if 'daemon' in opts:
+            finder = find_daemon.RemoteFinder(query, needStat or top > 0, 'linkto' in fields, args.daemon, configDir)
+        else:
+            finder = find_engine.Finder(query, needStat or top > 0, 'linkto' in fields, None, configDir)
+        if top:
+            finder = top_results.TopFinder(finder, top, args.top_by)
+    except find_engine.FindError as e:
+        sys.stderr.write('kintterFind: %s\n' % e)
+        return 2
+    log.extend(finder.log)
+
+    # file names may not be decodable, write them back as they were
+    out = open(sys.stdout.fileno(), 'w', encoding=sys.stdout.encoding or 'utf-8',
+               errors='surrogateescape', newline='', closefd=False)
+    if args.format == 'ndjson':
+        dumps = json.JSONEncoder(ensure_ascii=False, check_circular=False).encode
+        write = lambda r: out.write('%s\n' % dumps(dict(zip(fields, [g(r) for g in getters]))))
+    elif args.format == 'csv':
+        writer = csv.writer(out, lineterminator='\n')
+        writer.writerow(fields)
+        write = lambda r: writer.writerow([g(r) for g in getters])
+    else:
+        write = lambda r: out.write('%s\0' % _join(r[1], r[2]))
+
+    tT0 = time.perf_counter()
+    found = finder.run(0.5)
+    status = 2
+    try:
+        for r in found:
+            if r is None:
+                # timer tick: pass found items on to the reader
+                out.flush()
+                continue
+            write(r)
+        out.flush()
+        status = 0 if finder.cntFound else 1
+    except KeyboardInterrupt:
+        status = 130
+    except BrokenPipeError:
+        # reader is gone, e.g., head; do not complain when stdout is closed
+        status = 0
+        try:
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        except OSError:
+            pass
+    finally:
+        found.close()
+        if args.log:
+            log.extend(finder.report())
+            log.append('Found %s items. %s errors. Scanned %s items in %s directories.'
+                       %(finder.cntFound, finder.errors(), finder.cntItems, finder.cntDirs))
+            log.extend(find_engine.phase_table(finder.phase_rows(), time.perf_counter()-tT0))
+            sys.stderr.write('%s\n' % '\n'.join(log))
+    try:
+        out.close()
+    except BrokenPipeError:
+        pass
+    return status
+
+
+# The End
@@ -0,0 +1,483 @@
+# -*- coding: utf-8 -*-
+
+"""
+Columnar container for FIND results (RSLTS). Usage:
+    from . import result_store
+    rslts = result_store.ResultStore(columns, getExt, fmtSize)
+    rslts.append(ft, dirpath, name, st, linkTo)
+    row = rslts[i]
+
+A row is not stored as a tuple of values. Each column is stored separately:
+    FileType         -- bytearray, one byte per row
+    Directory        -- array of indexes into list of unique directory paths
+    Name             -- list of str
+    SIZE, UID, GID, NLINK, INO, DEV, MODE -- array of ints
+    MTIME, CTIME, ATIME -- array of floats
+    LinkTo           -- list of str, only if column LinkTo is present
+    Group, Disk      -- array of ints, values given to append(), see VALUE_COLUMNS
+Columns Ext and Size, and display strings of time and mode columns, are computed
+from stored values when they are needed.
+
+A row can be added without stat result (st is None). Values of SIZE, Size and
+stat columns of such row are then obtained with lstat() when they are first
+needed, e.g., when the row is displayed or sorted. Rows (rslts[i]) do not
+lstat() for columns set with set_hidden(), they show '' instead. If lstat()
+fails, the values are ''. With dirSizes=True (FIND mode "disk usage") SIZE is
+the total given to append() and lstat() never replaces it.
+
+rslts[i] returns the display values of row i as a tuple in the order of
+columns, the same as a row of Treeview.
+
+Optional columns can be added and removed with add_column(), remove_column()
+without running FIND again. Values of an added stat column are obtained the
+same way as for rows added without stat result. Values of added column LinkTo
+are obtained with getLinkTo(dirpath, name) when needed. Values of an added
+value column (Group, Disk) are 0.
+
+Recently used rows are kept in a small LRU cache, ROW_CACHE_SIZE rows, because
+Treeview asks for the same rows again when it is scrolled.
+
+Times are formatted by format_time() (TimeFormatter). For TIME_FORMAT that
+ends with '%H:%M:%S', it calls localtime() and strftime() once per hour (UTC):
+the date string and the local time of day at the start of the hour are cached,
+minutes and seconds are taken from tables of strings. Other formats are cached
+by second.
+"""
+
+import os
+import re
+from array import array
+from collections import OrderedDict
+from math import floor
+from time import strftime, localtime
+from stat import filemode
+
+from .constants import TIME_FORMAT
+
+# columns with values from stat: array typecode, stat attribute
+ST_COLUMNS = {
+        'MTIME': ('d', 'st_mtime'),
+        'CTIME': ('d', 'st_ctime'),
+        'ATIME': ('d', 'st_atime'),
+        'MODE':  ('L', 'st_mode'),
+        'UID':   ('q', 'st_uid'),
+        'GID':   ('q', 'st_gid'),
+        'NLINK': ('q', 'st_nlink'),
+        'INO':   ('Q', 'st_ino'),
+        'DEV':   ('Q', 'st_dev'),
+        }
+
+# columns with values given to append(), not from stat: array typecode
+# Group -- group ID of duplicate files, see duplicates.py; 0 is shown as ''
+# Disk -- allocated size of directory, see disk_usage.py; shown like Size
+VALUE_COLUMNS = {
+        'Group': 'q',
+        'Disk': 'q',
+        }
+
+
+# strftime() directives that do not depend on time of day
+DATE_DIRECTIVES = 'aAbBdmyYjUWGuVwe%'
+
+
+class TimeFormatter:
+    """Memoized strftime(fmt, localtime(t)). Usage:
+        format_time = TimeFormatter(fmt)
+        s = format_time(t)
+        ss = format_time.format_many(ts)
+
+    If fmt is date followed by '%H:%M:%S' (e.g., '%Y-%m-%d %H:%M:%S'),
+    localtime() and strftime() are called once per hour (UTC): the date string
+    and local time of day at the start of the hour are cached, the time part is
+    taken from tables. Hours with a change of UTC offset are formatted with
+    strftime(). For other formats, formatted strings are cached by second."""
+
+    # clear cache when it has more entries
+    MAX_CACHED = 100000
+
+    def __init__(self, fmt):
+        self.fmt = fmt
+        self.dateFmt = fmt[:-8]
+        self.byHour = (fmt.endswith('%H:%M:%S') and
+                       set(re.findall('%(.)', self.dateFmt)) <= set(DATE_DIRECTIVES))
+        self._cache = {} # hour: (date, local seconds of day); or second: string
+        # 'HH:MM:' for each minute of day, 'SS'
+        self._hm = ['%02d:%02d:' % divmod(i, 60) for i in range(1440)]
+        self._ss = ['%02d' % i for i in range(60)]
+
+    def __call__(self, t):
+        sec = floor(t)
+        cache = self._cache
+        if self.byHour:
+            h, r = divmod(sec, 3600)
+            v = cache.get(h)
+            if v is None:
+                v = self._new_hour(h)
+            date, base = v
+            if base is not None:
+                loc = base + r
+                if loc < 86400:
+                    return date + self._hm[loc // 60] + self._ss[loc % 60]
+            return strftime(self.fmt, localtime(t))
+        else:
+            v = cache.get(sec)
+            if v is None:
+                if len(cache) >= self.MAX_CACHED:
+                    cache.clear()
+                v = cache[sec] = strftime(self.fmt, localtime(sec))
+            return v
+
+    def _new_hour(self, h):
+        """Cache and return (date, local seconds of day) for the start of
+        hour h. It is (None, None) if UTC offset changes during the hour."""
+        tm = localtime(h * 3600)
+        if tm.tm_gmtoff != localtime(h * 3600 + 3599).tm_gmtoff:
+            v = (None, None)
+        else:
+            v = (strftime(self.dateFmt, tm), tm.tm_hour * 3600 + tm.tm_min * 60 + tm.tm_sec)
+        if len(self._cache) >= self.MAX_CACHED:
+            self._cache.clear()
+        self._cache[h] = v
+        return v
+
+    def format_many(self, ts):
+        """Return list of formatted times ts (iterable of numbers)."""
+        if not self.byHour:
+            return [self(t) for t in ts]
+        res = []
+        append, get, new = res.append, self._cache.get, self._new_hour
+        hm, ss, fmt = self._hm, self._ss, self.fmt
+        for t in ts:
+            h, r = divmod(floor(t), 3600)
+            v = get(h)
+            if v is None:
+                v = new(h)
+            date, base = v
+            if base is not None:
+                loc = base + r
+                if loc < 86400:
+                    append(date + hm[loc // 60] + ss[loc % 60])
+                    continue
+            append(strftime(fmt, localtime(t)))
+        return res
+
+
+format_time = TimeFormatter(TIME_FORMAT)
+
+
+# number of rows in LRU cache of display values
+ROW_CACHE_SIZE = 2000
+
+# values of ResultStore._hasSt
+ST_NONE, ST_OK, ST_ERROR = 0, 1, 2
+
+
+class ResultStore:
+    """FIND results stored column by column."""
+
+    def __init__(self, columns=(), getExt=None, fmtSize=None, getLinkTo=None, dirSizes=False):
+        # dirSizes -- if True, column Size shows size of directories instead of <DIR>;
+        #     SIZE is then the value given to append(), it is never replaced by lstat()
+        self.columns = tuple(columns)
+        self.getExt, self.fmtSize, self.getLinkTo = getExt, fmtSize, getLinkTo
+        self.dirSizes = dirSizes
+        self._ft = bytearray()
+        self._dirIds = array('I')
+        self._dirs = []     # unique directory paths
+        self._dirIdx = {}   # directory path: index in self._dirs
+        self._names = []
+        self._size = array('q')
+        # stat columns: column name: array; and (array, stat attribute) for append()
+        self._st = {}
+        self._stAppend = []
+        for c in self.columns:
+            if c in ST_COLUMNS:
+                tc, att = ST_COLUMNS[c]
+                a = self._st[c] = array(tc)
+                self._stAppend.append((a.append, att))
+        self._linkTo = [] if 'LinkTo' in self.columns else None
+        # value columns: column name: array; and (array, column) for append()
+        self._val = {}
+        self._valAppend = []
+        for c in self.columns:
+            if c in VALUE_COLUMNS:
+                a = self._val[c] = array(VALUE_COLUMNS[c])
+                self._valAppend.append((a.append, c))
+        # per row: ST_OK -- stat values are stored, ST_NONE -- not yet, ST_ERROR -- lstat() failed
+        self._hasSt = bytearray()
+        # row index: tuple of display values; most recently used last
+        self._rowCache = OrderedDict()
+        self.set_hidden(())
+
+    def __len__(self):
+        return len(self._names)
+
+    def __getitem__(self, i):
+        cache = self._rowCache
+        row = cache.get(i)
+        if row is not None:
+            cache.move_to_end(i)
+            return row
+        if self._statShown and self._hasSt[i] == ST_NONE:
+            self.stat_row(i)
+        row = cache[i] = tuple([g(i) for g in self._getters])
+        if len(cache) > ROW_CACHE_SIZE:
+            cache.popitem(last=False)
+        return row
+
+    def set_hidden(self, cols):
+        """Columns cols are not displayed. Rows do not need their values."""
+        self.hidden = frozenset(cols)
+        # True if some displayed column needs stat values
+        self._statShown = any((c in ST_COLUMNS or c in ('SIZE', 'Size') and not self.dirSizes)
+                              and c not in self.hidden for c in self.columns)
+        self._getters = tuple(self.getter(c, c in self.hidden) for c in self.columns)
+        self._rowCache.clear()
+
+    def add_column(self, col):
+        """Add optional column col after the last column."""
+        if col in self.columns: return
+        n = len(self)
+        if col == 'LinkTo':
+            self._linkTo = [None] * n
+        elif col in VALUE_COLUMNS:
+            tc = VALUE_COLUMNS[col]
+            a = self._val[col] = array(tc, bytes(array(tc).itemsize * n))
+            self._valAppend.append((a.append, col))
+        else:
+            tc, att = ST_COLUMNS[col]
+            a = self._st[col] = array(tc, bytes(array(tc).itemsize * n))
+            self._stAppend.append((a.append, att))
+            # all rows need lstat() again
+            self._hasSt[:] = bytes(n)
+        self.columns += (col,)
+        self.set_hidden(self.hidden)
+
+    def remove_column(self, col):
+        """Remove optional column col."""
+        if col not in self.columns: return
+        if col == 'LinkTo':
+            self._linkTo = None
+        elif col in VALUE_COLUMNS:
+            self._val.pop(col)
+            self._valAppend = [i for i in self._valAppend if i[1] != col]
+        else:
+            self._st.pop(col)
+            self._stAppend = [i for i in self._stAppend if i[1] != ST_COLUMNS[col][1]]
+        self.columns = tuple(c for c in self.columns if c != col)
+        self.set_hidden(self.hidden)
+
+    def append(self, ft, dirpath, name, st, linkTo='', values=None):
+        """Add one row. st is stat result of the item or None. values is dict
+        with values of VALUE_COLUMNS, missing values are 0."""
+        d = self._dirIdx.get(dirpath)
+        if d is None:
+            d = self._dirIdx[dirpath] = len(self._dirs)
+            self._dirs.append(dirpath)
+        self._dirIds.append(d)
+        self._ft.append(ord(ft))
+        self._names.append(name)
+        if st is None:
+            self._hasSt.append(ST_NONE)
+            self._size.append(0)
+            for ap, att in self._stAppend:
+                ap(0)
+        else:
+            self._hasSt.append(ST_OK)
+            self._size.append(st.st_size)
+            for ap, att in self._stAppend:
+                ap(getattr(st, att))
+        if self._linkTo is not None:
+            self._linkTo.append(linkTo)
+        if self._valAppend:
+            for ap, c in self._valAppend:
+                ap(values.get(c, 0) if values else 0)
+
+    def path(self, i):
+        return os.path.join(self._dirs[self._dirIds[i]], self._names[i])
+
+    def stat_row(self, i):
+        """lstat() item of row i and store the values. Return True if success."""
+        try:
+            st = os.lstat(self.path(i))
+        except OSError:
+            self._hasSt[i] = ST_ERROR
+            return False
+        if not self.dirSizes:
+            self._size[i] = st.st_size
+        for c, a in self._st.items():
+            a[i] = getattr(st, ST_COLUMNS[c][1])
+        self._hasSt[i] = ST_OK
+        self._rowCache.pop(i, None)
+        return True
+
+    def stat_pending(self):
+        """Return True if some rows were added without stat result."""
+        return ST_NONE in self._hasSt
+
+    def stat_all(self):
+        """lstat() all rows added without stat result."""
+        hasSt = self._hasSt
+        i = hasSt.find(ST_NONE)
+        while i >= 0:
+            self.stat_row(i)
+            i = hasSt.find(ST_NONE, i+1)
+
+    def _lazy(self, get, hidden=False):
+        """Wrap getter of value that comes from stat."""
+        hasSt, statRow = self._hasSt, self.stat_row
+        def g(i):
+            h = hasSt[i]
+            if h == ST_OK:
+                return get(i)
+            if h == ST_NONE and not hidden and statRow(i):
+                return get(i)
+            return ''
+        return g
+
+    def getter(self, col, hidden=False):
+        """Return function that returns display value in column col for row index.
+        If hidden, the function does not lstat() rows added without stat result."""
+        if col in ('FileType', 'Directory', 'Name', 'Ext', 'LinkTo') or col in VALUE_COLUMNS:
+            return self._getter(col)
+        if col in ('SIZE', 'Size') and self.dirSizes:
+            return self._getter(col)
+        return self._lazy(self._getter(col), hidden)
+
+    def _getter(self, col):
+        if col == 'FileType':
+            ft = self._ft
+            return lambda i: chr(ft[i])
+        elif col == 'Directory':
+            dirs, dirIds = self._dirs, self._dirIds
+            return lambda i: dirs[dirIds[i]]
+        elif col == 'Name':
+            return self._names.__getitem__
+        elif col == 'Ext':
+            names, getExt = self._names, self.getExt
+            return lambda i: getExt(names[i])
+        elif col == 'SIZE':
+            return self._size.__getitem__
+        elif col == 'Size':
+            ft, size, fmtSize, d = self._ft, self._size, self.fmtSize, ord('d')
+            if self.dirSizes:
+                return lambda i: fmtSize(size[i])
+            return lambda i: '<DIR>' if ft[i] == d else fmtSize(size[i])
+        elif col == 'LinkTo':
+            return self._link_to
+        elif col in ('MTIME', 'CTIME', 'ATIME'):
+            a = self._st[col]
+            return lambda i: format_time(a[i])
+        elif col == 'MODE':
+            a = self._st[col]
+            return lambda i: filemode(a[i])
+        elif col == 'Disk':
+            a, fmtSize = self._val[col], self.fmtSize
+            return lambda i: fmtSize(a[i])
+        elif col in VALUE_COLUMNS:
+            a = self._val[col]
+            return lambda i: a[i] or ''
+        else:
+            return self._st[col].__getitem__
+
+    def _link_to(self, i):
+        v = self._linkTo[i]
+        if v is None:
+            # column was added after FIND
+            v = ''
+            if self._ft[i] == ord('l'):
+                try:
+                    v = self.getLinkTo(self._dirs[self._dirIds[i]], self._names[i])
+                except OSError:
+                    pass
+            self._linkTo[i] = v
+        return v
+
+    def table_text(self, itxs, cols, headings, left):
+        """Return rows itxs as text table for the clipboard: headings, then one
+        line per row, each value padded to the width of its column and followed
+        by '|'. cols are column names, headings their texts, left is True for
+        each left-aligned column."""
+        getters = [self.getter(c) for c in cols]
+        widths = [len(h) for h in headings]
+        # width of each column
+        for i in itxs:
+            for (j, g) in enumerate(getters):
+                w = len('%s' % g(i))
+                if w > widths[j]:
+                    widths[j] = w
+        fmts = ['%%-%ss|' % w if l else '%%%ss|' % w for (w, l) in zip(widths, left)]
+        table = [''.join([f % h for (f, h) in zip(fmts, headings)])]
+        for i in itxs:
+            table.append(''.join([f % g(i) for (f, g) in zip(fmts, getters)]))
+        return '\n'.join(table)
+
+    def value(self, i, col):
+        """Return display value in column col of row i."""
+        if col in self.hidden:
+            return self.getter(col)(i)
+        return self._getters[self.columns.index(col)](i)
+
+    def values(self, col):
+        """Return iterator over display values in column col."""
+        if col in ('MTIME', 'CTIME', 'ATIME'):
+            # format the whole column at once
+            self.stat_all()
+            res = format_time.format_many(self._st[col])
+            hasSt = self._hasSt
+            i = hasSt.find(ST_ERROR)
+            while i >= 0:
+                res[i] = ''
+                i = hasSt.find(ST_ERROR, i+1)
+            return iter(res)
+        return map(self.getter(col), range(len(self)))
+
+    def sort_key(self, col):
+        """Return sort key function for column col. Values are compared as
+        stored, e.g., times as numbers."""
+        if col in ST_COLUMNS or col in ('SIZE', 'Size') and not self.dirSizes:
+            self.stat_all()
+        if col == 'Directory':
+            # rank of each unique directory in sorted order
+            dirs = self._dirs
+            rank = array('I', bytes(4*len(dirs)))
+            for r, d in enumerate(sorted(range(len(dirs)), key=dirs.__getitem__)):
+                rank[d] = r
+            dirIds = self._dirIds
+            return lambda i: rank[dirIds[i]]
+        elif col in ('SIZE', 'Size'):
+            return self._size.__getitem__
+        elif col in self._st and col != 'MODE':
+            return self._st[col].__getitem__
+        elif col in self._val:
+            return self._val[col].__getitem__
+        return self.getter(col)
+
+    def sort(self, cols, reverse=False):
+        """Sort rows by values in columns cols (list of column names)."""
+        if len(cols) == 1:
+            key = self.sort_key(cols[0])
+        else:
+            keys = [self.sort_key(c) for c in cols]
+            key = lambda i: tuple([k(i) for k in keys])
+        order = sorted(range(len(self)), key=key, reverse=reverse)
+        self._reorder(order)
+
+    def delete(self, itxs):
+        """Delete rows with indexes itxs."""
+        itxs = set(itxs)
+        self._reorder([i for i in range(len(self)) if i not in itxs])
+
+    def _reorder(self, order):
+        """Replace rows with rows order[0], order[1], ..."""
+        self._rowCache.clear()
+        self._ft[:] = bytes(map(self._ft.__getitem__, order))
+        self._hasSt[:] = bytes(map(self._hasSt.__getitem__, order))
+        for a in [self._dirIds, self._size] + list(self._st.values()) + list(self._val.values()):
+            a[:] = array(a.typecode, map(a.__getitem__, order))
+        for l in (self._names, self._linkTo):
+            if l is not None:
+                l[:] = list(map(l.__getitem__, order))
+
+
+# The End
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+"""
+In-memory cache of directory listings for kintterFind. Usage:
+    from . import scan_cache
+    scanCache = scan_cache.ScanCache(maxbytes)
+    for en in scanCache.scandir(dirpath): ...
+
+ScanCache.scandir() is a replacement for os.scandir(). It keeps lists of
+DirEntry objects returned by scandir() for the duration of the session, keyed
+by directory path. The directory is lstat()-ed first. If its mtime and ctime
+did not change since the listing was cached, the cached listing is returned.
+Otherwise the directory is scanned again.
+
+DirEntry objects cache the result of DirEntry.stat(), thus stat results of
+items are also cached. NOTE: Modifying a file does not change mtime of its
+directory. Size and timestamps of items in unchanged directories are the values
+obtained during the first FIND.
+
+Least recently used listings are evicted when the estimated memory use exceeds
+maxbytes. Can be used from several threads, e.g., by FINDs running at the
+same time in kintterFind_daemon.py; hit/miss counters are then shared.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+# os.scandir() is available in Python >=3.5
+_scandir = getattr(os, 'scandir', None)
+if not _scandir:
+    import scandir
+    _scandir = scandir.scandir
+
+# Estimated memory used by one cached DirEntry, including its stat result.
+ITEM_BYTES = 1024
+
+
+class ScanCache:
+    """Cache of directory listings validated by directory mtime and ctime."""
+
+    def __init__(self, maxbytes):
+        self.maxbytes = maxbytes
+        # dirpath: (st_mtime_ns, st_ctime_ns, list of DirEntry); most recently used last
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.cntItems = 0 # number of DirEntry objects in cache
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Reset hit/miss counters."""
+        self.cntHits, self.cntMisses = 0, 0
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.cntItems = 0
+
+    def size(self):
+        """Return estimated memory use in bytes."""
+        return self.cntItems * ITEM_BYTES
+
+    def scandir(self, dirpath):
+        """Return iterator over items in directory dirpath, like os.scandir().
+        Raise OSError if directory cannot be listed."""
+        # raises OSError for inaccessible directory, like scandir()
+        st = os.stat(dirpath, follow_symlinks=False)
+        key = (st.st_mtime_ns, st.st_ctime_ns)
+        cache = self._cache
+        with self._lock:
+            v = cache.get(dirpath)
+            if v is not None:
+                if v[:2] == key:
+                    cache.move_to_end(dirpath)
+                    self.cntHits += 1
+                    return iter(v[2])
+                del cache[dirpath]
+                self.cntItems -= len(v[2])
+            self.cntMisses += 1
+
+        # scan outside of lock, this is the slow part
+        ens = list(_scandir(dirpath))
+
+        with self._lock:
+            v = cache.pop(dirpath, None) # was added by another thread
+            if v is not None:
+                self.cntItems -= len(v[2])
+            cache[dirpath] = key + (ens,)
+            self.cntItems += len(ens)
+            maxItems = self.maxbytes // ITEM_BYTES
+            while self.cntItems > maxItems and cache:
+                d, v = cache.popitem(last=False)
+                self.cntItems -= len(v[2])
+        return iter(ens)
+
+
+# The End
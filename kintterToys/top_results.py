@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+"""
+Top-N results of FIND: only the N found items with the largest SIZE, the most
+recent MTIME, etc. Usage:
+    from . import top_results
+    finder = top_results.TopFinder(find_engine.Finder(query, True, ...), n, 'SIZE')
+    for item in finder.run(interval): ...
+
+TopFinder has the same interface as find_engine.Finder. Found items are kept in
+a heap of size N while scanning, the item with the smallest value is replaced
+when a better item is found. Memory use does not depend on the number of
+found items. At the end the N items are yielded sorted, best first; of items
+with equal values, those found first are kept.
+"""
+
+from heapq import heappush, heapreplace
+
+# column: stat attribute; the largest values are the best
+TOP_KEYS = {
+        'SIZE': 'st_size',
+        'MTIME': 'st_mtime',
+        'CTIME': 'st_ctime',
+        'ATIME': 'st_atime',
+        'NLINK': 'st_nlink',
+        }
+
+
+class TopFinder:
+    """The best n items found by finder by column col, see TOP_KEYS."""
+
+    def __init__(self, finder, n, col='SIZE'):
+        # finder -- find_engine.Finder or find_daemon.RemoteFinder, must
+        #     yield items with stat result (needStat=True)
+        self.finder = finder
+        self.n, self.col = n, col
+        self.log = finder.log + ['Top: %s items with the largest %s' %(n, col)]
+        self.cntFound = 0 # items yielded
+
+    # counters of the Finder
+    cntItems = property(lambda self: self.finder.cntItems)
+    cntDirs = property(lambda self: self.finder.cntDirs)
+    cntBinary = property(lambda self: self.finder.cntBinary)
+    stage = property(lambda self: 'searching, found %s...' % self.finder.cntFound)
+
+    def run(self, interval=0.5, first=None):
+        """Generator. Yield the best items at the end, and None every interval
+        seconds."""
+        n, att = self.n, TOP_KEYS[self.col]
+        # heap -- (value, -number of item, item), the worst item first
+        heap, i = [], 0
+        found = self.finder.run(interval, first=first)
+        try:
+            for item in found:
+                if item is None:
+                    yield None
+                    continue
+                st = item[3]
+                if st is None:
+                    continue
+                i -= 1
+                if len(heap) < n:
+                    heappush(heap, (getattr(st, att), i, item))
+                else:
+                    v = getattr(st, att)
+                    if v > heap[0][0]:
+                        heapreplace(heap, (v, i, item))
+        finally:
+            found.close()
+        heap.sort(reverse=True)
+        for (v, x, item) in heap:
+            self.cntFound += 1
+            yield item
+
+    def errors(self):
+        """Return number of errors as string for status messages."""
+        return self.finder.errors()
+
+    def phase_rows(self):
+        """Return time of phases of FIND, see find_engine.Finder.phase_rows()."""
+        return self.finder.phase_rows()
+
+    def report(self):
+        """Return lines for the Log after the end of FIND."""
+        return self.finder.report() + ['\nTop: %s of %s found items by %s'
+                                       %(self.cntFound, self.finder.cntFound, self.col)]
+
+# The End
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+
+"""
+Display rows of a data table in ttk.Treeview. Usage:
+    from . import treeview_rows
+    trvwRows = treeview_rows.TreeviewRows(trvw, scrollbar, rowfunc, fullLimit)
+    trvwRows.set_data(len(table))
+
+rowfunc(i) must return (values, tags) of Treeview item for row i of the data
+table. Item iid is always str(i+1).
+
+If the table has no more than fullLimit rows, all rows are put into Treeview.
+Otherwise only the rows that are visible, plus some rows above and below them,
+are put into Treeview. They are replaced when the view is scrolled. This keeps
+the number of Treeview items small for any number of rows. In that case
+TreeviewRows owns the vertical scrollbar and the selection: selected rows are
+remembered in a bytearray, one byte per row of the table.
+
+Callers must use methods of TreeviewRows instead of Treeview methods
+get_children(), selection(), selection_set(), see().
+"""
+
+# rows above and below visible rows, minimum
+OVERSCAN = 50
+# max number of visible rows; guards against bogus values from unmapped Treeview
+MAX_VISIBLE = 500
+
+
+class TreeviewRows:
+    """Treeview items for rows of a data table, created as needed."""
+
+    def __init__(self, trvw, scrollbar, rowfunc, fullLimit):
+        self.trvw, self.scb = trvw, scrollbar
+        self.rowfunc = rowfunc
+        self.fullLimit = fullLimit
+        self.n = 0           # number of rows
+        self.virtual = False # True if only some rows are in Treeview
+        self.top = 0         # first visible row
+        self.vis = 40        # number of visible rows; updated in _yscroll()
+        self.wstart = self.wstop = 0 # rows in Treeview: [wstart, wstop)
+        self.sel = bytearray() # 1 for selected row
+        self.focusItx = None # focused row
+        self._ctrl = False   # True if the last click was Control-click
+        self._afterID = None
+        trvw.configure(yscrollcommand=self._yscroll)
+        scrollbar.configure(command=self.yview)
+        trvw.bind('<<TreeviewSelect>>', self._sync_selection, add='+')
+        trvw.bind('<Button-1>', self._click, add='+')
+        trvw.bind('<KeyPress>', self._click, add='+')
+
+    ### public methods -------------------------------------------------------
+
+    def set_data(self, n):
+        """Display the first n rows of a new or reordered data table."""
+        self.n = n
+        self.virtual = n > self.fullLimit
+        self.top = 0
+        self.sel = bytearray(n)
+        self.focusItx = None
+        self._render(sync=False)
+
+    def grow(self, n):
+        """Rows were appended to the data table. Display the first n rows."""
+        self._sync_selection()
+        if n <= self.n: return
+        self.sel.extend(bytes(n - self.n))
+        nOld, self.n = self.n, n
+        if n > self.fullLimit:
+            if not self.virtual or self.wstop < min(n, self.top + self.vis + self._overscan()):
+                self.virtual = True
+                self._render()
+            else:
+                self._set_scrollbar()
+            return
+        # append new rows to Treeview
+        _insert = self.trvw.insert
+        for i in range(nOld, n):
+            values, tags = self.rowfunc(i)
+            _insert('', 'end', iid=str(i+1), values=values, tags=tags)
+        self.wstop = n
+
+    def refresh(self):
+        """Put rows into Treeview again, e.g., after their values changed."""
+        self._render()
+
+    def selection(self):
+        """Return sorted list of indexes of selected rows."""
+        self._sync_selection()
+        res, sel = [], self.sel
+        i = sel.find(1)
+        while i >= 0:
+            res.append(i)
+            i = sel.find(1, i+1)
+        return res
+
+    def has_selection(self):
+        self._sync_selection()
+        return 1 in self.sel
+
+    def is_selected(self, itx):
+        self._sync_selection()
+        return self.sel[itx] == 1
+
+    def selection_set(self, itxs):
+        """Select rows itxs, deselect all other rows."""
+        sel = self.sel = bytearray(self.n)
+        for i in itxs:
+            sel[i] = 1
+        self.trvw.selection_set(self._window_iids())
+
+    def select_all(self):
+        self.sel = bytearray(b'\x01') * self.n
+        self.trvw.selection_set(self._window_iids())
+
+    def focus(self, itx):
+        """Set focus to row itx, which must be in Treeview."""
+        self.focusItx = itx
+        self.trvw.focus(str(itx+1))
+
+    def see(self, itx):
+        """Scroll to make row itx visible."""
+        if not self.virtual:
+            self.trvw.see(str(itx+1))
+            return
+        if self.top <= itx < self.top + self.vis:
+            return
+        self.top = itx - self.vis // 2
+        self._render()
+
+    def yview(self, *args):
+        """Command of the vertical scrollbar."""
+        if not self.virtual:
+            return self.trvw.yview(*args)
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * self.n)
+        elif args[0] == 'scroll':
+            k = int(args[1])
+            if args[2].startswith('page'):
+                k *= self.vis
+            self.top += k
+        self._render()
+
+    ### private methods ------------------------------------------------------
+
+    def _overscan(self):
+        return max(OVERSCAN, self.vis)
+
+    def _window_iids(self):
+        """Return iids of selected rows that are in Treeview."""
+        sel, wstop = self.sel, self.wstop
+        res = []
+        i = sel.find(1, self.wstart, wstop)
+        while i >= 0:
+            res.append(str(i+1))
+            i = sel.find(1, i+1, wstop)
+        return res
+
+    def _click(self, event):
+        # Control-click toggles one item, other clicks and keys replace selection
+        self._ctrl = bool(event.state & 0x0004)
+
+    def _sync_selection(self, event=None):
+        """Copy selection and focus of items in Treeview to self.sel and self.focusItx."""
+        trvw = self.trvw
+        wstart, wstop = self.wstart, self.wstop
+        cur = bytearray(wstop - wstart)
+        for iid in trvw.selection():
+            i = int(iid) - 1
+            if wstart <= i < wstop:
+                cur[i - wstart] = 1
+        if cur != self.sel[wstart:wstop]:
+            # selection was changed by the user
+            if self.virtual and not self._ctrl:
+                self.sel = bytearray(self.n)
+            self.sel[wstart:wstop] = cur
+        iid = trvw.focus()
+        if iid:
+            self.focusItx = int(iid) - 1
+
+    def _render(self, sync=True):
+        """Put rows around self.top into Treeview."""
+        if self._afterID:
+            self.trvw.after_cancel(self._afterID)
+            self._afterID = None
+        if sync:
+            self._sync_selection()
+        trvw, n = self.trvw, self.n
+        if self.virtual:
+            top = self.top = max(0, min(self.top, n - self.vis))
+            ov = self._overscan()
+            wstart, wstop = max(0, top - ov), min(n, top + self.vis + ov)
+        else:
+            wstart, wstop = 0, n
+        trvw.delete(*trvw.get_children())
+        self.wstart, self.wstop = wstart, wstop
+        _insert, rowfunc = trvw.insert, self.rowfunc
+        for i in range(wstart, wstop):
+            values, tags = rowfunc(i)
+            _insert('', 'end', iid=str(i+1), values=values, tags=tags)
+        iids = self._window_iids()
+        if iids:
+            trvw.selection_set(iids)
+        if self.focusItx is not None and wstart <= self.focusItx < wstop:
+            trvw.focus(str(self.focusItx+1))
+        if self.virtual:
+            trvw.yview_moveto((top - wstart) / (wstop - wstart))
+            self._set_scrollbar()
+
+    def _set_scrollbar(self):
+        n = self.n or 1
+        self.scb.set(self.top / n, min(1.0, (self.top + self.vis) / n))
+
+    def _yscroll(self, first, last):
+        """yscrollcommand of Treeview."""
+        if not self.virtual:
+            self.scb.set(first, last)
+            return
+        wlen = self.wstop - self.wstart
+        if not wlen: return
+        first, last = float(first), float(last)
+        vis = int(round((last - first) * wlen))
+        if vis > 0:
+            self.vis = min(vis, MAX_VISIBLE)
+        self.top = self.wstart + int(round(first * wlen))
+        self._set_scrollbar()
+        # Treeview was scrolled close to the first or last item: move the window
+        margin = self._overscan() // 2
+        if ((self.top - self.wstart < margin and self.wstart > 0) or
+                (self.wstop - self.top - self.vis < margin and self.wstop < self.n)):
+            if not self._afterID:
+                self._afterID = self.trvw.after_idle(self._render)
+
+
+# The End
@@ -5,13 +5,13 @@ if sys.version_info < (3, 4):
     print("Python version is too old.\nkintterFind requires Python version 3.4 or newer.")
     sys.exit(1)
 
-configDir, startupDir, startupLog = '', '', []
+configDir, startupDir, startupLog, profile = '', '', [], False
 
 if len(sys.argv) > 1:
     import getopt
     args = sys.argv[1:]
     try:
-        opts, x = getopt.getopt(args, '', ['configdir=', 'directory='])
+        opts, x = getopt.getopt(args, '', ['configdir=', 'directory=', 'profile'])
     except getopt.GetoptError as e:
         startupLog.append('**getopt.GetoptError** while parsing arguments for start_kintterFind.py:\n    %s' %e)
     else:
@@ -20,9 +20,11 @@ if len(sys.argv) > 1:
                 configDir = v
             elif o == '--directory':
                 startupDir = v
+            elif o == '--profile':
+                profile = True
 
 if __name__ == '__main__':
     from kintterToys.kintterFind import start_GUI
-    start_GUI(configDir, startupDir, startupLog)
+    start_GUI(configDir, startupDir, startupLog, profile)
 
 # The End
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""
+Indexed search ("index" on) through code that uses stat results as sequences:
+FIND mode disk usage and field 'stat' of kintterFind_cli.py / the daemon.
+Run: python3 -m unittest discover tests
+"""
+
+import os, sys, stat, shutil, tempfile, unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kintterToys import find_engine, disk_usage
+from kintterToys.file_index import IndexStat
+
+
+class IndexedSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.root = os.path.join(self.tmp, 'tree')
+        self.configDir = os.path.join(self.tmp, 'config')
+        os.makedirs(os.path.join(self.root, 'a', 'b'))
+        os.mkdir(self.configDir)
+        for (d, n, size) in (('', 'f1', 100), ('a', 'f2', 5000), ('a/b', 'f3', 70000)):
+            with open(os.path.join(self.root, d, n), 'wb') as f:
+                f.write(b'x' * size)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def find(self, index):
+        return find_engine.Finder({'dirs': [self.root], 'index': index}, True, False,
+                                  None, self.configDir)
+
+    def test_index_stat_is_sequence(self):
+        st = os.lstat(os.path.join(self.root, 'f1'))
+        ist = IndexStat.from_row((st.st_size, st.st_mtime, st.st_ctime, st.st_atime, st.st_mode,
+                                  st.st_uid, st.st_gid, st.st_nlink, st.st_ino, st.st_dev, 0))
+        self.assertEqual(len(ist), len(tuple(st)))
+        self.assertEqual(tuple(ist), tuple(st))
+        self.assertEqual(ist[:7], tuple(st)[:7])
+
+    def test_stat_field(self):
+        getStat = find_engine.FIELDS['stat'][0]
+        plain = {(r[1], r[2]): getStat(r) for r in self.find(False).run() if r}
+        for i in range(2): # build the index, then read it
+            res = {(r[1], r[2]): getStat(r) for r in self.find(True).run() if r}
+            self.assertEqual(set(res), set(plain))
+            for (k, v) in res.items():
+                self.assertEqual(os.stat_result(v).st_size, plain[k][6])
+                self.assertTrue(stat.S_ISDIR(v[0]) == stat.S_ISDIR(plain[k][0]))
+
+    def test_disk_usage(self):
+        sizes = {}
+        for index in (False, True, True):
+            finder = disk_usage.DuFinder(self.find(index))
+            res = {(r[1], r[2]): (r[3].st_size, r[5]['Disk']) for r in finder.run() if r}
+            sizes.setdefault('plain', res)
+            self.assertEqual(res, sizes['plain'])
+        self.assertTrue(res[os.path.split(self.root)][0] >= 75100)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# The End